@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class Coalescer:
+    """
+    Shares one in-flight call per key between concurrent callers.
+
+    run() first asks the cache for a finished value; on a miss the first
+    caller for a key becomes the leader and makes the call, while callers
+    arriving before it finishes wait on the leader's result instead of
+    making their own. Whatever the leader's call raises is re-raised in
+    every waiter, so none of them is left blocked.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: str, lookup: Callable[[], T | None], call: Callable[[], T]) -> T:
+        """
+        Return lookup() if it finds a value (None means a miss), otherwise
+        the result of call(), made at most once at a time for key. lookup is
+        checked under the same lock as the in-flight calls, so a result
+        stored by a finishing leader is never fetched again.
+        """
+        with self._lock:
+            value = lookup()
+            if value is not None:
+                self.hits += 1
+                return value
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = call()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+            }
@@ -0,0 +1,347 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_DIRS = {".git", "__pycache__", "node_modules", "venv", ".env"}
+
+# Files larger than this are not tokenized; they are always treated as
+# candidates and verified directly.
+MAX_INDEXED_BYTES = 5 * 1024 * 1024
+
+# Bytes sniffed to decide whether a file is binary (same heuristic as grep -I)
+BINARY_SNIFF_BYTES = 8192
+
+# ASCII letters that IGNORECASE also matches to non-ASCII letters
+# (i: dotless i and dotted capital I, s: long s, k: Kelvin sign)
+SPECIAL_FOLDS = set("iks")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    grams TEXT NOT NULL
+);
+"""
+# Bumped whenever the stored row encoding changes; older rows are dropped
+INDEX_FORMAT = "json-1"
+
+
+def _trigrams(text: str) -> set[str]:
+    """Return the set of lowercased trigrams contained in text."""
+    text = text.lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _literal_runs(parsed) -> list[str]:
+    """
+    Collect literal substrings that every match of a parsed regex must contain.
+    Anything optional or ambiguous (alternation, classes, optional repeats)
+    terminates the current run, so the result is always a safe under-estimate.
+    """
+    runs = []
+    current = []
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+        elif op is sre_parse.AT:
+            # Zero-width anchors do not break adjacency
+            continue
+        elif op is sre_parse.SUBPATTERN:
+            # (group, add_flags, del_flags, pattern)
+            flush()
+            runs.extend(_literal_runs(av[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            flush()
+            min_count, _, item = av
+            if min_count >= 1:
+                runs.extend(_literal_runs(item))
+        else:
+            flush()
+    flush()
+    return runs
+
+
+def _ignores_case(parsed) -> bool:
+    """Whether IGNORECASE applies to any literal _literal_runs would collect."""
+    if parsed.state.flags & re.IGNORECASE:
+        return True
+
+    def scoped(items) -> bool:
+        for op, av in items:
+            if op is sre_parse.SUBPATTERN:
+                if av[1] & re.IGNORECASE or scoped(av[-1]):
+                    return True
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+                if scoped(av[2]):
+                    return True
+        return False
+
+    return scoped(parsed)
+
+
+def required_trigrams(pattern: str) -> set[str]:
+    """Trigrams that must appear in any text matching the regex pattern."""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return set()
+
+    runs = _literal_runs(parsed)
+    ignorecase = _ignores_case(parsed)
+    if ignorecase and not "".join(runs).isascii():
+        # Unicode case folds (e.g. 'İ', 'ſ') do not survive str.lower()
+        return set()
+
+    required = set()
+    for run in runs:
+        if len(run) >= 3:
+            required |= _trigrams(run)
+    if ignorecase:
+        required = {gram for gram in required if not SPECIAL_FOLDS & set(gram)}
+    return required
+
+
+class CodeIndex:
+    """
+    On-disk trigram index of a workspace tree.
+
+    Each text file is reduced to its set of trigrams and stored as posting
+    lists (trigram -> relative paths). Queries intersect the postings of the
+    trigrams the regex requires and only open the surviving candidates.
+    The index is refreshed incrementally by comparing file mtimes and sizes,
+    at most once per refresh_interval seconds when searching; files written
+    through the server are re-indexed at once with update_file. Each file's
+    trigrams are persisted as one SQLite row, so a change rewrites only the
+    rows of the files that changed.
+    """
+
+    def __init__(self, root: str, index_path: str, refresh_interval: float = 2.0):
+        self.root = os.path.abspath(root)
+        self.index_path = os.path.abspath(index_path)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        # rel_path -> (mtime_ns, size, trigrams or None when unindexed)
+        self._files = {}
+        self._postings = {}
+        self._load()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _load(self):
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(SCHEMA)
+                meta = dict(conn.execute("SELECT key, value FROM meta"))
+                expected = {"root": self.root, "format": INDEX_FORMAT}
+                if any(meta.get(key) != value for key, value in expected.items()):
+                    conn.execute("DELETE FROM files")
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                        expected.items(),
+                    )
+                    return
+                rows = conn.execute(
+                    "SELECT path, mtime_ns, size, grams FROM files"
+                ).fetchall()
+            for rel_path, mtime_ns, size, grams in rows:
+                grams = json.loads(grams)
+                if isinstance(grams, list):
+                    grams = set(grams)
+                self._index(rel_path, mtime_ns, size, grams)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable code index: {e}")
+            self._files = {}
+            self._postings = {}
+
+    def _save(self, changed: set[str]):
+        """Persist the rows of changed paths (removed paths are deleted)."""
+        upserts = []
+        for rel_path in changed:
+            if rel_path in self._files:
+                mtime_ns, size, grams = self._files[rel_path]
+                # None (oversized) and False (binary) are stored as-is
+                grams = sorted(grams) if isinstance(grams, set) else grams
+                upserts.append((rel_path, mtime_ns, size, json.dumps(grams)))
+        removed = [(rel_path,) for rel_path in changed if rel_path not in self._files]
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO files (path, mtime_ns, size, grams) "
+                    "VALUES (?, ?, ?, ?)",
+                    upserts,
+                )
+                conn.executemany("DELETE FROM files WHERE path = ?", removed)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist code index: {e}")
+
+    def _walk(self):
+        """Yield (rel_path, stat) for every regular file under the root."""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS]
+            for name in filenames:
+                full_path = os.path.join(dirpath, name)
+                if full_path.startswith(self.index_path):
+                    # Never index our own index file (or its temp file)
+                    continue
+                try:
+                    st = os.stat(full_path)
+                except OSError:
+                    continue
+                yield os.path.relpath(full_path, self.root), st
+
+    def _tokenize(self, full_path: str, size: int):
+        """Return the trigram set of a file, None if too large, False if binary."""
+        if size > MAX_INDEXED_BYTES:
+            return None
+        with open(full_path, "rb") as f:
+            data = f.read()
+        if b"\0" in data[:BINARY_SNIFF_BYTES]:
+            return False
+        return _trigrams(data.decode("utf-8", errors="replace"))
+
+    def _index(self, rel_path: str, mtime_ns: int, size: int, grams):
+        self._files[rel_path] = (mtime_ns, size, grams)
+        for gram in grams or ():
+            self._postings.setdefault(gram, set()).add(rel_path)
+
+    def _remove(self, rel_path: str):
+        _, _, grams = self._files.pop(rel_path)
+        for gram in grams or ():
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(rel_path)
+                if not postings:
+                    del self._postings[gram]
+
+    def _add(self, rel_path: str, st):
+        try:
+            grams = self._tokenize(os.path.join(self.root, rel_path), st.st_size)
+        except OSError:
+            return
+        # Binary files (False) are remembered so they are not re-read each refresh
+        self._index(rel_path, st.st_mtime_ns, st.st_size, grams)
+
+    def refresh(self) -> int:
+        """Re-index files whose mtime or size changed. Returns files updated."""
+        with self._lock:
+            seen = set()
+            changed = set()
+            for rel_path, st in self._walk():
+                seen.add(rel_path)
+                entry = self._files.get(rel_path)
+                if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                    continue
+                if entry:
+                    self._remove(rel_path)
+                self._add(rel_path, st)
+                changed.add(rel_path)
+
+            for rel_path in set(self._files) - seen:
+                self._remove(rel_path)
+                changed.add(rel_path)
+
+            self._refreshed_at = time.monotonic()
+            if changed:
+                self._save(changed)
+            return len(changed)
+
+    def update_file(self, path: str):
+        """Re-index one file (absolute path) right after it was written."""
+        rel_path = os.path.relpath(os.path.abspath(path), self.root)
+        parts = rel_path.split(os.sep)
+        if (
+            parts[0] == ".."
+            or EXCLUDED_DIRS & set(parts[:-1])
+            or os.path.abspath(path).startswith(self.index_path)
+        ):
+            return
+        with self._lock:
+            if rel_path in self._files:
+                self._remove(rel_path)
+            try:
+                self._add(rel_path, os.stat(os.path.join(self.root, rel_path)))
+            except OSError:
+                pass
+            self._save({rel_path})
+
+    def candidates(self, pattern: str, scope: str = ".") -> list[str]:
+        """Relative paths of text files that may match pattern within scope."""
+        required = required_trigrams(pattern)
+        with self._lock:
+            text_files = [
+                p for p, entry in self._files.items() if entry[2] is not False
+            ]
+            if required:
+                postings = sorted(
+                    (self._postings.get(gram, set()) for gram in required), key=len
+                )
+                matched = set.intersection(*postings)
+                # Oversized files carry no trigrams and must always be verified
+                matched |= {p for p in text_files if self._files[p][2] is None}
+            else:
+                matched = set(text_files)
+
+        if scope not in ("", "."):
+            prefix = scope.rstrip(os.sep) + os.sep
+            matched = {p for p in matched if p == scope or p.startswith(prefix)}
+        return sorted(matched)
+
+    def search(self, pattern: str, path: str | None = None) -> list[str]:
+        """
+        Return grep-style "file:line:text" matches for a regex pattern.
+        Args:
+            pattern: Python regular expression.
+            path: Absolute file or directory to restrict the search to.
+        """
+        regex = re.compile(pattern)
+        refreshed_at = self._refreshed_at
+        if refreshed_at is None or (
+            time.monotonic() - refreshed_at >= self.refresh_interval
+        ):
+            self.refresh()
+
+        scope = "."
+        if path:
+            scope = os.path.relpath(os.path.abspath(path), self.root)
+
+        matches = []
+        for rel_path in self.candidates(pattern, scope):
+            full_path = os.path.join(self.root, rel_path)
+            try:
+                with open(full_path, "r", encoding="utf-8", errors="replace") as f:
+                    for lineno, line in enumerate(f, start=1):
+                        line = line.rstrip("\n")
+                        if regex.search(line):
+                            matches.append(f"{full_path}:{lineno}:{line}")
+            except OSError:
+                continue
+        return matches
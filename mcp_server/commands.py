@@ -0,0 +1,168 @@
+import shlex
+import codecs
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, NamedTuple
+
+ALLOWED_COMMANDS = {
+    "ls",
+    "grep",
+    "cat",
+    "find",
+    "pytest",
+    "git",
+    "echo",
+    "pwd",
+    "tree",
+}
+BLOCKED_OPERATORS = {">", ">>", "&", "|", ";", "`", "$("}
+
+READ_CHUNK_BYTES = 4096
+
+
+class OutputBuffer:
+    """
+    Accumulates process output within a fixed budget. Once max_chars is
+    exceeded the middle is dropped, keeping the first and last halves, which
+    is where commands like pytest put their headers and their summary.
+    """
+
+    def __init__(self, max_chars: int = 100_000):
+        max_chars = max(max_chars, 2)
+        self.head_chars = max_chars // 2
+        self.tail_chars = max_chars - self.head_chars
+        self._head: list[str] = []
+        self._head_size = 0
+        self._tail: deque[str] = deque()
+        self._tail_size = 0
+        self.dropped = 0
+
+    def write(self, text: str):
+        room = self.head_chars - self._head_size
+        if room > 0:
+            self._head.append(text[:room])
+            self._head_size += len(text[:room])
+            text = text[room:]
+        if not text:
+            return
+
+        self._tail.append(text)
+        self._tail_size += len(text)
+        # Trim whole chunks first, then the oldest partial chunk
+        while self._tail_size - len(self._tail[0]) >= self.tail_chars:
+            removed = self._tail.popleft()
+            self._tail_size -= len(removed)
+            self.dropped += len(removed)
+        excess = self._tail_size - self.tail_chars
+        if excess > 0:
+            self._tail[0] = self._tail[0][excess:]
+            self._tail_size -= excess
+            self.dropped += excess
+
+    def getvalue(self) -> str:
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        if self.dropped:
+            return f"{head}\n[... {self.dropped} characters truncated ...]\n{tail}"
+        return head + tail
+
+
+class ProcessResult(NamedTuple):
+    returncode: int | None
+    stdout: str
+    stderr: str
+    timed_out: bool
+
+
+def parse_command(command: str) -> tuple[list[str] | None, str | None]:
+    """Split and vet a command line. Returns (args, None) or (None, error)."""
+    # Security: Check for blocked operators/characters in raw string
+    for op in BLOCKED_OPERATORS:
+        if op in command:
+            return None, f"Error: Operator '{op}' is not allowed for security."
+
+    # Security: Parse command to check first token (binary)
+    args = shlex.split(command)
+    if not args:
+        return None, "Error: Empty command."
+
+    binary = args[0]
+    if binary not in ALLOWED_COMMANDS:
+        return None, f"Error: Command '{binary}' is not allowed."
+    return args, None
+
+
+async def stream_process(
+    args: list[str],
+    cwd: str,
+    timeout: float = 30.0,
+    on_output: Callable[[str], Awaitable[None]] | None = None,
+    max_chars: int = 100_000,
+    flush_interval: float = 0.5,
+) -> ProcessResult:
+    """
+    Run a process, reading stdout and stderr as they are produced.
+
+    Output is forwarded to on_output in batches (at most once per
+    flush_interval) and kept in middle-truncating buffers, so memory stays
+    bounded however much the command prints.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    buffers = {"stdout": OutputBuffer(max_chars), "stderr": OutputBuffer(max_chars)}
+    pending: list[str] = []
+
+    async def flush():
+        if pending and on_output is not None:
+            text = "".join(pending)
+            pending.clear()
+            await on_output(text)
+        pending.clear()
+
+    async def flush_periodically():
+        while True:
+            await asyncio.sleep(flush_interval)
+            await flush()
+
+    async def pump(stream, name):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            data = await stream.read(READ_CHUNK_BYTES)
+            text = decoder.decode(data, final=not data)
+            if text:
+                buffers[name].write(text)
+                pending.append(text)
+            if not data:
+                break
+
+    flusher = asyncio.create_task(flush_periodically())
+    timed_out = False
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                pump(process.stdout, "stdout"),
+                pump(process.stderr, "stderr"),
+                process.wait(),
+            ),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        timed_out = True
+    finally:
+        flusher.cancel()
+        # Also reached when the tool call is cancelled; never orphan the child
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    await flush()
+
+    return ProcessResult(
+        None if timed_out else process.returncode,
+        buffers["stdout"].getvalue(),
+        buffers["stderr"].getvalue(),
+        timed_out,
+    )
@@ -0,0 +1,221 @@
+import math
+import logging
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, NamedTuple
+
+import pypdf
+import docx
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentSlice(NamedTuple):
+    """A lazily extracted window of a paged document."""
+
+    total: int
+    window: range
+    parts: Iterator[str]
+
+
+def page_window(total: int, offset: int = 0, limit: int = 0) -> range:
+    """Clamp offset/limit (limit <= 0 means "to the end") to [0, total)."""
+    start = min(max(offset, 0), total)
+    stop = total if limit <= 0 else min(start + limit, total)
+    return range(start, stop)
+
+
+def range_header(label: str, window: range, total: int) -> str:
+    """Header telling the agent which slice it got and how to page on."""
+    if not window:
+        return f"[{label}: none returned, document has {total}]"
+    header = f"[{label} {window.start + 1}-{window.stop} of {total}"
+    if window.stop < total:
+        header += f"; next offset={window.stop}"
+    return header + "]"
+
+
+def iter_lines(path: str, offset: int = 0, limit: int = 0) -> Iterator[str]:
+    """Yield lines [offset, offset + limit) of a text file without reading the rest."""
+    offset = max(offset, 0)
+    stop = offset + limit if limit > 0 else None
+    with open(path, "r", encoding="utf-8") as f:
+        yield from itertools.islice(f, offset, stop)
+
+
+def read_bytes(path: str, offset: int = 0, limit: int = 0) -> str:
+    """Read a byte range of a file, decoding partial characters leniently."""
+    with open(path, "rb") as f:
+        f.seek(max(offset, 0))
+        data = f.read(limit if limit > 0 else -1)
+    return data.decode("utf-8", errors="replace")
+
+
+def _extract_pdf_chunk(path: str, page_numbers: list[int]) -> dict[int, str]:
+    """Worker: open the PDF once and extract a run of pages."""
+    reader = pypdf.PdfReader(path)
+    return {i: reader.pages[i].extract_text() or "" for i in page_numbers}
+
+
+class ExtractionEngine:
+    """
+    Extracts PDF pages on a process pool so long documents use every core.
+
+    Pages are split into contiguous chunks (each worker parses the file once
+    per chunk). Documents with fewer than min_parallel_pages pages to extract
+    are left to the serial path, where pool overhead would dominate.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        time_budget: float = 120.0,
+        min_parallel_pages: int = 16,
+    ):
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.time_budget = time_budget
+        self.min_parallel_pages = min_parallel_pages
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that already runs server threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _retire(self, pool: ProcessPoolExecutor):
+        """Stop handing out pool and kill its workers, which are stuck on a page."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        # ProcessPoolExecutor has no public way to stop a running worker
+        processes = list((pool._processes or {}).values())
+        for process in processes:
+            process.terminate()
+        # Pending work fails with BrokenProcessPool once the workers are gone
+        pool.shutdown(wait=False)
+        for process in processes:
+            process.join(timeout=5)
+
+    def extract_pdf(self, path: str, page_numbers: list[int]) -> dict[int, str]:
+        """
+        Extract pages in parallel within the time budget. Returns {} when the
+        request is too small to be worth fanning out; pages missing from the
+        result (e.g. after another call retired the pool) are left to the
+        serial path.
+        """
+        if self.max_workers < 2 or len(page_numbers) < self.min_parallel_pages:
+            return {}
+
+        chunk_size = math.ceil(len(page_numbers) / (self.max_workers * 2))
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_extract_pdf_chunk, path, page_numbers[i : i + chunk_size])
+            for i in range(0, len(page_numbers), chunk_size)
+        ]
+
+        results = {}
+        try:
+            for future in as_completed(futures, timeout=self.time_budget):
+                results.update(future.result())
+        except BrokenProcessPool:
+            logger.warning(f"PDF worker pool broke while extracting {path}")
+            self._retire(pool)
+        except FutureTimeoutError:
+            logger.warning(f"PDF extraction of {path} exceeded its time budget")
+            if any(future.running() for future in futures):
+                # A chunk is hung on a page; only killing its worker stops it
+                self._retire(pool)
+            else:
+                # Leave the pool, and other calls' work on it, untouched
+                for future in futures:
+                    future.cancel()
+            raise TimeoutError(
+                f"PDF extraction exceeded the {self.time_budget:g}s time budget"
+            )
+        return results
+
+
+def _cached_slice(
+    path: str,
+    kind: str,
+    offset: int,
+    limit: int,
+    cache,
+    open_document,
+    extract_many=None,
+) -> DocumentSlice:
+    """
+    Serve a window of pages, preferring the extraction cache. The document is
+    only opened when some page in the window has not been extracted before.
+    Missing pages are bulk-extracted with extract_many when it is given.
+    """
+    digest = cache.fingerprint(path) if cache else None
+    total = cache.total(digest, kind) if digest else None
+    cached = {}
+    extract = None
+
+    if total is not None:
+        window = page_window(total, offset, limit)
+        cached = cache.pages(digest, kind, window)
+    if total is None or len(cached) < len(window):
+        total_known = total is not None
+        total, extract = open_document(path)
+        window = page_window(total, offset, limit)
+    else:
+        total_known = True
+
+    def parts():
+        missing = [i for i in window if i not in cached]
+        extracted = extract_many(path, missing) if extract_many and missing else {}
+        for i in window:
+            if i in cached:
+                yield cached[i]
+                continue
+            text = extracted[i] if i in extracted else extract(i)
+            extracted[i] = text
+            yield text
+        if digest and (extracted or not total_known):
+            cache.put(digest, kind, total, extracted)
+
+    return DocumentSlice(total, window, parts())
+
+
+def _open_pdf(path: str):
+    reader = pypdf.PdfReader(path)
+    return len(reader.pages), lambda i: reader.pages[i].extract_text() or ""
+
+
+def _open_docx(path: str):
+    paragraphs = docx.Document(path).paragraphs
+    return len(paragraphs), lambda i: paragraphs[i].text
+
+
+def pdf_pages(
+    path: str, offset: int = 0, limit: int = 0, cache=None, engine=None
+) -> DocumentSlice:
+    """Extract only the PDF pages inside the window, in parallel if possible."""
+    extract_many = engine.extract_pdf if engine else None
+    return _cached_slice(path, "pdf", offset, limit, cache, _open_pdf, extract_many)
+
+
+def docx_paragraphs(
+    path: str, offset: int = 0, limit: int = 0, cache=None
+) -> DocumentSlice:
+    """Lazily yield only the DOCX paragraphs inside the window."""
+    return _cached_slice(path, "docx", offset, limit, cache, _open_docx)
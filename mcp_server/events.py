@@ -0,0 +1,101 @@
+import json
+import asyncio
+import threading
+from collections import deque
+from typing import NamedTuple
+
+
+class Event(NamedTuple):
+    id: int
+    type: str
+    data: dict
+
+
+def format_sse(event: Event) -> str:
+    """One server-sent event frame."""
+    data = json.dumps(event.data, separators=(",", ":"), default=str)
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """An event loop's view of the broadcast; get() yields events in order."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queued: int):
+        self.loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+
+    async def get(self) -> Event:
+        return await self._queue.get()
+
+    def _put(self, event: Event):
+        # Runs on the subscriber's loop
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind cannot catch up event by event; drop
+            # the backlog and have it reload the full list instead
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(Event(event.id, "resync", {}))
+
+
+class EventBroadcaster:
+    """
+    Fan-out of scheduler events to async subscribers.
+
+    publish() may be called from any thread (APScheduler listeners run in
+    the scheduler and executor threads); each subscriber receives events on
+    its own event loop. The last `history` events are kept so a reconnecting
+    client can resume from its Last-Event-ID. One that missed more than
+    that, whose id predates a server restart, or that fell more than
+    max_queued events behind gets a "resync" event instead.
+    """
+
+    def __init__(self, history: int = 256, max_queued: int = 100):
+        self.max_queued = max(max_queued, 1)
+        self._history: deque[Event] = deque(maxlen=max(history, 1))
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._last_id = 0
+
+    def publish(self, event_type: str, data: dict) -> int:
+        """Send an event to every subscriber. Returns its id."""
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, event)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                self.unsubscribe(sub)
+        return event.id
+
+    def subscribe(self, last_event_id: int | None = None) -> Subscription:
+        """
+        Subscribe the running event loop. With last_event_id, events
+        published after it are replayed first.
+        """
+        sub = Subscription(asyncio.get_running_loop(), self.max_queued)
+        with self._lock:
+            if last_event_id is not None and last_event_id != self._last_id:
+                missed = [e for e in self._history if e.id > last_event_id]
+                if not missed or missed[0].id != last_event_id + 1:
+                    missed = [Event(self._last_id, "resync", {})]
+                for event in missed:
+                    sub._put(event)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "last_id": self._last_id,
+            }
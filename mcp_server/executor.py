@@ -0,0 +1,136 @@
+import time
+import asyncio
+import inspect
+import weakref
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ToolFailure(str):
+    """
+    A tool result that reports a failure.
+
+    It is sent to the client as plain text, but lets the executor count the
+    call as an error without guessing from what the text happens to say.
+    """
+
+
+class ToolExecutor:
+    """
+    Runs MCP tools without blocking the server's event loop.
+
+    Sync tools are dispatched to a dedicated, sized thread pool; async tools
+    run on the loop as before. Each tool may carry a concurrency limit, and
+    callers over the limit wait on the loop without holding a pool thread.
+    Per-tool waiting/running/completed counts and the pool's queue depth are
+    available from stats(). When a ToolMetrics instance is given, each call's
+    latency, response size and outcome are also recorded; a call fails when
+    it raises or returns a ToolFailure.
+    """
+
+    def __init__(self, max_workers: int = 16, metrics=None):
+        self.max_workers = max_workers
+        self.metrics = metrics
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="mcp-tool"
+        )
+        self._limits: dict[str, int | None] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+        # asyncio semaphores are bound to a loop, so keep one set per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._queued = 0
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore | None:
+        limit = self._limits.get(name)
+        if not limit:
+            return None
+        per_loop = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if name not in per_loop:
+            per_loop[name] = asyncio.Semaphore(limit)
+        return per_loop[name]
+
+    def _run(self, func, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+        return func(*args, **kwargs)
+
+    def _dequeue_cancelled(self, future):
+        # A call cancelled before a pool thread picked it up never reaches _run
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def offload(self, func, limit: int | None = None):
+        """Wrap a tool function in an async callable that honours the limits."""
+        name = func.__name__
+        self._limits[name] = limit
+        stats = self._stats[name] = {"waiting": 0, "running": 0, "completed": 0}
+        is_async = inspect.iscoroutinefunction(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            semaphore = self._semaphore(name)
+            if semaphore is not None:
+                stats["waiting"] += 1
+                try:
+                    await semaphore.acquire()
+                finally:
+                    stats["waiting"] -= 1
+
+            stats["running"] += 1
+            started = time.perf_counter() if self.metrics else 0.0
+            result = None
+            failed = True
+            cancelled = False
+            try:
+                if is_async:
+                    result = await func(*args, **kwargs)
+                else:
+                    with self._lock:
+                        self._queued += 1
+                    future = self._pool.submit(self._run, func, args, kwargs)
+                    future.add_done_callback(self._dequeue_cancelled)
+                    result = await asyncio.wrap_future(future)
+                failed = False
+                return result
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                # Cancelled calls have no outcome to record
+                if self.metrics and not cancelled:
+                    self._observe(name, started, result, failed)
+                stats["running"] -= 1
+                if not cancelled:
+                    stats["completed"] += 1
+                if semaphore is not None:
+                    semaphore.release()
+
+        return wrapper
+
+    def _observe(self, name: str, started: float, result, failed: bool):
+        # Tools report most failures by returning a ToolFailure, not raising
+        text = "" if result is None else str(result)
+        self.metrics.observe(
+            name,
+            time.perf_counter() - started,
+            len(text.encode("utf-8")),
+            failed or isinstance(result, ToolFailure),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = self._queued
+        return {
+            "max_workers": self.max_workers,
+            "queued": queued,
+            "tools": {
+                name: dict(counts, limit=self._limits[name])
+                for name, counts in self._stats.items()
+            },
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
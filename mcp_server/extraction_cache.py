@@ -0,0 +1,164 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS paths (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    digest TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (digest, kind)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_last_access ON documents (last_access);
+CREATE TABLE IF NOT EXISTS pages (
+    digest TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    page_no INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (digest, kind, page_no)
+);
+"""
+
+
+class ExtractionCache:
+    """
+    Disk-backed cache of extracted document text, stored per page.
+
+    Entries are content-addressed: a file's SHA-256 identifies its pages, and
+    (path, size, mtime) is remembered so unchanged files are not re-hashed.
+    Total cached text is capped at max_bytes, evicting least recently used
+    documents first.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def fingerprint(self, path: str) -> str | None:
+        """Content digest of a file, or None if it cannot be read."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT digest FROM paths WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, st.st_size, st.st_mtime_ns),
+            ).fetchone()
+            if row:
+                return row[0]
+
+            sha = hashlib.sha256()
+            try:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                        sha.update(chunk)
+            except OSError:
+                return None
+            digest = sha.hexdigest()
+            conn.execute(
+                "INSERT OR REPLACE INTO paths (path, size, mtime_ns, digest) "
+                "VALUES (?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, digest),
+            )
+            return digest
+
+    def total(self, digest: str, kind: str) -> int | None:
+        """Page count of a cached document (marking it recently used), or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT total FROM documents WHERE digest = ? AND kind = ?",
+                (digest, kind),
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE documents SET last_access = ? WHERE digest = ? AND kind = ?",
+                (time.time(), digest, kind),
+            )
+            return row[0]
+
+    def pages(self, digest: str, kind: str, window: range) -> dict[int, str]:
+        """Cached page texts of a document that fall inside window."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT page_no, text FROM pages WHERE digest = ? AND kind = ? "
+                "AND page_no >= ? AND page_no < ?",
+                (digest, kind, window.start, window.stop),
+            ).fetchall()
+            return dict(rows)
+
+    def put(self, digest: str, kind: str, total: int, pages: dict[int, str]):
+        """Store extracted pages of a document and enforce the size cap."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO documents (digest, kind, total, size_bytes, last_access) "
+                "VALUES (?, ?, ?, 0, ?) ON CONFLICT (digest, kind) "
+                "DO UPDATE SET total = excluded.total, "
+                "last_access = excluded.last_access",
+                (digest, kind, total, time.time()),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO pages (digest, kind, page_no, text) "
+                "VALUES (?, ?, ?, ?)",
+                [(digest, kind, no, text) for no, text in pages.items()],
+            )
+            conn.execute(
+                "UPDATE documents SET size_bytes = ("
+                "SELECT COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) FROM pages "
+                "WHERE pages.digest = documents.digest AND pages.kind = documents.kind"
+                ") WHERE digest = ? AND kind = ?",
+                (digest, kind),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        used = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM documents")
+        used = used.fetchone()[0]
+        if used <= self.max_bytes:
+            return
+
+        rows = conn.execute(
+            "SELECT digest, kind, size_bytes FROM documents ORDER BY last_access"
+        ).fetchall()
+        for digest, kind, size_bytes in rows:
+            if used <= self.max_bytes:
+                break
+            conn.execute(
+                "DELETE FROM pages WHERE digest = ? AND kind = ?", (digest, kind)
+            )
+            conn.execute(
+                "DELETE FROM documents WHERE digest = ? AND kind = ?", (digest, kind)
+            )
+            used -= size_bytes
+            logger.info(f"Evicted cached {kind} text for {digest[:12]}")
@@ -0,0 +1,129 @@
+import os
+import mmap
+import difflib
+import tempfile
+from contextlib import contextmanager
+
+MAX_DIFF_LINES = 200
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+@contextmanager
+def _replacement_file(path: str):
+    """
+    Yield a binary temp file in path's directory; on success it is fsynced,
+    given path's mode and moved over path. On failure it is removed.
+
+    A symlinked path is resolved so the link itself survives. A file with
+    other hard links is rewritten in place instead, since replacing it would
+    detach it from its other names.
+    """
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path) or "."
+    try:
+        st = os.stat(path)
+        mode, links = st.st_mode & 0o7777, st.st_nlink
+    except FileNotFoundError:
+        mode, links = None, 1
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if links > 1:
+            _copy_over(tmp_path, path)
+            os.unlink(tmp_path)
+            return
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _copy_over(src_path: str, path: str):
+    """Overwrite path's contents with src_path's, keeping path's inode."""
+    with open(src_path, "rb") as src, open(path, "r+b") as dst:
+        while chunk := src.read(COPY_CHUNK_BYTES):
+            dst.write(chunk)
+        dst.truncate()
+        dst.flush()
+        os.fsync(dst.fileno())
+
+
+def atomic_write(path: str, content: str):
+    """
+    Write content to path via a temp file in the same directory and
+    os.replace, so readers never observe a partially written file. Hard
+    linked files are the exception; see _replacement_file.
+    """
+    with _replacement_file(path) as f:
+        f.write(content.encode("utf-8"))
+
+
+def mmap_replace(path: str, target_text: str, replacement_text: str) -> bool:
+    """
+    Replace the first occurrence of target_text in a file without decoding it.
+
+    The file is memory-mapped and searched for the UTF-8 bytes of the target;
+    the new file is then streamed together from the untouched regions in
+    COPY_CHUNK_BYTES pieces, so memory stays flat however large the file is.
+    Returns False, leaving the file alone, if the target is not found.
+    """
+    target = target_text.encode("utf-8")
+    with open(path, "rb") as src:
+        if not target or os.fstat(src.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            index = mm.find(target)
+            if index == -1:
+                return False
+            with _replacement_file(path) as out:
+                for start in range(0, index, COPY_CHUNK_BYTES):
+                    out.write(mm[start : min(start + COPY_CHUNK_BYTES, index)])
+                out.write(replacement_text.encode("utf-8"))
+                for start in range(index + len(target), len(mm), COPY_CHUNK_BYTES):
+                    out.write(mm[start : start + COPY_CHUNK_BYTES])
+    return True
+
+
+def apply_edits(content: str, edits: list[dict]) -> tuple[str | None, str | None]:
+    """
+    Apply ordered replacements to an in-memory buffer. Each edit replaces the
+    first occurrence of its target_text in the result of the previous edits.
+    Returns (new_content, None), or (None, error) if any target is missing.
+    """
+    for number, edit in enumerate(edits, start=1):
+        target = edit.get("target_text", "")
+        if not target:
+            return None, f"Edit {number} has no target_text"
+        if target not in content:
+            return None, f"Edit {number} target text missing"
+        content = content.replace(target, edit.get("replacement_text", ""), 1)
+    return content, None
+
+
+def compact_diff(old: str, new: str, path: str) -> str:
+    """Unified diff with one line of context, capped at MAX_DIFF_LINES."""
+    lines = list(
+        difflib.unified_diff(
+            old.splitlines(),
+            new.splitlines(),
+            fromfile=f"a/{path}",
+            tofile=f"b/{path}",
+            n=1,
+            lineterm="",
+        )
+    )
+    if len(lines) > MAX_DIFF_LINES:
+        omitted = len(lines) - MAX_DIFF_LINES
+        lines = lines[:MAX_DIFF_LINES] + [f"... ({omitted} more diff lines)"]
+    return "\n".join(lines)
@@ -0,0 +1,150 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, NamedTuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class Chunk(NamedTuple):
+    id: str
+    text: str
+    metadata: dict
+
+
+class IngestStats(NamedTuple):
+    chunks: int
+    batches: int
+    retries: int
+    seconds: float
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (httpx.TransportError, OSError))
+
+
+class EmbeddingPipeline:
+    """
+    Embeds a stream of chunks and writes them to a Chroma collection.
+
+    Chunks are grouped into multi-input embedding requests of batch_size.
+    At most concurrency batches are embedded at once, and at most as many
+    again may wait for a worker: past that, reading more chunks from the
+    input blocks, so a slow embedding server throttles ingestion instead of
+    letting batches pile up in memory. Transient failures (connection
+    errors, 429 and 5xx) are retried with exponential backoff. Embedded
+    chunks are buffered and upserted write_batch_size at a time.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        batch_size: int = 32,
+        concurrency: int = 4,
+        write_batch_size: int = 256,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        self.embedder = embedder
+        self.batch_size = max(batch_size, 1)
+        self.concurrency = max(concurrency, 1)
+        self.write_batch_size = max(write_batch_size, 1)
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def _embed(self, texts: list[str]) -> tuple[list[list[float]], int]:
+        """Embed one batch, returning (embeddings, retries used)."""
+        attempt = 0
+        while True:
+            try:
+                return self.embedder.embed(texts), attempt
+            except Exception as e:
+                if attempt >= self.max_retries or not _retryable(e):
+                    raise
+                delay = self.backoff * 2**attempt
+                logger.warning(f"Embedding batch failed ({e}); retrying in {delay}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def run(self, chunks: Iterable[Chunk], collection) -> IngestStats:
+        """Embed and store every chunk. Raises the first batch failure."""
+        started = time.perf_counter()
+        slots = threading.Semaphore(self.concurrency * 2)
+        write_lock = threading.Lock()
+        pending: list[tuple[Chunk, list[float]]] = []
+        counts = {"chunks": 0, "batches": 0, "retries": 0}
+        errors: list[Exception] = []
+
+        def flush():
+            if not pending:
+                return
+            collection.upsert(
+                ids=[c.id for c, _ in pending],
+                embeddings=[e for _, e in pending],
+                documents=[c.text for c, _ in pending],
+                metadatas=[c.metadata for c, _ in pending],
+            )
+            pending.clear()
+
+        def process(batch: list[Chunk]):
+            try:
+                if errors:
+                    return
+                embeddings, retries = self._embed([c.text for c in batch])
+                with write_lock:
+                    pending.extend(zip(batch, embeddings))
+                    counts["chunks"] += len(batch)
+                    counts["batches"] += 1
+                    counts["retries"] += retries
+                    if len(pending) >= self.write_batch_size:
+                        flush()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="embed"
+        ) as pool:
+            batch = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) < self.batch_size:
+                    continue
+                slots.acquire()
+                if errors:
+                    break
+                pool.submit(process, batch)
+                batch = []
+            else:
+                if batch:
+                    slots.acquire()
+                    pool.submit(process, batch)
+
+        if errors:
+            raise errors[0]
+        with write_lock:
+            flush()
+
+        stats = IngestStats(
+            counts["chunks"],
+            counts["batches"],
+            counts["retries"],
+            time.perf_counter() - started,
+        )
+        if stats.chunks:
+            logger.info(
+                f"Embedded {stats.chunks} chunks in {stats.batches} batches "
+                f"({stats.chunks_per_second:.1f} chunks/s, {stats.retries} retries)."
+            )
+        return stats
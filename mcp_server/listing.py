@@ -0,0 +1,231 @@
+import os
+import re
+import time
+import fnmatch
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+# Never worth descending into, whatever .gitignore says
+ALWAYS_IGNORED = {".git", "__pycache__"}
+
+
+class Entry(NamedTuple):
+    name: str
+    is_dir: bool
+    size: int
+    mtime: float
+
+
+class DirectoryCache:
+    """
+    Short-lived cache of os.scandir results with their stat info.
+
+    An entry is reused while the directory's own mtime is unchanged and it
+    is younger than ttl seconds. The mtime check catches files being added,
+    removed or renamed; the ttl bounds how stale file sizes and mtimes can
+    get, since rewriting a file in place does not touch its directory.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[int, float, list[Entry]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def scan(self, path: str) -> list[Entry]:
+        """Sorted entries of path, from the cache when still valid."""
+        mtime_ns = os.stat(path).st_mtime_ns
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached and cached[0] == mtime_ns and now - cached[1] < self.ttl:
+                self._entries.move_to_end(path)
+                return cached[2]
+
+        entries = []
+        with os.scandir(path) as it:
+            for item in it:
+                try:
+                    # Do not follow symlinks, so links cannot create cycles
+                    is_dir = item.is_dir(follow_symlinks=False)
+                    st = item.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                entries.append(
+                    Entry(item.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime)
+                )
+        entries.sort(key=lambda e: (not e.is_dir, e.name))
+
+        with self._lock:
+            self._entries[path] = (mtime_ns, now, entries)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entries
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob (with ** support) into a regex body."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            out.append("[" + pattern[i + 1 : end].replace("!", "^", 1) + "]")
+            i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+class IgnoreRule(NamedTuple):
+    base: str
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+    anchored: bool
+
+
+def parse_gitignore(text: str, base: str = "") -> list[IgnoreRule]:
+    """Rules from a .gitignore found in directory base (relative to the root)."""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        # A slash anywhere but the end anchors the pattern to base
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if not line:
+            continue
+        regex = re.compile(_glob_to_regex(line) + r"\Z")
+        rules.append(IgnoreRule(base, regex, negate, dir_only, anchored))
+    return rules
+
+
+def is_ignored(rules: list[IgnoreRule], rel_path: str, is_dir: bool) -> bool:
+    """Apply rules in order; as in git, the last matching rule wins."""
+    ignored = False
+    name = rel_path.rsplit("/", 1)[-1]
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        if rule.base:
+            if not rel_path.startswith(rule.base + "/"):
+                continue
+            local = rel_path[len(rule.base) + 1 :]
+        else:
+            local = rel_path
+        if rule.regex.match(local if rule.anchored else name):
+            ignored = not rule.negate
+    return ignored
+
+
+def walk_tree(
+    root: str,
+    cache: DirectoryCache,
+    max_depth: int = 3,
+    pattern: str = "",
+    ignore: list[str] | None = None,
+    gitignore: bool = True,
+    workspace: str | None = None,
+    max_entries: int = 0,
+) -> list[tuple[str, Entry]]:
+    """
+    Depth-first listing of root as (relative path, Entry) pairs.
+
+    Directories are listed before their contents, up to max_depth levels
+    (0 means unlimited). ignore globs prune matching files and directories by
+    name; pattern, when given, keeps only files whose name or relative path
+    matches it. When root lies inside workspace, the .gitignore files of its
+    ancestors up to workspace apply too. The walk stops once max_entries
+    entries are collected (0 means no limit).
+    """
+    ignore = ignore or []
+    results = []
+
+    def load_rules(directory: str, rel_dir: str, rules: list[IgnoreRule]):
+        if not gitignore:
+            return rules
+        try:
+            with open(os.path.join(directory, ".gitignore"), encoding="utf-8") as f:
+                return rules + parse_gitignore(f.read(), rel_dir)
+        except OSError:
+            return rules
+
+    # Rules are matched against paths relative to the workspace root
+    prefix = ""
+    rules: list[IgnoreRule] = []
+    if workspace:
+        prefix = os.path.relpath(root, workspace).replace(os.sep, "/")
+        if prefix == "." or prefix.startswith(".."):
+            prefix = ""
+        elif gitignore:
+            directory, rel_dir = workspace, ""
+            for part in prefix.split("/"):
+                rules = load_rules(directory, rel_dir, rules)
+                directory = os.path.join(directory, part)
+                rel_dir = f"{rel_dir}/{part}" if rel_dir else part
+
+    def visit(directory: str, rel_dir: str, depth: int, rules: list[IgnoreRule]):
+        base = f"{prefix}/{rel_dir}" if prefix and rel_dir else prefix or rel_dir
+        rules = load_rules(directory, base, rules)
+        try:
+            entries = cache.scan(directory)
+        except OSError:
+            return
+        for entry in entries:
+            if max_entries and len(results) >= max_entries:
+                return
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_dir and entry.name in ALWAYS_IGNORED:
+                continue
+            if any(fnmatch.fnmatch(entry.name, g) for g in ignore):
+                continue
+            match_path = f"{prefix}/{rel_path}" if prefix else rel_path
+            if rules and is_ignored(rules, match_path, entry.is_dir):
+                continue
+            if entry.is_dir:
+                if not pattern:
+                    results.append((rel_path, entry))
+                if not max_depth or depth < max_depth:
+                    visit(
+                        os.path.join(directory, entry.name), rel_path, depth + 1, rules
+                    )
+            elif not pattern or (
+                fnmatch.fnmatch(entry.name, pattern)
+                or fnmatch.fnmatch(rel_path, pattern)
+            ):
+                results.append((rel_path, entry))
+
+    visit(root, "", 1, rules)
+    return results
+
+
+def format_entry(rel_path: str, entry: Entry, details: bool = False) -> str:
+    """One listing line; directories carry a trailing slash."""
+    line = rel_path + "/" if entry.is_dir else rel_path
+    if details:
+        modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.mtime))
+        size = "-" if entry.is_dir else str(entry.size)
+        line = f"{line}\t{size}\t{modified}"
+    return line
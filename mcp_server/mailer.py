@@ -0,0 +1,189 @@
+import time
+import queue
+import smtplib
+import logging
+import threading
+from email.message import EmailMessage
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPDeliveryQueue:
+    """
+    Background delivery of report emails over one reusable SMTP connection.
+
+    enqueue() returns immediately; a worker thread drains the queue in
+    batches, sending every message of a batch over the same authenticated
+    connection. Each recipient gets their own envelope, so one refused
+    address does not bounce the report for everyone else. The connection is
+    checked with one NOOP at the start of each batch, dropped after
+    idle_timeout seconds without work, and re-established when the relay
+    has closed it.
+    Temporary failures (disconnects, 4xx replies) are retried with
+    exponential backoff; permanent ones are logged and dropped.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        user: str | None = None,
+        password: str | None = None,
+        idle_timeout: float = 60.0,
+        batch_size: int = 50,
+        max_retries: int = 3,
+        backoff: float = 2.0,
+        connect=smtplib.SMTP,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.idle_timeout = idle_timeout
+        self.batch_size = max(batch_size, 1)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._connect = connect
+        self._queue: queue.Queue = queue.Queue()
+        self._smtp = None
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats = {"sent": 0, "failed": 0, "connections": 0, "retries": 0}
+
+    def enqueue(
+        self,
+        msg: EmailMessage,
+        recipients: list[str],
+        on_done: Callable[[float, int], None] | None = None,
+    ):
+        """
+        Queue msg for delivery to each recipient. on_done, if given, is called
+        from the worker with the seconds since enqueueing and the number of
+        recipients that could not be reached.
+        """
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="smtp-delivery", daemon=True
+                )
+                self._worker.start()
+        self._queue.put((msg, list(recipients), on_done, time.monotonic()))
+
+    def join(self):
+        """Block until everything queued so far has been attempted."""
+        self._queue.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, queued=self._queue.qsize())
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._check_connection()
+            for msg, recipients, on_done, enqueued_at in batch:
+                failed = len(recipients)
+                try:
+                    failed = self._deliver(msg, recipients)
+                except Exception as e:
+                    logger.error(f"Email delivery failed: {e}")
+                finally:
+                    if on_done is not None:
+                        try:
+                            on_done(time.monotonic() - enqueued_at, failed)
+                        except Exception as e:
+                            logger.error(f"Email delivery callback failed: {e}")
+                    self._queue.task_done()
+
+    def _check_connection(self):
+        """Drop a kept connection the relay no longer answers on."""
+        if self._smtp is None:
+            return
+        try:
+            if self._smtp.noop()[0] == 250:
+                return
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._disconnect()
+
+    def _connection(self):
+        # Liveness is checked once per batch; a send on a connection that
+        # died since then fails, reconnects and is retried by _deliver
+        if self._smtp is not None:
+            return self._smtp
+
+        smtp = self._connect(self.host, self.port, timeout=30)
+        try:
+            smtp.starttls()
+            if self.user and self.password:
+                smtp.login(self.user, self.password)
+        except BaseException:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self._count("connections")
+        return smtp
+
+    def _disconnect(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _deliver(self, msg: EmailMessage, recipients: list[str]) -> int:
+        """Send to each recipient in turn. Returns how many failed."""
+        failed = 0
+        for recipient in recipients:
+            attempt = 0
+            while True:
+                try:
+                    self._connection().send_message(msg, to_addrs=[recipient])
+                    self._count("sent")
+                    break
+                except Exception as e:
+                    if attempt >= self.max_retries or not _is_temporary(e):
+                        self._count("failed")
+                        failed += 1
+                        logger.error(f"Email to {recipient} failed: {e}")
+                        break
+                    if not isinstance(
+                        e,
+                        (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused),
+                    ):
+                        # The connection itself failed; start a fresh one
+                        self._disconnect()
+                    delay = self.backoff * 2**attempt
+                    logger.warning(
+                        f"Email to {recipient} failed ({e}); retrying in {delay}s"
+                    )
+                    self._count("retries")
+                    time.sleep(delay)
+                    attempt += 1
+        return failed
+
+
+def _is_temporary(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, OSError))
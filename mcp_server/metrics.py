@@ -0,0 +1,126 @@
+import threading
+from bisect import bisect_left
+
+# Latency buckets in seconds, from fast file reads up to the 30 s command cap
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class _ToolSeries:
+    __slots__ = ("ok", "errors", "response_bytes", "buckets", "duration_sum")
+
+    def __init__(self):
+        self.ok = 0
+        self.errors = 0
+        self.response_bytes = 0
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.duration_sum = 0.0
+
+
+class ToolMetrics:
+    """
+    Per-tool call counters, latency histograms and payload sizes, rendered
+    in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._series: dict[str, _ToolSeries] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, tool: str, seconds: float, response_bytes: int, error: bool):
+        with self._lock:
+            series = self._series.get(tool)
+            if series is None:
+                series = self._series[tool] = _ToolSeries()
+            if error:
+                series.errors += 1
+            else:
+                series.ok += 1
+            series.response_bytes += response_bytes
+            series.buckets[bisect_left(DURATION_BUCKETS, seconds)] += 1
+            series.duration_sum += seconds
+
+    def render(self, executor_stats: dict | None = None) -> str:
+        """Prometheus text for all observed tools plus executor gauges."""
+        with self._lock:
+            snapshot = {
+                name: (
+                    series.ok,
+                    series.errors,
+                    series.response_bytes,
+                    list(series.buckets),
+                    series.duration_sum,
+                )
+                for name, series in sorted(self._series.items())
+            }
+
+        lines = [
+            "# HELP mcp_tool_calls_total Tool calls by outcome.",
+            "# TYPE mcp_tool_calls_total counter",
+        ]
+        for name, (ok, errors, _, _, _) in snapshot.items():
+            lines.append(f"mcp_tool_calls_total{_labels(tool=name, status='ok')} {ok}")
+            lines.append(
+                f"mcp_tool_calls_total{_labels(tool=name, status='error')} {errors}"
+            )
+
+        lines += [
+            "# HELP mcp_tool_response_bytes_total Bytes returned by tool calls.",
+            "# TYPE mcp_tool_response_bytes_total counter",
+        ]
+        for name, (_, _, response_bytes, _, _) in snapshot.items():
+            lines.append(
+                f"mcp_tool_response_bytes_total{_labels(tool=name)} {response_bytes}"
+            )
+
+        lines += [
+            "# HELP mcp_tool_duration_seconds Tool call latency.",
+            "# TYPE mcp_tool_duration_seconds histogram",
+        ]
+        for name, (_, _, _, buckets, duration_sum) in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ("+Inf",), buckets):
+                cumulative += count
+                lines.append(
+                    "mcp_tool_duration_seconds_bucket"
+                    f"{_labels(tool=name, le=bound)} {cumulative}"
+                )
+            lines.append(
+                f"mcp_tool_duration_seconds_sum{_labels(tool=name)} {duration_sum}"
+            )
+            lines.append(
+                f"mcp_tool_duration_seconds_count{_labels(tool=name)} {cumulative}"
+            )
+
+        if executor_stats is not None:
+            lines += [
+                "# HELP mcp_tool_in_flight Tool calls currently executing.",
+                "# TYPE mcp_tool_in_flight gauge",
+            ]
+            tools = executor_stats["tools"]
+            for name, counts in sorted(tools.items()):
+                lines.append(
+                    f"mcp_tool_in_flight{_labels(tool=name)} {counts['running']}"
+                )
+            lines += [
+                "# HELP mcp_tool_waiting Tool calls waiting on a concurrency limit.",
+                "# TYPE mcp_tool_waiting gauge",
+            ]
+            for name, counts in sorted(tools.items()):
+                lines.append(
+                    f"mcp_tool_waiting{_labels(tool=name)} {counts['waiting']}"
+                )
+            lines += [
+                "# HELP mcp_tool_queue_depth Calls queued for a tool thread.",
+                "# TYPE mcp_tool_queue_depth gauge",
+                f"mcp_tool_queue_depth {executor_stats['queued']}",
+            ]
+
+        return "\n".join(lines) + "\n"
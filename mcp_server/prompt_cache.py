@@ -0,0 +1,77 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from coalesce import Coalescer
+
+
+def prompt_key(model: str, prompt: str, options: dict) -> str:
+    """Cache key: model, whitespace-normalized prompt and generation options."""
+    normalized = " ".join(prompt.split())
+    payload = json.dumps([model, normalized, options], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """
+    Short-lived cache of LLM results for scheduled prompts.
+
+    Jobs that fire together with the same model, prompt and options share
+    one generation: the first caller generates, concurrent callers wait on
+    its result, and callers within ttl seconds reuse it. Failed generations,
+    and results the cacheable check rejects, are not kept for later callers.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._calls = Coalescer()
+        self._lock = threading.Lock()
+
+    def get_or_generate(
+        self,
+        model: str,
+        prompt: str,
+        options: dict,
+        generate: Callable[[], str],
+        fresh: bool = False,
+        cacheable: Callable[[str], bool] = bool,
+    ) -> str:
+        """
+        Return a cached result for the prompt, or call generate() once for it.
+        fresh=True ignores finished results but still joins a generation that
+        is in flight.
+        """
+        if self.ttl <= 0:
+            return generate()
+
+        key = prompt_key(model, prompt, options)
+
+        def lookup() -> str | None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if not fresh and entry and time.monotonic() - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                self._entries.pop(key, None)
+                return None
+
+        def generate_and_store() -> str:
+            result = generate()
+            if cacheable(result):
+                with self._lock:
+                    self._entries[key] = (time.monotonic(), result)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return result
+
+        return self._calls.run(key, lookup, generate_and_store)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return dict(self._calls.stats(), entries=entries)
@@ -0,0 +1,288 @@
+"""
+Warm pytest worker.
+
+A long-lived "zygote" process imports pytest and its plugins once, then
+forks a fresh child for every test run, several at a time. Each child
+starts with the warm imports but no state from earlier runs, so repeated
+invocations skip interpreter startup and plugin discovery. The parent
+restarts the zygote whenever the workspace's Python or pytest configuration
+files change.
+
+Run as a script, this module is the zygote: it reads one JSON request per
+line on stdin and, as each child exits, answers with a JSON line on stdout
+carrying the request's id.
+"""
+
+import os
+import sys
+import json
+import time
+import select
+import signal
+import hashlib
+import logging
+import tempfile
+import itertools
+import threading
+import subprocess
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_DIRS = {".git", "__pycache__", "node_modules", "venv", ".venv", ".env"}
+CONFIG_FILES = {"pytest.ini", "pyproject.toml", "setup.cfg", "tox.ini"}
+
+
+class PytestRun(NamedTuple):
+    returncode: int | None
+    stdout: str
+    stderr: str
+    timed_out: bool
+
+
+def workspace_fingerprint(root: str) -> str:
+    """Digest of the paths and mtimes of Python and pytest config files."""
+    sha = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS)
+        for name in sorted(filenames):
+            if name.endswith(".py") or name in CONFIG_FILES:
+                try:
+                    mtime = os.stat(os.path.join(dirpath, name)).st_mtime_ns
+                except OSError:
+                    continue
+                sha.update(f"{dirpath}/{name}:{mtime}\n".encode())
+    return sha.hexdigest()
+
+
+class PytestWorker:
+    """
+    Parent-side handle on the warm zygote process.
+
+    Runs are tagged with an id so several can be in flight at once; a reader
+    thread hands each response back to the run waiting for it. The lock only
+    covers starting or replacing the zygote and sending a request.
+    """
+
+    # Extra wait beyond a run's own timeout before giving up on the zygote
+    RESPONSE_GRACE = 10.0
+
+    def __init__(self, workspace: str, warm_modules: list[str] | None = None):
+        self.workspace = workspace
+        self.warm_modules = warm_modules or []
+        self._process = None
+        self._pending: dict[int, Future] = {}
+        self._fingerprint = None
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _start(self, fingerprint: str):
+        self._retire()
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), *self.warm_modules],
+            cwd=self.workspace,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            ready = json.loads(process.stdout.readline() or "{}")
+        except ValueError:
+            ready = {}
+        if not isinstance(ready, dict) or ready.get("status") != "ready":
+            process.kill()
+            process.wait()
+            raise RuntimeError("pytest worker failed to start")
+
+        pending: dict[int, Future] = {}
+        threading.Thread(
+            target=self._read_responses, args=(process, pending), daemon=True
+        ).start()
+        self._process, self._pending = process, pending
+        self._fingerprint = fingerprint
+        logger.info("Warm pytest worker started.")
+
+    @staticmethod
+    def _read_responses(process: subprocess.Popen, pending: dict[int, Future]):
+        """Resolve runs as their responses arrive; fail the rest at exit."""
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+                future = pending.pop(response["id"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            future.set_result(response)
+        process.wait()
+        for request_id in list(pending):
+            future = pending.pop(request_id, None)
+            if future is not None:
+                future.set_exception(RuntimeError("pytest worker exited unexpectedly"))
+
+    def _retire(self):
+        """Let the current zygote finish its runs in flight, then exit."""
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            self._process = None
+
+    def _stop(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    def run(self, args: list[str], timeout: float = 30.0) -> PytestRun:
+        """Run pytest with args in a forked child of the warm zygote."""
+        fingerprint = workspace_fingerprint(self.workspace)
+        with tempfile.TemporaryDirectory(prefix="pytest-worker-") as tmp:
+            request = {
+                "id": next(self._ids),
+                "args": args,
+                "cwd": self.workspace,
+                "stdout": os.path.join(tmp, "stdout"),
+                "stderr": os.path.join(tmp, "stderr"),
+                "timeout": timeout,
+            }
+            future = Future()
+            with self._lock:
+                if (
+                    self._process is None
+                    or self._process.poll() is not None
+                    or fingerprint != self._fingerprint
+                ):
+                    self._start(fingerprint)
+                self._pending[request["id"]] = future
+                try:
+                    self._process.stdin.write(json.dumps(request) + "\n")
+                    self._process.stdin.flush()
+                except (OSError, ValueError):
+                    self._pending.pop(request["id"], None)
+                    self._stop()
+                    raise RuntimeError("pytest worker exited unexpectedly")
+
+            try:
+                response = future.result(timeout=timeout + self.RESPONSE_GRACE)
+            except FutureTimeoutError:
+                raise RuntimeError("pytest worker stopped responding")
+
+            outputs = {}
+            for name in ("stdout", "stderr"):
+                try:
+                    with open(request[name], encoding="utf-8", errors="replace") as f:
+                        outputs[name] = f.read()
+                except OSError:
+                    outputs[name] = ""
+
+        return PytestRun(
+            response["returncode"],
+            outputs["stdout"],
+            outputs["stderr"],
+            response["timed_out"],
+        )
+
+
+def _serve():
+    """Zygote loop: pre-import, then fork one child per request."""
+    # Keep stray prints from plugins or preloaded modules off the protocol pipe
+    protocol = sys.stdout
+    sys.stdout = sys.stderr
+
+    import pytest  # noqa: F401
+    from _pytest.config import get_plugin_manager
+
+    # Importing every pytest11 plugin now is what the children get for free
+    get_plugin_manager().load_setuptools_entrypoints("pytest11")
+
+    sys.path.insert(0, os.getcwd())
+    for module in sys.argv[1:]:
+        try:
+            __import__(module)
+        except Exception as e:
+            print(f"pytest worker: cannot preload {module}: {e}", file=sys.stderr)
+    sys.path.pop(0)
+
+    print(json.dumps({"status": "ready"}), file=protocol, flush=True)
+
+    # Children run concurrently; once stdin closes, finish them and exit
+    children: dict[int, tuple[int, float]] = {}
+    buffered = b""
+    accepting = True
+    while accepting or children:
+        if accepting and select.select([0], [], [], 0.02)[0]:
+            chunk = os.read(0, 65536)
+            accepting = bool(chunk)
+            buffered += chunk
+            while b"\n" in buffered:
+                line, buffered = buffered.split(b"\n", 1)
+                request = json.loads(line)
+                pid = os.fork()
+                if pid == 0:
+                    _run_child(request)
+                children[pid] = (request["id"], time.monotonic() + request["timeout"])
+        elif not accepting:
+            time.sleep(0.02)
+
+        for pid, (request_id, deadline) in list(children.items()):
+            done, status = os.waitpid(pid, os.WNOHANG)
+            timed_out = False
+            if not done:
+                if time.monotonic() <= deadline:
+                    continue
+                timed_out = True
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    # The child may not have become a group leader yet
+                    os.kill(pid, signal.SIGKILL)
+                _, status = os.waitpid(pid, 0)
+            del children[pid]
+
+            returncode = None if timed_out else os.waitstatus_to_exitcode(status)
+            print(
+                json.dumps(
+                    {"id": request_id, "returncode": returncode, "timed_out": timed_out}
+                ),
+                file=protocol,
+                flush=True,
+            )
+
+
+def _run_child(request: dict):
+    """Forked child: isolate, redirect output and run pytest, never returning."""
+    code = 1
+    try:
+        os.setsid()
+        os.chdir(request["cwd"])
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        for fd, path in ((1, request["stdout"]), (2, request["stderr"])):
+            out = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.dup2(out, fd)
+        sys.stdin = open(0, closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", closefd=False)
+
+        import pytest
+
+        # Plugins were imported by the zygote before pytest's assertion
+        # rewriting hook existed; that is expected, so do not warn about it
+        args = ["-W", "ignore::pytest.PytestAssertRewriteWarning", *request["args"]]
+        code = int(pytest.main(args))
+    except BaseException as e:
+        print(f"pytest worker: {e}", file=sys.stderr)
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,200 @@
+import math
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    status TEXT NOT NULL,
+    scheduled_at REAL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    queue_delay REAL,
+    llm_seconds REAL,
+    ttft REAL,
+    tokens INTEGER,
+    email_seconds REAL,
+    email_status TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_task_runs_job ON task_runs (job_id, started_at);
+"""
+
+COLUMNS = (
+    "id",
+    "job_id",
+    "title",
+    "status",
+    "scheduled_at",
+    "started_at",
+    "finished_at",
+    "queue_delay",
+    "llm_seconds",
+    "ttft",
+    "tokens",
+    "email_seconds",
+    "email_status",
+    "error",
+)
+
+# Runs per job considered when computing percentiles
+SUMMARY_WINDOW = 500
+
+# Retention: runs kept per job, and the age (seconds) past which runs are
+# dropped whatever their job (covers jobs that no longer exist)
+KEEP_RUNS = 1000
+MAX_AGE = 90 * 24 * 3600
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile (q in 0-100) of values, None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class RunHistory:
+    """
+    SQLite log of scheduled task executions.
+
+    A row is inserted when a run starts and updated as it progresses, so
+    running jobs are visible too. Email delivery happens asynchronously and
+    updates its run's row when it completes. Starting a run prunes its job
+    to the newest keep_runs rows and drops rows older than max_age seconds.
+    """
+
+    def __init__(
+        self, db_path: str, keep_runs: int = KEEP_RUNS, max_age: float = MAX_AGE
+    ):
+        self.db_path = db_path
+        self.keep_runs = keep_runs
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def start(
+        self, job_id: str, title: str, scheduled_at: float | None = None
+    ) -> int | None:
+        """Record a run as started. Returns its id, None if it was not recorded."""
+        started_at = time.time()
+        queue_delay = None if scheduled_at is None else started_at - scheduled_at
+        try:
+            with self._lock, self._connect() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO task_runs "
+                    "(job_id, title, status, scheduled_at, started_at, queue_delay) "
+                    "VALUES (?, ?, 'running', ?, ?, ?)",
+                    (job_id, title, scheduled_at, started_at, queue_delay),
+                )
+                self._prune(conn, job_id, started_at)
+                return cursor.lastrowid
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to record task run: {e}")
+            return None
+
+    def _prune(self, conn: sqlite3.Connection, job_id: str, now: float):
+        if self.keep_runs > 0:
+            conn.execute(
+                "DELETE FROM task_runs WHERE job_id = ? AND started_at < ("
+                "SELECT started_at FROM task_runs WHERE job_id = ? "
+                "ORDER BY started_at DESC LIMIT 1 OFFSET ?)",
+                (job_id, job_id, self.keep_runs - 1),
+            )
+        if self.max_age > 0:
+            conn.execute(
+                "DELETE FROM task_runs WHERE started_at < ?", (now - self.max_age,)
+            )
+
+    def update(self, run_id: int | None, **fields):
+        """Set columns on a run; unknown or missing runs are ignored."""
+        fields = {k: v for k, v in fields.items() if k in COLUMNS and k != "id"}
+        if run_id is None or not fields:
+            return
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    f"UPDATE task_runs SET {assignments} WHERE id = ?",
+                    (*fields.values(), run_id),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to update task run: {e}")
+
+    def runs(self, job_id: str, limit: int = 50) -> list[dict]:
+        """Most recent runs of a job, newest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM task_runs "
+                "WHERE job_id = ? ORDER BY started_at DESC LIMIT ?",
+                (job_id, limit),
+            ).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def summary(self, job_id: str | None = None) -> dict:
+        """
+        Duration, queue delay and LLM latency percentiles per job, over each
+        job's last SUMMARY_WINDOW finished runs.
+        """
+        # Number each job's finished runs newest first; only the window is read
+        where = "finished_at IS NOT NULL"
+        params: tuple = ()
+        if job_id is not None:
+            where += " AND job_id = ?"
+            params = (job_id,)
+        query = (
+            "SELECT job_id, title, status, duration, queue_delay, llm_seconds FROM ("
+            "SELECT job_id, title, status, finished_at - started_at AS duration, "
+            "queue_delay, llm_seconds, ROW_NUMBER() OVER ("
+            "PARTITION BY job_id ORDER BY started_at DESC) AS recency "
+            f"FROM task_runs WHERE {where}) WHERE recency <= ? ORDER BY recency"
+        )
+        with self._connect() as conn:
+            rows = conn.execute(query, (*params, SUMMARY_WINDOW)).fetchall()
+
+        grouped: dict[str, dict] = {}
+        for job, title, status, duration, delay, llm in rows:
+            entry = grouped.setdefault(
+                job,
+                {"title": title, "errors": 0, "durations": [], "delays": [], "llm": []},
+            )
+            entry["durations"].append(duration)
+            if status != "ok":
+                entry["errors"] += 1
+            if delay is not None:
+                entry["delays"].append(delay)
+            if llm is not None:
+                entry["llm"].append(llm)
+
+        return {
+            job: {
+                "title": entry["title"],
+                "runs": len(entry["durations"]),
+                "errors": entry["errors"],
+                "p50_duration": percentile(entry["durations"], 50),
+                "p95_duration": percentile(entry["durations"], 95),
+                "p50_queue_delay": percentile(entry["delays"], 50),
+                "p95_queue_delay": percentile(entry["delays"], 95),
+                "p50_llm_seconds": percentile(entry["llm"], 50),
+                "p95_llm_seconds": percentile(entry["llm"], 95),
+            }
+            for job, entry in grouped.items()
+        }
@@ -1,12 +1,40 @@
 import os
-import smtplib
+import json
+import math
+import time
+import hashlib
+import uuid
+import heapq
+import itertools
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from contextvars import ContextVar
 from email.message import EmailMessage
+from typing import NamedTuple
+from apscheduler.events import (
+    EVENT_JOB_ADDED,
+    EVENT_JOB_ERROR,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_MODIFIED,
+    EVENT_JOB_REMOVED,
+    EVENT_JOB_SUBMITTED,
+)
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.triggers.cron import CronTrigger
 import httpx
 import logging
 
+from events import EventBroadcaster
+from executor import ToolFailure
+from mailer import SMTPDeliveryQueue
+from prompt_cache import PromptCache
+from run_history import RunHistory
+
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,22 +45,336 @@ JOB_STORES = {
     "default": SQLAlchemyJobStore(url=f"sqlite:///{DB_PATH}"),  # noqa: E231
 }
 
+# Run history lives next to the job store
+RUNS_DB_PATH = os.path.join(os.path.dirname(DB_PATH), "task_runs.db")
+run_history = RunHistory(
+    RUNS_DB_PATH,
+    keep_runs=int(os.getenv("TASK_RUNS_KEEP", 1000)),
+    max_age=float(os.getenv("TASK_RUNS_MAX_AGE_DAYS", 90)) * 24 * 3600,
+)
+
+# Id of the run being executed in the current job thread, if any
+current_run: ContextVar[int | None] = ContextVar("current_run", default=None)
+
+# Executor sizing and job defaults
+SCHEDULER_THREADS = int(os.getenv("SCHEDULER_THREADS", 8))
+JOB_MAX_INSTANCES = int(os.getenv("SCHEDULER_MAX_INSTANCES", 1))
+JOB_MISFIRE_GRACE = int(os.getenv("SCHEDULER_MISFIRE_GRACE", 300))
+JOB_COALESCE = os.getenv("SCHEDULER_COALESCE", "true").lower() not in ("0", "false")
+
+# LLM call priorities (lower runs first)
+PRIORITY_MANUAL = 0
+PRIORITY_SCHEDULED = 10
+
+
+class PriorityGate:
+    """
+    Limits concurrent calls to a shared backend, admitting waiters by
+    priority and then arrival order.
+
+    Jobs that fire together queue here instead of all hitting Ollama at
+    once, and a manually triggered run overtakes a backlog of cron jobs.
+    """
+
+    def __init__(self, max_concurrent: int = 1):
+        self.max_concurrent = max(max_concurrent, 1)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: list[tuple[int, int, threading.Event]] = []
+        self._counter = itertools.count()
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_SCHEDULED):
+        with self._lock:
+            if self._active < self.max_concurrent and not self._waiters:
+                self._active += 1
+                event = None
+            else:
+                event = threading.Event()
+                heapq.heappush(self._waiters, (priority, next(self._counter), event))
+        if event is not None:
+            # The releasing call hands its slot straight to us
+            event.wait()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            if self._waiters:
+                _, _, event = heapq.heappop(self._waiters)
+                event.set()
+            else:
+                self._active -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "active": self._active,
+                "waiting": len(self._waiters),
+            }
+
+
+llm_gate = PriorityGate(int(os.getenv("LLM_MAX_CONCURRENT", 1)))
+
+# Ollama connection. Connecting fails fast; reads allow for slow generations.
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://ollama:11434")
+OLLAMA_MODEL = os.getenv("LLM_MODEL", "llama3.1:latest")
+OLLAMA_TIMEOUT = httpx.Timeout(
+    connect=float(os.getenv("LLM_CONNECT_TIMEOUT", 5)),
+    read=float(os.getenv("LLM_READ_TIMEOUT", 120)),
+    write=10.0,
+    pool=10.0,
+)
+_ollama_client = None
+_ollama_client_lock = threading.Lock()
+
+# Identical prompts fired together share one generation (0 disables)
+prompt_cache = PromptCache(ttl=float(os.getenv("PROMPT_CACHE_TTL", 600)))
+
+# Report email delivery queue, created on first send
+_mailer = None
+_mailer_lock = threading.Lock()
+
+# Default per-run generation budget; tasks may set their own
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", 2048))
+LLM_MAX_DURATION = float(os.getenv("LLM_MAX_DURATION", 300))
+
+# Report bodies for generations that did not complete; never cached
+NO_RESPONSE = "No response from LLM."
+TRUNCATION_NOTE = "\n\n[Report truncated: {} budget reached]"
+TRUNCATION_NOTES = tuple(
+    TRUNCATION_NOTE.format(reason) for reason in ("max_tokens", "max_duration")
+)
+
+
+class GenerationResult(NamedTuple):
+    text: str
+    tokens: int
+    ttft: float | None  # seconds to the first token
+    duration: float
+    stopped: str | None  # "max_tokens", "max_duration" or None if finished
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.duration if self.duration > 0 else 0.0
+
+
+# job id -> scheduled times of submitted runs that have not started yet,
+# filled in by the scheduler's submission listener
+_scheduled_run_times: dict[str, deque] = {}
+_scheduled_ready = threading.Condition()
+
+# How long a starting cron run waits for its submission to be recorded
+SCHEDULED_TIME_WAIT = 1.0
+
+
+def _record_scheduled_times(job_id: str, run_times: list[datetime]):
+    with _scheduled_ready:
+        _scheduled_run_times.setdefault(job_id, deque()).extend(
+            t.timestamp() for t in run_times
+        )
+        _scheduled_ready.notify_all()
+
+
+def _pop_scheduled_time(job_id: str, wait: float = SCHEDULED_TIME_WAIT) -> float | None:
+    """The due time of a job's oldest waiting run, skipping ones long missed."""
+    cutoff = time.time() - JOB_MISFIRE_GRACE
+
+    def waiting():
+        times = _scheduled_run_times.get(job_id)
+        # Runs that misfired past the grace time were skipped, never started
+        while times and times[0] < cutoff:
+            times.popleft()
+        return bool(times)
+
+    with _scheduled_ready:
+        # The listener runs just after the job is handed to a thread, so a
+        # run that starts at once may get here first
+        scheduled_at = None
+        if _scheduled_ready.wait_for(waiting, wait):
+            scheduled_at = _scheduled_run_times[job_id].popleft()
+        if not _scheduled_run_times.get(job_id):
+            _scheduled_run_times.pop(job_id, None)
+    return scheduled_at
+
+
+def _check_budget(max_tokens, max_duration) -> ToolFailure | None:
+    """Error message for an invalid task generation budget, None if valid."""
+    # bool is an int subclass, but true/false is never a meaningful budget
+    if max_tokens is not None and (
+        isinstance(max_tokens, bool)
+        or not isinstance(max_tokens, int)
+        or max_tokens <= 0
+    ):
+        return ToolFailure("Error: max_tokens must be a positive integer.")
+    if max_duration is not None and (
+        isinstance(max_duration, bool)
+        or not isinstance(max_duration, (int, float))
+        or not math.isfinite(max_duration)
+        or max_duration <= 0
+    ):
+        return ToolFailure("Error: max_duration must be a positive number of seconds.")
+    return None
+
 
 class TaskScheduler:
     def __init__(self):
-        self.scheduler = BackgroundScheduler(jobstores=JOB_STORES)
+        self.scheduler = BackgroundScheduler(
+            jobstores=JOB_STORES,
+            executors={"default": ThreadPoolExecutor(SCHEDULER_THREADS)},
+            job_defaults={
+                "coalesce": JOB_COALESCE,
+                "max_instances": JOB_MAX_INSTANCES,
+                "misfire_grace_time": JOB_MISFIRE_GRACE,
+            },
+        )
+        # Task metadata kept alongside the job store, so listing tasks does
+        # not unpickle every job; rebuilt from the store only at startup
+        self._tasks: dict[str, dict] = {}
+        self._triggers: dict[str, CronTrigger] = {}
+        self._tasks_lock = threading.Lock()
+        self._tasks_version = 0
+        self._snapshot = None
+        # Task changes and run progress, pushed to dashboard clients
+        self.events = EventBroadcaster(
+            history=int(os.getenv("SCHEDULER_EVENT_HISTORY", 256))
+        )
+        # One-off manual run job id -> the task it runs
+        self._manual_runs: dict[str, str] = {}
+        self.scheduler.add_listener(
+            self._on_job_event,
+            EVENT_JOB_ADDED
+            | EVENT_JOB_MODIFIED
+            | EVENT_JOB_SUBMITTED
+            | EVENT_JOB_EXECUTED
+            | EVENT_JOB_ERROR
+            | EVENT_JOB_MISSED
+            | EVENT_JOB_REMOVED,
+        )
         self.scheduler.start()
+        for job in self.scheduler.get_jobs():
+            # Jobs created before run history was added do not know their own id
+            if "job_id" not in job.kwargs:
+                job.modify(kwargs={**job.kwargs, "job_id": job.id})
+            if isinstance(job.trigger, CronTrigger):
+                self._remember_task(job.id, job.name, job.args, job.trigger)
         logger.info("Task Scheduler started.")
 
+    def _remember_task(self, job_id: str, title: str, args, trigger: CronTrigger):
+        # Job args: [title, prompt, recipients]
+        task = {
+            "id": job_id,
+            "title": title,
+            "prompt": args[1] if len(args) > 1 else "",
+            "schedule": str(trigger),
+            "recipients": list(args[2]) if len(args) > 2 else [],
+        }
+        with self._tasks_lock:
+            # add_task and the job-added listener both report a new task
+            if self._tasks.get(job_id) == task:
+                return
+            self._tasks[job_id] = task
+            self._triggers[job_id] = trigger
+            self._tasks_version += 1
+            task = dict(self._tasks[job_id], next_run=str(self._next_run(job_id)))
+        self.events.publish("task_added", task)
+
+    def _forget_task(self, job_id: str):
+        with self._tasks_lock:
+            task = self._tasks.pop(job_id, None)
+            if task is None:
+                return
+            self._triggers.pop(job_id, None)
+            self._tasks_version += 1
+        self.events.publish("task_removed", {"id": job_id})
+
+    def _next_run(self, job_id: str, now: datetime | None = None):
+        # Callers hold _tasks_lock
+        now = now or datetime.now(timezone.utc)
+        return self._triggers[job_id].get_next_fire_time(None, now)
+
+    def _sync_task(self, job_id: str):
+        """Refresh a task's projection from the job store after a change."""
+        job = self.scheduler.get_job(job_id)
+        if job is not None and isinstance(job.trigger, CronTrigger):
+            self._remember_task(job.id, job.name, job.args, job.trigger)
+        else:
+            # Gone, or no longer recurring (one-off manual runs are never known)
+            self._forget_task(job_id)
+
+    def _on_job_event(self, event):
+        """APScheduler listener: syncs the task projection, relays run progress."""
+        if event.code in (EVENT_JOB_ADDED, EVENT_JOB_MODIFIED):
+            self._sync_task(event.job_id)
+            return
+        if event.code == EVENT_JOB_REMOVED:
+            # Cron tasks are removed through delete_task (already forgotten)
+            # or directly on the scheduler; manual runs once they are done
+            self._forget_task(event.job_id)
+            return
+
+        with self._tasks_lock:
+            if event.code == EVENT_JOB_SUBMITTED and event.job_id in self._tasks:
+                # Lets the cron run measure how long it waited for a thread
+                _record_scheduled_times(event.job_id, event.scheduled_run_times)
+            if event.code == EVENT_JOB_SUBMITTED:
+                task_id = self._manual_runs.get(event.job_id, event.job_id)
+            else:
+                task_id = self._manual_runs.pop(event.job_id, event.job_id)
+            if task_id not in self._tasks:
+                return
+            next_run = None
+            if task_id == event.job_id and event.code in (
+                EVENT_JOB_SUBMITTED,
+                EVENT_JOB_MISSED,
+            ):
+                # A cron firing (or skipping) moves the task's next run on
+                next_run = str(self._next_run(task_id))
+
+        manual = task_id != event.job_id
+        if event.code == EVENT_JOB_SUBMITTED:
+            self.events.publish("run_started", {"id": task_id, "manual": manual})
+        elif event.code == EVENT_JOB_MISSED:
+            self.events.publish("run_missed", {"id": task_id})
+        else:
+            status = "error" if event.exception else event.retval or "ok"
+            self.events.publish(
+                "run_finished",
+                {
+                    "id": task_id,
+                    "manual": manual,
+                    "status": status,
+                    "error": str(event.exception) if event.exception else None,
+                },
+            )
+        if next_run is not None:
+            self.events.publish("next_run", {"id": task_id, "next_run": next_run})
+
     def add_task(
-        self, title: str, prompt: str, schedule_cron: str, recipients: list[str]
+        self,
+        title: str,
+        prompt: str,
+        schedule_cron: str,
+        recipients: list[str],
+        max_tokens: int | None = None,
+        max_duration: float | None = None,
     ):
-        """schedule_cron expected format: '* * * * *' (standard cron)"""
+        """
+        schedule_cron expected format: '* * * * *' (standard cron)
+        max_tokens/max_duration override the default generation budget;
+        when given they must be a positive integer / positive number.
+        """
+        error = _check_budget(max_tokens, max_duration)
+        if error:
+            return error
         try:
             # Parse simple 5-part cron
             parts = schedule_cron.split()
             if len(parts) != 5:
-                return (
+                return ToolFailure(
                     "Error: Schedule must be in standard 5-part cron format "
                     "(e.g., '0 8 * * *')."
                 )
@@ -45,121 +387,337 @@ class TaskScheduler:
                 day_of_week=parts[4],
             )
 
+            job_id = uuid.uuid4().hex
+            kwargs = {"job_id": job_id}
+            if max_tokens is not None:
+                kwargs["max_tokens"] = max_tokens
+            if max_duration is not None:
+                kwargs["max_duration"] = max_duration
+
             job = self.scheduler.add_job(
                 execute_prompt_and_email,
                 trigger=trigger,
                 args=[title, prompt, recipients],
+                kwargs=kwargs,
+                id=job_id,
                 name=title,
                 replace_existing=True,
             )
+            self._remember_task(job_id, title, [title, prompt, recipients], trigger)
             return f"Task '{title}' scheduled successfully (Job ID: {job.id})."
         except Exception as e:
             logger.error(f"Failed to add task: {e}")
-            return f"Error scheduling task: {str(e)}"
+            return ToolFailure(f"Error scheduling task: {str(e)}")
 
     def list_tasks(self):
-        jobs = self.scheduler.get_jobs()
-        if not jobs:
+        tasks = self.get_tasks()
+        if not tasks:
             return "No scheduled tasks found."
 
         result = "Scheduled Tasks:\n"
-        for job in jobs:
-            # next_run_time is timezone aware, might need str()
-            result += f"- [{job.id}] {job.name} (Next Run: {job.next_run_time})\n"
+        for task in tasks:
+            next_run = task["next_run"]
+            result += f"- [{task['id']}] {task['title']} (Next Run: {next_run})\n"
         return result
 
     def delete_task(self, job_id: str):
         try:
             self.scheduler.remove_job(job_id)
+            self._forget_task(job_id)
             return f"Task {job_id} deleted."
         except Exception as e:
-            return f"Error deleting task: {str(e)}"
+            return ToolFailure(f"Error deleting task: {str(e)}")
 
     def get_tasks(self):
         """Returns a list of tasks as dictionaries for the API."""
-        jobs = self.scheduler.get_jobs()
-        tasks = []
-        for job in jobs:
-            # Job args: [title, prompt, recipients]
-            tasks.append(
-                {
-                    "id": job.id,
-                    "title": job.name,
-                    "prompt": job.args[1] if len(job.args) > 1 else "",
-                    "schedule": str(job.trigger),
-                    "next_run": str(job.next_run_time),
-                    "recipients": job.args[2] if len(job.args) > 2 else [],
-                }
+        return self.tasks_snapshot()[1]
+
+    def tasks_snapshot(self) -> tuple[str, list[dict]]:
+        """
+        (etag, tasks) for the API. The list is rebuilt only when a task is
+        added or removed, or when the earliest next run has passed; the etag
+        changes exactly when the list does.
+        """
+        now = datetime.now(timezone.utc)
+        with self._tasks_lock:
+            snapshot = self._snapshot
+            if (
+                snapshot is not None
+                and snapshot[0] == self._tasks_version
+                and (snapshot[1] is None or now < snapshot[1])
+            ):
+                return snapshot[2], snapshot[3]
+
+            tasks = []
+            next_runs = []
+            for job_id, task in self._tasks.items():
+                next_run = self._next_run(job_id, now)
+                if next_run is not None:
+                    next_runs.append(next_run)
+                tasks.append(dict(task, next_run=str(next_run)))
+            digest = hashlib.sha1(
+                json.dumps(tasks, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+            etag = f'"{digest}"'
+            self._snapshot = (
+                self._tasks_version,
+                min(next_runs, default=None),
+                etag,
+                tasks,
             )
-        return tasks
+            return etag, tasks
+
+    def stats(self) -> dict:
+        """Executor sizing, job defaults and the LLM queue, for the API."""
+        return {
+            "threads": SCHEDULER_THREADS,
+            "max_instances": JOB_MAX_INSTANCES,
+            "misfire_grace_time": JOB_MISFIRE_GRACE,
+            "coalesce": JOB_COALESCE,
+            "llm": llm_gate.stats(),
+            "prompt_cache": prompt_cache.stats(),
+            "events": self.events.stats(),
+        }
+
+    def get_runs(self, job_id: str, limit: int = 50) -> dict:
+        """Recent runs of a job and their aggregate timings, for the API."""
+        return {
+            "job_id": job_id,
+            "summary": run_history.summary(job_id).get(job_id),
+            "runs": run_history.runs(job_id, limit),
+        }
+
+    def runs_summary(self) -> list[dict]:
+        """Per-job run timings, slowest p95 duration first."""
+        summary = [
+            dict(stats, job_id=job_id)
+            for job_id, stats in run_history.summary().items()
+        ]
+        return sorted(summary, key=lambda s: s["p95_duration"] or 0, reverse=True)
 
     def run_task(self, job_id: str):
         """Manually trigger a task immediately."""
         job = self.scheduler.get_job(job_id)
         if not job:
-            return f"Error: Job {job_id} not found."
+            return ToolFailure(f"Error: Job {job_id} not found.")
 
         # Execute in background to avoid blocking API
         # job.func is execute_prompt_and_email
         # job.args are [title, prompt, recipients]
-        self.scheduler.add_job(job.func, args=job.args, name=f"Manual Run: {job.name}")
+        # Registered first: the run may start before add_job returns
+        manual_id = uuid.uuid4().hex
+        with self._tasks_lock:
+            self._manual_runs[manual_id] = job.id
+        self.scheduler.add_job(
+            job.func,
+            args=job.args,
+            kwargs={
+                **job.kwargs,
+                "job_id": job.id,
+                "priority": PRIORITY_MANUAL,
+                "scheduled_at": time.time(),
+            },
+            id=manual_id,
+            name=f"Manual Run: {job.name}",
+        )
         return f"Task '{job.name}' triggered manually."
 
 
-def execute_prompt_and_email(title: str, prompt: str, recipients: list[str]):
+def execute_prompt_and_email(
+    title: str,
+    prompt: str,
+    recipients: list[str],
+    priority: int = PRIORITY_SCHEDULED,
+    max_tokens: int | None = None,
+    max_duration: float | None = None,
+    job_id: str | None = None,
+    scheduled_at: float | None = None,
+):
     """Job Execution Logic"""
     logger.info(f"Executing job: {title}")
+    run_id = None
+    if job_id is not None:
+        if scheduled_at is None:
+            scheduled_at = _pop_scheduled_time(job_id)
+        run_id = run_history.start(job_id, title, scheduled_at)
+    current_run.set(run_id)
+    status = "ok"
+    error = None
+    budget = {
+        k: v
+        for k, v in (("max_tokens", max_tokens), ("max_duration", max_duration))
+        if v
+    }
+
+    def generate():
+        with llm_gate.slot(priority):
+            return generate_llm_response(prompt, **budget)
 
-    # 1. Generate Content (Call Ollama)
+    # 1. Generate Content (Call Ollama, queued behind higher-priority calls).
+    # Jobs with the same prompt wait on one shared call outside the gate.
+    llm_started = time.monotonic()
+    # A manual run asks for a new report, so it only joins a call in flight
     try:
-        report_content = generate_llm_response(prompt)
+        report_content = prompt_cache.get_or_generate(
+            OLLAMA_MODEL,
+            prompt,
+            budget,
+            generate,
+            fresh=priority == PRIORITY_MANUAL,
+            cacheable=is_complete_report,
+        )
     except Exception as e:
         logger.error(f"LLM Generation failed: {e}")
         report_content = f"Error generating report: {str(e)}"
+        status, error = "llm_error", str(e)
+    run_history.update(run_id, llm_seconds=time.monotonic() - llm_started)
 
     # 2. Send Email
     try:
         send_email(title, report_content, recipients)
-        logger.info(f"Email sent for {title}")
+        logger.info(f"Email queued for {title}")
     except Exception as e:
         logger.error(f"Email failed: {e}")
+        run_history.update(run_id, email_status="error")
+        if status == "ok":
+            status, error = "email_error", str(e)
 
+    run_history.update(run_id, status=status, error=error, finished_at=time.time())
+    return status
 
-def generate_llm_response(prompt: str) -> str:
-    """Calls Ollama to generate text."""
-    # Assuming Ollama is at http://ollama:11434
-    url = "http://ollama:11434/api/generate"
+
+def get_ollama_client() -> httpx.Client:
+    """Shared keep-alive client for all scheduler jobs' Ollama calls."""
+    global _ollama_client
+    with _ollama_client_lock:
+        if _ollama_client is None:
+            _ollama_client = httpx.Client(
+                base_url=OLLAMA_HOST,
+                timeout=OLLAMA_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=SCHEDULER_THREADS,
+                    max_keepalive_connections=llm_gate.max_concurrent,
+                    keepalive_expiry=120,
+                ),
+            )
+        return _ollama_client
+
+
+def stream_generation(
+    prompt: str,
+    max_tokens: int = LLM_MAX_TOKENS,
+    max_duration: float = LLM_MAX_DURATION,
+) -> GenerationResult:
+    """
+    Stream a completion from Ollama, stopping at the token or time budget.
+
+    Closing the stream early makes Ollama abandon the generation, so a
+    runaway prompt frees the GPU for the next queued job.
+    """
     payload = {
-        "model": "llama3.1:latest",  # Use default model
+        "model": OLLAMA_MODEL,
         "prompt": prompt,
-        "stream": False,
+        "stream": True,
+        "options": {"num_predict": max_tokens},
     }
 
-    # Use httpx for sync request (since we are in a background thread, sync is fine)
-    response = httpx.post(url, json=payload, timeout=120.0)
-    response.raise_for_status()
-    return response.json().get("response", "No response from LLM.")
+    started = time.monotonic()
+    ttft = None
+    parts = []
+    tokens = 0
+    stopped = None
+    with get_ollama_client().stream("POST", "/api/generate", json=payload) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise RuntimeError(chunk["error"])
+            if chunk.get("response"):
+                if ttft is None:
+                    ttft = time.monotonic() - started
+                parts.append(chunk["response"])
+                tokens += 1
+            if chunk.get("done"):
+                tokens = chunk.get("eval_count", tokens)
+                if chunk.get("done_reason") == "length":
+                    stopped = "max_tokens"
+                break
+            if tokens >= max_tokens:
+                stopped = "max_tokens"
+                break
+            if time.monotonic() - started > max_duration:
+                stopped = "max_duration"
+                break
+
+    return GenerationResult(
+        "".join(parts), tokens, ttft, time.monotonic() - started, stopped
+    )
+
+
+def generate_llm_response(
+    prompt: str,
+    max_tokens: int = LLM_MAX_TOKENS,
+    max_duration: float = LLM_MAX_DURATION,
+) -> str:
+    """Calls Ollama to generate text."""
+    result = stream_generation(prompt, max_tokens, max_duration)
+    run_history.update(current_run.get(), tokens=result.tokens, ttft=result.ttft)
+    ttft = f"{result.ttft:.2f}s" if result.ttft is not None else "n/a"
+    logger.info(
+        f"LLM generated {result.tokens} tokens in {result.duration:.1f}s "
+        f"(TTFT {ttft}, {result.tokens_per_second:.1f} tokens/s)"
+    )
+    if not result.text:
+        return NO_RESPONSE
+    if result.stopped:
+        logger.warning(f"LLM generation stopped early: {result.stopped}")
+        return result.text + TRUNCATION_NOTE.format(result.stopped)
+    return result.text
+
+
+def is_complete_report(text: str) -> bool:
+    """False for empty, fallback and budget-truncated reports."""
+    return bool(text) and text != NO_RESPONSE and not text.endswith(TRUNCATION_NOTES)
+
+
+def get_mailer() -> SMTPDeliveryQueue | None:
+    """Shared delivery queue for report emails, None if SMTP is not configured."""
+    global _mailer
+    smtp_host = os.getenv("SMTP_HOST")
+    if not smtp_host:
+        return None
+    with _mailer_lock:
+        if _mailer is None:
+            _mailer = SMTPDeliveryQueue(
+                smtp_host,
+                int(os.getenv("SMTP_PORT", 587)),
+                os.getenv("SMTP_USER"),
+                os.getenv("SMTP_PASS"),
+                idle_timeout=float(os.getenv("SMTP_IDLE_TIMEOUT", 60)),
+            )
+        return _mailer
 
 
 def send_email(subject: str, body: str, recipients: list[str]):
-    """Sends email via SMTP."""
+    """Queues an email for delivery via SMTP."""
     msg = EmailMessage()
     msg.set_content(body)
     msg["Subject"] = f"[Report] {subject}"
     msg["From"] = os.getenv("EMAIL_FROM", "nebulus@local")
     msg["To"] = ", ".join(recipients)
 
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", 587))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_pass = os.getenv("SMTP_PASS")
-
-    if not smtp_host:
+    run_id = current_run.get()
+    mailer = get_mailer()
+    if mailer is None:
         logger.warning("SMTP Config missing. Skipping email.")
+        run_history.update(run_id, email_status="skipped")
         return
 
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        server.starttls()
-        if smtp_user and smtp_pass:
-            server.login(smtp_user, smtp_pass)
-        server.send_message(msg)
+    def on_done(seconds: float, failed: int):
+        run_history.update(
+            run_id, email_seconds=seconds, email_status="failed" if failed else "sent"
+        )
+
+    mailer.enqueue(msg, recipients, on_done=on_done)
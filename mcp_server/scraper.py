@@ -0,0 +1,305 @@
+import re
+import time
+import asyncio
+import threading
+from html.parser import HTMLParser
+from collections import OrderedDict, defaultdict
+from typing import Awaitable, Callable, NamedTuple
+from urllib.parse import urlsplit
+
+import httpx
+from bs4 import BeautifulSoup
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/91.0.4472.124 Safari/537.36"
+)
+
+# One pooled client per event loop (httpx connection pools are loop-bound)
+_clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive HTTP/2 client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    for stale in [other for other in _clients if other.is_closed()]:
+        del _clients[stale]
+
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=True,
+            timeout=15.0,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                keepalive_expiry=30.0,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+def html_to_text(html: str) -> str:
+    """Strip scripts/styles from an HTML document and collapse whitespace."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Remove scripts and styles
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Get text
+    text = soup.get_text(separator="\n")
+
+    # Clean whitespace
+    lines = (line.strip() for line in text.splitlines())
+    # Collapse internal whitespace
+    cleaned_lines = (re.sub(r"\s+", " ", line) for line in lines)
+    return "\n".join(line for line in cleaned_lines if line)
+
+
+class StreamingTextExtractor(HTMLParser):
+    """
+    Incremental equivalent of html_to_text for documents fed in chunks.
+
+    Text nodes are cleaned as soon as the next tag closes them, script/style
+    content is dropped, and once max_chars of text have been collected the
+    extractor reports done so the caller can stop downloading.
+    """
+
+    SKIPPED_TAGS = {"script", "style"}
+
+    def __init__(self, max_chars: int = 0):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.lines: list[str] = []
+        self.size = 0
+        self.truncated = False
+        self._pending: list[str] = []
+        self._skip_depth = 0
+
+    @property
+    def done(self) -> bool:
+        return self.truncated
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            # A text node may arrive split across chunks; join it at the next tag
+            self._pending.append(data)
+
+    def _flush(self):
+        if not self._pending or self.truncated:
+            self._pending.clear()
+            return
+        text = "".join(self._pending)
+        self._pending.clear()
+        for line in text.splitlines():
+            line = " ".join(line.split())
+            if not line:
+                continue
+            # The joining newline counts against the budget like any other char
+            separator = 1 if self.lines else 0
+            if self.max_chars:
+                remaining = self.max_chars - self.size - separator
+                if remaining <= 0:
+                    self.truncated = True
+                    break
+                if len(line) > remaining:
+                    line = line[:remaining]
+                    self.truncated = True
+            self.lines.append(line)
+            self.size += separator + len(line)
+            if self.truncated:
+                break
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+class CachedPage(NamedTuple):
+    text: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of scraped page text.
+
+    Entries younger than ttl seconds are served without touching the network.
+    Older entries are revalidated with If-None-Match / If-Modified-Since so an
+    unchanged page costs a 304 instead of a download and re-parse.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedPage] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> CachedPage | None:
+        with self._lock:
+            page = self._entries.get(url)
+            if page is not None:
+                self._entries.move_to_end(url)
+            return page
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.monotonic() - page.fetched_at < self.ttl
+
+    def put(self, url: str, page: CachedPage):
+        size = len(page.text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._size -= len(old.text)
+            self._entries[url] = page
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.text)
+
+    def revalidated(self, url: str, page: CachedPage):
+        """Record a 304: the cached text is good for another ttl."""
+        self.put(url, page._replace(fetched_at=time.monotonic()))
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if max_chars and len(text) > max_chars:
+        return f"{text[:max_chars]}\n[Truncated after {max_chars} characters]"
+    return text
+
+
+async def stream_text(
+    url: str,
+    client: httpx.AsyncClient,
+    max_chars: int,
+    cache: ResponseCache | None = None,
+) -> str:
+    """
+    Download a page in chunks, extracting text as it arrives, and stop the
+    download as soon as max_chars characters of text have been collected.
+    """
+    cached = cache.get(url) if cache else None
+    if cached and cache.is_fresh(cached):
+        return _truncate(cached.text, max_chars)
+
+    headers = {"User-Agent": USER_AGENT}
+    if cached and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached and cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+
+    extractor = StreamingTextExtractor(max_chars)
+    async with client.stream("GET", url, headers=headers) as response:
+        if cached and response.status_code == 304:
+            cache.revalidated(url, cached)
+            return _truncate(cached.text, max_chars)
+        response.raise_for_status()
+
+        async for chunk in response.aiter_text():
+            extractor.feed(chunk)
+            if extractor.done:
+                # Leaving the context manager closes the connection mid-body
+                break
+    extractor.close()
+
+    text = extractor.text()
+    if extractor.truncated:
+        return f"{text}\n[Truncated after {max_chars} characters]"
+
+    # Only complete pages are cached, so later calls can slice them freely
+    if cache and "no-store" not in response.headers.get("cache-control", ""):
+        cache.put(
+            url,
+            CachedPage(
+                text,
+                response.headers.get("etag"),
+                response.headers.get("last-modified"),
+                time.monotonic(),
+            ),
+        )
+    return text
+
+
+async def fetch_text(
+    url: str, client: httpx.AsyncClient, cache: ResponseCache | None = None
+) -> str:
+    """Download a page (or reuse/revalidate a cached copy) and return its text."""
+    cached = cache.get(url) if cache else None
+    if cached and cache.is_fresh(cached):
+        return cached.text
+
+    headers = {"User-Agent": USER_AGENT}
+    if cached and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached and cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+
+    response = await client.get(url, headers=headers)
+    if cached and response.status_code == 304:
+        cache.revalidated(url, cached)
+        return cached.text
+    response.raise_for_status()
+
+    # Parsing is CPU bound; keep it off the event loop
+    text = await asyncio.to_thread(html_to_text, response.text)
+
+    if cache and "no-store" not in response.headers.get("cache-control", ""):
+        cache.put(
+            url,
+            CachedPage(
+                text,
+                response.headers.get("etag"),
+                response.headers.get("last-modified"),
+                time.monotonic(),
+            ),
+        )
+    return text
+
+
+async def map_bounded(
+    urls: list[str],
+    fetch: Callable[[str], Awaitable[str]],
+    concurrency: int = 5,
+    per_host: int = 2,
+) -> list[str]:
+    """
+    Run fetch(url) for every URL concurrently, returning results in input
+    order. At most concurrency requests run overall and at most per_host
+    against any single host, so one site is never hammered by a batch.
+    """
+    overall = asyncio.Semaphore(max(concurrency, 1))
+    hosts = defaultdict(lambda: asyncio.Semaphore(max(per_host, 1)))
+
+    async def run(url: str) -> str:
+        # Wait for the host slot first so queued same-host URLs hold no global slot
+        async with hosts[urlsplit(url).hostname or ""]:
+            async with overall:
+                return await fetch(url)
+
+    return await asyncio.gather(*(run(url) for url in urls))
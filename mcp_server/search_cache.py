@@ -0,0 +1,124 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable
+
+from coalesce import Coalescer
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_results (
+    key TEXT PRIMARY KEY,
+    results TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def normalize_query(query: str, max_results: int) -> str:
+    """Cache key: case- and whitespace-insensitive query plus result count."""
+    return f"{' '.join(query.lower().split())}|{max_results}"
+
+
+class SearchCache:
+    """
+    TTL cache for web search results with in-flight request coalescing.
+
+    Results live in an in-memory LRU and, when db_path is set, in SQLite so
+    they survive restarts. Concurrent callers asking for the same normalized
+    query while it is being fetched wait on the first caller's request
+    instead of issuing their own.
+    """
+
+    def __init__(
+        self, ttl: float = 900.0, max_entries: int = 256, db_path: str | None = None
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries: OrderedDict[str, tuple[float, list]] = OrderedDict()
+        self._calls = Coalescer()
+        self._lock = threading.Lock()
+        if db_path:
+            with self._connect() as conn:
+                conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _lookup(self, key: str) -> list | None:
+        """Fresh cached results from memory, then disk."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._entries.pop(key, None)
+
+        if self.db_path:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT results, created_at FROM search_results WHERE key = ?",
+                    (key,),
+                ).fetchone()
+            if row and now - row[1] < self.ttl:
+                results = json.loads(row[0])
+                with self._lock:
+                    self._remember(key, row[1], results)
+                return results
+        return None
+
+    def _remember(self, key: str, created_at: float, results: list):
+        self._entries[key] = (created_at, results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _store(self, key: str, results: list):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, results)
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO search_results "
+                        "(key, results, created_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(results), created_at),
+                    )
+                    conn.execute(
+                        "DELETE FROM search_results WHERE created_at < ?",
+                        (created_at - self.ttl,),
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist search results: {e}")
+
+    def get_or_fetch(
+        self, query: str, max_results: int, fetch: Callable[[], list]
+    ) -> list:
+        """Return cached results for query, or call fetch() exactly once for it."""
+        key = normalize_query(query, max_results)
+
+        def fetch_and_store() -> list:
+            results = list(fetch())
+            self._store(key, results)
+            return results
+
+        return self._calls.run(key, lambda: self._lookup(key), fetch_and_store)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return dict(self._calls.stats(), entries=entries)
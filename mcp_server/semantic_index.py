@@ -0,0 +1,286 @@
+import os
+import hashlib
+import logging
+import threading
+from urllib.parse import urlparse
+
+import httpx
+import chromadb
+
+from code_index import EXCLUDED_DIRS, BINARY_SNIFF_BYTES
+from ingest import Chunk, EmbeddingPipeline, IngestStats
+
+logger = logging.getLogger(__name__)
+
+# Source and prose files worth embedding; logs and data files are left to search_code
+INDEXED_EXTENSIONS = {
+    ".py", ".js", ".ts", ".tsx", ".jsx", ".go", ".rs", ".java", ".c", ".h",
+    ".cpp", ".hpp", ".cs", ".rb", ".php", ".sh", ".sql", ".html", ".css",
+    ".md", ".rst", ".txt", ".toml", ".yml", ".yaml", ".json", ".ini", ".cfg",
+}  # fmt: skip
+MAX_INDEXED_BYTES = 1024 * 1024
+
+CHUNK_LINES = 60
+CHUNK_OVERLAP = 10
+
+
+def chunk_lines(
+    text: str, size: int = CHUNK_LINES, overlap: int = CHUNK_OVERLAP
+) -> list[tuple[int, int, str]]:
+    """Split text into overlapping (start_line, end_line, text) windows."""
+    lines = text.splitlines(keepends=True)
+    chunks = []
+    step = max(size - overlap, 1)
+    for start in range(0, len(lines), step):
+        body = "".join(lines[start : start + size])
+        if body.strip():
+            chunks.append((start + 1, min(start + size, len(lines)), body))
+        if start + size >= len(lines):
+            break
+    return chunks
+
+
+class OllamaEmbedder:
+    """Embeds text batches with an Ollama embedding model."""
+
+    # nomic-embed-text expects these task prefixes on its inputs
+    DOCUMENT_PREFIX = "search_document: "
+    QUERY_PREFIX = "search_query: "
+
+    def __init__(
+        self, base_url: str, model: str = "nomic-embed-text", timeout: float = 120.0
+    ):
+        self.url = base_url.rstrip("/") + "/api/embed"
+        self.model = model
+        # One pooled client so batches reuse connections to Ollama
+        self._client = httpx.Client(timeout=timeout)
+
+    def embed(self, texts: list[str], query: bool = False) -> list[list[float]]:
+        prefix = self.QUERY_PREFIX if query else self.DOCUMENT_PREFIX
+        response = self._client.post(
+            self.url,
+            json={"model": self.model, "input": [prefix + t for t in texts]},
+        )
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+
+def connect_chroma(url: str, collection: str):
+    """Get or create a collection on a ChromaDB server given as an http URL."""
+    parsed = urlparse(url)
+    client = chromadb.HttpClient(
+        host=parsed.hostname or "localhost",
+        port=parsed.port or 8000,
+        ssl=parsed.scheme == "https",
+    )
+    return client.get_or_create_collection(
+        collection, metadata={"hnsw:space": "cosine"}
+    )
+
+
+class SemanticIndex:
+    """
+    Embedding index of a workspace tree stored in a ChromaDB collection.
+
+    Files are split into overlapping line windows. Each chunk's id is the
+    hash of its path and content, so a refresh only embeds chunks whose text
+    changed and deletes the ids a file no longer produces. Files are
+    re-read only when their mtime or size changes, and new chunks are
+    embedded and stored in batches by an EmbeddingPipeline. The collection
+    is opened lazily, so the server starts even when ChromaDB is not
+    reachable yet.
+
+    A search refreshes at most search_refresh_files files before querying;
+    any remaining work continues on a background thread, and `pending`
+    stays true until the index has caught up with the tree.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        embedder: OllamaEmbedder,
+        open_collection,
+        pipeline: EmbeddingPipeline | None = None,
+        search_refresh_files: int = 50,
+    ):
+        self.root = os.path.abspath(root)
+        self.embedder = embedder
+        self.pipeline = pipeline or EmbeddingPipeline(embedder)
+        self.search_refresh_files = search_refresh_files
+        self.last_ingest: IngestStats | None = None
+        self.pending = True
+        self._open_collection = open_collection
+        self._collection = None
+        # _lock serializes refreshes; _state_lock guards _files and the
+        # collection handle, and is only held briefly so searches can read
+        # them while a long refresh runs
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._background: threading.Thread | None = None
+        # rel_path -> (mtime_ns, size, chunk ids)
+        self._files: dict[str, tuple[int, int, set[str]]] = {}
+
+    @property
+    def collection(self):
+        with self._state_lock:
+            if self._collection is None:
+                self._collection = self._open_collection()
+                self._load_existing()
+            return self._collection
+
+    def _load_existing(self):
+        """Learn which chunk ids a previous run already stored, per file."""
+        stored = self._collection.get(include=["metadatas"])
+        for chunk_id, meta in zip(stored["ids"], stored["metadatas"]):
+            entry = self._files.setdefault(meta["path"], (0, -1, set()))
+            entry[2].add(chunk_id)
+
+    def _walk(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [
+                d for d in dirnames if d not in EXCLUDED_DIRS and not d.startswith(".")
+            ]
+            for name in filenames:
+                if os.path.splitext(name)[1].lower() not in INDEXED_EXTENSIONS:
+                    continue
+                full_path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full_path)
+                except OSError:
+                    continue
+                if st.st_size <= MAX_INDEXED_BYTES:
+                    yield os.path.relpath(full_path, self.root), st
+
+    def _read(self, rel_path: str) -> str | None:
+        try:
+            with open(os.path.join(self.root, rel_path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b"\0" in data[:BINARY_SNIFF_BYTES]:
+            return None
+        return data.decode("utf-8", errors="replace")
+
+    def _file_chunks(self, rel_path: str, text: str) -> dict[str, Chunk]:
+        chunks = {}
+        for start, end, body in chunk_lines(text):
+            chunk_id = hashlib.sha1(f"{rel_path}\0{body}".encode()).hexdigest()
+            chunks[chunk_id] = Chunk(
+                chunk_id,
+                body,
+                {"path": rel_path, "start_line": start, "end_line": end},
+            )
+        return chunks
+
+    def refresh(self, max_files: int = 0) -> int:
+        """
+        Embed changed chunks and drop removed ones. Returns files updated.
+
+        With max_files > 0 the refresh stops after that many changed files
+        and leaves `pending` set; removed files are only dropped once a
+        refresh has walked the whole tree.
+        """
+        with self._lock:
+            collection = self.collection
+            updates = {}
+            stale = []
+            complete = True
+
+            def changed_chunks():
+                # Generated lazily so the pipeline's backpressure also paces
+                # how fast files are read and chunked
+                nonlocal complete
+                seen = set()
+                for rel_path, st in self._walk():
+                    seen.add(rel_path)
+                    entry = self._files.get(rel_path)
+                    if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                        continue
+                    if max_files and len(updates) >= max_files:
+                        complete = False
+                        return
+                    old_ids = entry[2] if entry else set()
+                    chunks = self._file_chunks(rel_path, self._read(rel_path) or "")
+                    updates[rel_path] = (st.st_mtime_ns, st.st_size, set(chunks))
+                    stale.extend(old_ids - chunks.keys())
+                    for chunk_id, chunk in chunks.items():
+                        if chunk_id not in old_ids:
+                            yield chunk
+                for rel_path in set(self._files) - seen:
+                    updates[rel_path] = None
+                    stale.extend(self._files[rel_path][2])
+
+            self.last_ingest = self.pipeline.run(changed_chunks(), collection)
+            if stale:
+                collection.delete(ids=stale)
+
+            # Only record files once their chunks are stored, so a failed
+            # refresh is retried in full next time
+            with self._state_lock:
+                for rel_path, entry in updates.items():
+                    if entry is None:
+                        del self._files[rel_path]
+                    else:
+                        self._files[rel_path] = entry
+            self.pending = not complete
+
+            if updates:
+                logger.info(f"Semantic index updated {len(updates)} files.")
+            return len(updates)
+
+    def refresh_in_background(self):
+        """Start a full refresh on a daemon thread unless one is running."""
+        if self._background is not None and self._background.is_alive():
+            return
+        self._background = threading.Thread(
+            target=self._refresh_logged, name="semantic-index", daemon=True
+        )
+        self._background.start()
+
+    def _refresh_logged(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"Background semantic index refresh failed: {e}")
+
+    def search(self, query: str, n_results: int = 5, scope: str = ".") -> list[dict]:
+        """
+        Nearest chunks to query, optionally limited to paths under scope.
+
+        While a background refresh is running the query is served from
+        what is already stored rather than waiting for it.
+        """
+        if self._background is None or not self._background.is_alive():
+            self.refresh(max_files=self.search_refresh_files)
+            if self.pending:
+                self.refresh_in_background()
+
+        prefix = os.path.relpath(os.path.abspath(scope), self.root)
+        with self._state_lock:
+            scoped = {
+                path: len(chunk_ids)
+                for path, (_, _, chunk_ids) in self._files.items()
+                if prefix == "." or path == prefix or path.startswith(prefix + "/")
+            }
+        total = sum(scoped.values())
+        if not total:
+            return []
+
+        if prefix == ".":
+            where = None
+        elif len(scoped) == 1:
+            where = {"path": next(iter(scoped))}
+        else:
+            where = {"path": {"$in": list(scoped)}}
+        result = self.collection.query(
+            query_embeddings=self.embedder.embed([query], query=True),
+            n_results=min(n_results, total),
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            dict(meta, text=doc, score=1 - distance)
+            for doc, meta, distance in zip(
+                result["documents"][0], result["metadatas"][0], result["distances"][0]
+            )
+        ]
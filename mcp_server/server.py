@@ -1,17 +1,37 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from duckduckgo_search import DDGS
 import os
+import time
+import asyncio
+import logging
 import subprocess
-import shlex
 import re
 import httpx
-from bs4 import BeautifulSoup
-from starlette.responses import JSONResponse
+from starlette.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from starlette.staticfiles import StaticFiles
 from starlette.requests import Request
-import pypdf
-import docx
 from scheduler import TaskScheduler
+from code_index import CodeIndex
+import documents
+from extraction_cache import ExtractionCache
+import scraper
+from search_cache import SearchCache
+from executor import ToolExecutor, ToolFailure
+from metrics import ToolMetrics
+import commands
+from pytest_worker import PytestWorker
+import fileops
+import listing
+from semantic_index import SemanticIndex, OllamaEmbedder, connect_chroma
+from ingest import EmbeddingPipeline
+from events import format_sse
+
+logger = logging.getLogger(__name__)
 
 # Initialize FastMCP
 mcp = FastMCP("Black Box Tools")
@@ -19,11 +39,131 @@ mcp = FastMCP("Black Box Tools")
 # Initialize Scheduler
 scheduler = TaskScheduler()
 
+# Initialize Tool Metrics (disable with METRICS_ENABLED=false to skip timing)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false")
+tool_metrics = ToolMetrics() if METRICS_ENABLED else None
+
+# Initialize Tool Executor (blocking tools run on this pool, not the event loop)
+tool_executor = ToolExecutor(
+    max_workers=int(os.getenv("TOOL_THREADS", 16)), metrics=tool_metrics
+)
+
+
+def tool(limit: int | None = None):
+    """
+    Register a function as an MCP tool, executed through the tool executor.
+    The undecorated function is returned so it stays directly callable.
+    Args:
+        limit: Maximum concurrent calls of this tool (None for no limit).
+    """
+
+    def decorator(func):
+        mcp.tool()(tool_executor.offload(func, limit))
+        return func
+
+    return decorator
+
+
+# Initialize Code Index (built lazily on first search, refreshed by mtime)
+CODE_INDEX_PATH = os.getenv(
+    "CODE_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "code_index.db"),
+)
+code_index = CodeIndex(
+    "/workspace",
+    CODE_INDEX_PATH,
+    refresh_interval=float(os.getenv("CODE_INDEX_REFRESH_INTERVAL", 2)),
+)
+
+# Initialize Semantic Index (workspace chunks embedded by Ollama, kept in ChromaDB)
+CHROMA_HOST = os.getenv("CHROMA_HOST", "http://chromadb:8000")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://ollama:11434")
+embedder = OllamaEmbedder(OLLAMA_HOST, os.getenv("EMBED_MODEL", "nomic-embed-text"))
+semantic_index = SemanticIndex(
+    "/workspace",
+    embedder,
+    lambda: connect_chroma(
+        CHROMA_HOST, os.getenv("SEMANTIC_COLLECTION", "workspace_chunks")
+    ),
+    EmbeddingPipeline(
+        embedder,
+        batch_size=int(os.getenv("EMBED_BATCH_SIZE", 32)),
+        concurrency=int(os.getenv("EMBED_CONCURRENCY", 4)),
+    ),
+    search_refresh_files=int(os.getenv("SEMANTIC_SEARCH_REFRESH_FILES", 50)),
+)
+
+# Initialize Directory Cache (scandir results reused while a dir is unchanged)
+directory_cache = listing.DirectoryCache(ttl=float(os.getenv("DIRECTORY_CACHE_TTL", 5)))
+
+# Initialize Extraction Cache (extracted PDF/DOCX text, LRU-capped on disk)
+EXTRACTION_CACHE_PATH = os.getenv(
+    "EXTRACTION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "extraction_cache.db"),
+)
+extraction_cache = ExtractionCache(
+    EXTRACTION_CACHE_PATH,
+    max_bytes=int(os.getenv("EXTRACTION_CACHE_MAX_MB", 256)) * 1024 * 1024,
+)
+
+# Initialize Scrape Cache (page text, revalidated with ETag/Last-Modified)
+scrape_cache = scraper.ResponseCache(
+    ttl=float(os.getenv("SCRAPE_CACHE_TTL", 300)),
+    max_bytes=int(os.getenv("SCRAPE_CACHE_MAX_MB", 32)) * 1024 * 1024,
+)
+
+# Initialize Search Cache (normalized queries, TTL, optional SQLite persistence)
+search_cache = SearchCache(
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", 900)),
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", 256)),
+    db_path=os.getenv("SEARCH_CACHE_PATH") or None,
+)
+
+# Streaming command limits (seconds, characters kept from each stream)
+COMMAND_TIMEOUT = float(os.getenv("COMMAND_TIMEOUT", 300))
+COMMAND_MAX_OUTPUT = int(os.getenv("COMMAND_MAX_OUTPUT", 100_000))
+
+# Files at least this large are edited through mmap instead of being decoded
+EDIT_MMAP_THRESHOLD = int(os.getenv("EDIT_MMAP_THRESHOLD_MB", 8)) * 1024 * 1024
+
+# Initialize Warm Pytest Worker (forks pre-imported pytest for each run)
+pytest_worker = None
+if hasattr(os, "fork") and os.getenv("PYTEST_WARM_WORKER", "true").lower() not in (
+    "0",
+    "false",
+):
+    pytest_worker = PytestWorker(
+        "/workspace",
+        warm_modules=[
+            m.strip()
+            for m in os.getenv("PYTEST_WARM_MODULES", "").split(",")
+            if m.strip()
+        ],
+    )
+
+# Comment line sent on idle event streams so proxies keep them open
+SSE_KEEPALIVE = float(os.getenv("SSE_KEEPALIVE", 15))
+
+# Batch scraping limits (overall cap on requested concurrency, per-host cap)
+SCRAPE_MAX_CONCURRENCY = int(os.getenv("SCRAPE_MAX_CONCURRENCY", 10))
+SCRAPE_PER_HOST = int(os.getenv("SCRAPE_PER_HOST", 2))
+
+# Initialize PDF Extraction Engine (process pool, started on first large PDF)
+extraction_engine = documents.ExtractionEngine(
+    max_workers=int(os.getenv("PDF_WORKERS", 0)) or None,
+    time_budget=float(os.getenv("PDF_TIME_BUDGET", 120)),
+)
+
 
 # Tool: Schedule Task
-@mcp.tool()
+@tool()
 def schedule_task(
-    title: str, prompt: str, schedule_cron: str, recipients_str: str
+    title: str,
+    prompt: str,
+    schedule_cron: str,
+    recipients_str: str,
+    max_tokens: int = 0,
+    max_duration: int = 0,
 ) -> str:
     """
     Schedule a recurring task that emails a report.
@@ -32,20 +172,29 @@ def schedule_task(
         prompt: Instructions for the LLM
         schedule_cron: Cron expression (e.g., "0 8 * * *")
         recipients_str: Comma-separated email addresses
+        max_tokens: Stop the report after this many tokens (0 = default)
+        max_duration: Stop the report after this many seconds (0 = default)
     """
     recipients = [r.strip() for r in recipients_str.split(",") if r.strip()]
-    return scheduler.add_task(title, prompt, schedule_cron, recipients)
+    return scheduler.add_task(
+        title,
+        prompt,
+        schedule_cron,
+        recipients,
+        max_tokens=max_tokens or None,
+        max_duration=max_duration or None,
+    )
 
 
 # Tool: List Tasks
-@mcp.tool()
+@tool()
 def list_scheduled_tasks() -> str:
     """List all currently scheduled automated tasks."""
     return scheduler.list_tasks()
 
 
 # Tool: Delete Task
-@mcp.tool()
+@tool()
 def delete_scheduled_task(job_id: str) -> str:
     """Delete a scheduled task by its Job ID."""
     return scheduler.delete_task(job_id)
@@ -63,7 +212,7 @@ def _validate_path(path: str) -> str:
 
 
 # Tool: List Directory
-@mcp.tool()
+@tool()
 def list_directory(path: str = ".") -> str:
     """List contents of a directory in the workspace."""
     try:
@@ -71,38 +220,133 @@ def list_directory(path: str = ".") -> str:
         items = os.listdir(target_path)
         return "\n".join(items) if items else "(empty directory)"
     except Exception as e:
-        return f"Error listing directory: {str(e)}"
+        return ToolFailure(f"Error listing directory: {str(e)}")
+
+
+# Tool: List Tree
+@tool()
+def list_tree(
+    path: str = ".",
+    max_depth: int = 3,
+    pattern: str = "",
+    ignore: str = "",
+    details: bool = False,
+    offset: int = 0,
+    limit: int = 500,
+) -> str:
+    """
+    Recursively list a directory tree in one call, honoring .gitignore files.
+    Args:
+        path: Directory to list.
+        max_depth: How many levels to descend; 0 is unlimited.
+        pattern: Only list files matching this glob (e.g. "*.py").
+        ignore: Comma-separated globs of names to skip (e.g. "build,*.log").
+        details: Include size in bytes and modification time.
+        offset: Number of entries to skip.
+        limit: Maximum entries to return; 0 returns all.
+    """
+    try:
+        target_path = _validate_path(path)
+        if not os.path.isdir(target_path):
+            return ToolFailure(f"Error listing tree: {path} is not a directory.")
+
+        offset = max(offset, 0)
+        # One entry past the page tells whether another page follows
+        max_entries = offset + limit + 1 if limit > 0 else 0
+        entries = listing.walk_tree(
+            target_path,
+            directory_cache,
+            max_depth=max_depth,
+            pattern=pattern,
+            ignore=[g.strip() for g in ignore.split(",") if g.strip()],
+            workspace=os.path.normpath(_validate_path(".")),
+            max_entries=max_entries,
+        )
+        if not entries:
+            return "(no matching entries)"
+
+        more = bool(max_entries) and len(entries) == max_entries
+        found = len(entries) - 1 if more else len(entries)
+        window = documents.page_window(found, offset, limit)
+        lines = [
+            listing.format_entry(rel_path, entry, details)
+            for rel_path, entry in entries[window.start : window.stop]
+        ]
+        if more:
+            # The walk stopped early, so the total is not known
+            header = (
+                f"[Entries {window.start + 1}-{window.stop}; "
+                f"next offset={window.stop}]"
+            )
+        elif len(window) == found:
+            return "\n".join(lines)
+        else:
+            header = documents.range_header("Entries", window, found)
+        return header + "\n" + "\n".join(lines)
+    except Exception as e:
+        return ToolFailure(f"Error listing tree: {str(e)}")
 
 
 # Tool: Read File
-@mcp.tool()
-def read_file(path: str) -> str:
-    """Read certain file content from the workspace."""
+@tool()
+def read_file(path: str, offset: int = 0, limit: int = 0, unit: str = "lines") -> str:
+    """
+    Read certain file content from the workspace, optionally one slice at a time.
+    Args:
+        path: File to read.
+        offset: Number of lines (or bytes) to skip; negative counts as 0.
+        limit: Maximum lines (or bytes) to return; 0 or less reads to the end.
+        unit: "lines" or "bytes".
+    """
     try:
         target_path = _validate_path(path)
-        with open(target_path, "r", encoding="utf-8") as f:
-            return f.read()
+        if unit not in ("lines", "bytes"):
+            return ToolFailure("Error reading file: unit must be 'lines' or 'bytes'.")
+
+        offset, limit = max(offset, 0), max(limit, 0)
+        if not offset and not limit:
+            with open(target_path, "r", encoding="utf-8") as f:
+                return f.read()
+
+        size = os.path.getsize(target_path)
+        if unit == "bytes":
+            text = documents.read_bytes(target_path, offset, limit)
+            window = documents.page_window(size, offset, limit)
+            return f"{documents.range_header('Bytes', window, size)}\n{text}"
+
+        # Read one extra line to learn whether more content follows
+        lines = list(
+            documents.iter_lines(target_path, offset, limit + 1 if limit else 0)
+        )
+        more = bool(limit) and len(lines) > limit
+        lines = lines[:limit] if limit else lines
+        if not lines:
+            return f"[Lines: none returned, offset {offset} is past the end]\n"
+        header = f"[Lines {offset + 1}-{offset + len(lines)} of {size} bytes"
+        if more:
+            header += f"; next offset={offset + len(lines)}"
+        return f"{header}]\n" + "".join(lines)
     except Exception as e:
-        return f"Error reading file: {str(e)}"
+        return ToolFailure(f"Error reading file: {str(e)}")
 
 
 # Tool: Write File
-@mcp.tool()
+@tool()
 def write_file(path: str, content: str) -> str:
     """Write content to a file in the workspace (overwrites if exists)."""
     try:
         target_path = _validate_path(path)
         # Ensure parent directory exists
         os.makedirs(os.path.dirname(target_path), exist_ok=True)
-        with open(target_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        fileops.atomic_write(target_path, content)
+        code_index.update_file(target_path)
         return f"Successfully wrote to {path}"
     except Exception as e:
-        return f"Error writing file: {str(e)}"
+        return ToolFailure(f"Error writing file: {str(e)}")
 
 
 # Tool: Edit File
-@mcp.tool()
+@tool()
 def edit_file(path: str, target_text: str, replacement_text: str) -> str:
     """
     Edit a file by replacing the first occurrence of target_text with replacement_text.
@@ -110,56 +354,91 @@ def edit_file(path: str, target_text: str, replacement_text: str) -> str:
     try:
         target_path = _validate_path(path)
         if not os.path.exists(target_path):
-            return f"Error: File {path} not found."
-
-        with open(target_path, "r", encoding="utf-8") as f:
+            return ToolFailure(f"Error: File {path} not found.")
+        if not target_text:
+            return ToolFailure("Error: target_text must not be empty.")
+
+        # Large files are searched and spliced in place rather than decoded
+        if os.path.getsize(target_path) >= EDIT_MMAP_THRESHOLD:
+            if not fileops.mmap_replace(target_path, target_text, replacement_text):
+                return ToolFailure(f"Error: Target text missing from {path}")
+            code_index.update_file(target_path)
+            return f"Successfully edited {path}"
+
+        # newline="" keeps CRLF as-is, matching the byte-level mmap path
+        with open(target_path, "r", encoding="utf-8", newline="") as f:
             content = f.read()
 
         if content.find(target_text) == -1:
-            return f"Error: Target text missing from {path}"
+            return ToolFailure(f"Error: Target text missing from {path}")
 
         # Replace first occurrence
         new_content = content.replace(target_text, replacement_text, 1)
 
-        with open(target_path, "w", encoding="utf-8") as f:
-            f.write(new_content)
+        fileops.atomic_write(target_path, new_content)
+        code_index.update_file(target_path)
 
         return f"Successfully edited {path}"
     except Exception as e:
-        return f"Error editing file: {str(e)}"
+        return ToolFailure(f"Error editing file: {str(e)}")
+
+
+# Tool: Batch Edit File
+@tool()
+def batch_edit_file(path: str, edits: list[dict[str, str]]) -> str:
+    """
+    Apply several edits to a file in one step and return a compact diff.
+    Edits run in order, each replacing the first occurrence of its
+    target_text with its replacement_text. Nothing is written unless every
+    edit applies.
+    Args:
+        path: File to edit.
+        edits: List of {"target_text": ..., "replacement_text": ...}.
+    """
+    try:
+        target_path = _validate_path(path)
+        if not os.path.exists(target_path):
+            return ToolFailure(f"Error: File {path} not found.")
+        if not edits:
+            return ToolFailure("Error: No edits provided.")
+
+        with open(target_path, "r", encoding="utf-8", newline="") as f:
+            content = f.read()
+
+        new_content, error = fileops.apply_edits(content, edits)
+        if error:
+            return ToolFailure(f"Error: {error} from {path}. No changes written.")
+
+        fileops.atomic_write(target_path, new_content)
+        code_index.update_file(target_path)
+
+        diff = fileops.compact_diff(content, new_content, path)
+        return f"Successfully applied {len(edits)} edits to {path}\n{diff}"
+    except Exception as e:
+        return ToolFailure(f"Error editing file: {str(e)}")
 
 
 # Tool: Run Command
-@mcp.tool()
+@tool(limit=4)
 def run_command(command: str) -> str:
     """Run a safe shell command in the workspace."""
-    ALLOWED_COMMANDS = {
-        "ls",
-        "grep",
-        "cat",
-        "find",
-        "pytest",
-        "git",
-        "echo",
-        "pwd",
-        "tree",
-    }
-    BLOCKED_OPERATORS = {">", ">>", "&", "|", ";", "`", "$("}
-
     try:
-        # Security: Check for blocked operators/characters in raw string
-        for op in BLOCKED_OPERATORS:
-            if op in command:
-                return f"Error: Operator '{op}' is not allowed for security."
-
-        # Security: Parse command to check first token (binary)
-        args = shlex.split(command)
-        if not args:
-            return "Error: Empty command."
-
-        binary = args[0]
-        if binary not in ALLOWED_COMMANDS:
-            return f"Error: Command '{binary}' is not allowed."
+        args, error = commands.parse_command(command)
+        if error:
+            return ToolFailure(error)
+
+        if args[0] == "pytest" and pytest_worker is not None:
+            try:
+                run = pytest_worker.run(args[1:], timeout=30)
+                if run.timed_out:
+                    return ToolFailure("Error: Command timed out after 30 seconds.")
+                if run.returncode == 0:
+                    return run.stdout
+                return ToolFailure(
+                    f"Command failed (exit {run.returncode}): \n{run.stderr}"
+                )
+            except (RuntimeError, OSError, ValueError) as e:
+                logger.warning(f"Warm pytest worker unavailable, running cold: {e}")
 
         # Execute
         result = subprocess.run(
@@ -169,110 +448,170 @@ def run_command(command: str) -> str:
         if result.returncode == 0:
             return result.stdout
         else:
-            return f"Command failed (exit {result.returncode}): \n{result.stderr}"
+            return ToolFailure(
+                f"Command failed (exit {result.returncode}): \n{result.stderr}"
+            )
 
     except subprocess.TimeoutExpired:
-        return "Error: Command timed out after 30 seconds."
+        return ToolFailure("Error: Command timed out after 30 seconds.")
     except Exception as e:
-        return f"Error executing command: {str(e)}"
+        return ToolFailure(f"Error executing command: {str(e)}")
 
 
-# Tool: Scrape URL
-@mcp.tool()
-def scrape_url(url: str) -> str:
-    """Scrape and parse the textual content of a webpage."""
-    if not (url.startswith("http://") or url.startswith("https://")):
-        return "Error: Invalid URL. Must start with http:// or https://"
-
+# Tool: Run Command (streaming)
+@tool(limit=4)
+async def run_command_stream(command: str, ctx: Context) -> str:
+    """
+    Run a safe shell command in the workspace, streaming its output as log
+    messages while it runs. Suited to long commands such as pytest.
+    """
     try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/91.0.4472.124 Safari/537.36"
-            )
-        }
-        with httpx.Client(timeout=15.0, follow_redirects=True) as client:
-            response = client.get(url, headers=headers)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Remove scripts and styles
-            for script in soup(["script", "style"]):
-                script.decompose()
+        args, error = commands.parse_command(command)
+        if error:
+            return ToolFailure(error)
+
+        started = time.monotonic()
+
+        async def on_output(text: str):
+            await ctx.info(text)
+            await ctx.report_progress(time.monotonic() - started, COMMAND_TIMEOUT)
+
+        result = await commands.stream_process(
+            args,
+            cwd="/workspace",
+            timeout=COMMAND_TIMEOUT,
+            on_output=on_output,
+            max_chars=COMMAND_MAX_OUTPUT,
+        )
 
-            # Get text
-            text = soup.get_text(separator="\n")
+        if result.timed_out:
+            return ToolFailure(
+                f"Error: Command timed out after {COMMAND_TIMEOUT:g} seconds.\n"
+                f"{result.stdout}{result.stderr}"
+            )
+        if result.returncode == 0:
+            return result.stdout
+        return ToolFailure(
+            f"Command failed (exit {result.returncode}): \n{result.stderr}"
+        )
+    except Exception as e:
+        return ToolFailure(f"Error executing command: {str(e)}")
 
-            # Clean whitespace
-            lines = (line.strip() for line in text.splitlines())
-            # Collapse internal whitespace
-            cleaned_lines = (re.sub(r"\s+", " ", line) for line in lines)
-            text = "\n".join(line for line in cleaned_lines if line)
 
-            return text
+async def _scrape(url: str, max_chars: int = 0) -> str:
+    """Fetch one page as text, mapping failures to tool error messages."""
+    if not (url.startswith("http://") or url.startswith("https://")):
+        return ToolFailure("Error: Invalid URL. Must start with http:// or https://")
 
+    try:
+        client = scraper.get_client()
+        if max_chars > 0:
+            return await scraper.stream_text(url, client, max_chars, scrape_cache)
+        return await scraper.fetch_text(url, client, scrape_cache)
     except httpx.RequestError as e:
-        return f"Error scraping URL: {str(e)}"
+        return ToolFailure(f"Error scraping URL: {str(e)}")
     except httpx.HTTPStatusError as e:
-        return f"HTTP error {e.response.status_code} while scraping URL."
+        return ToolFailure(f"HTTP error {e.response.status_code} while scraping URL.")
     except Exception as e:
-        return f"Unexpected error: {str(e)}"
+        return ToolFailure(f"Unexpected error: {str(e)}")
+
+
+# Tool: Scrape URL
+@tool()
+async def scrape_url(url: str, max_chars: int = 0) -> str:
+    """
+    Scrape and parse the textual content of a webpage.
+    Args:
+        url: The page to fetch (http:// or https://).
+        max_chars: Stop after this many characters of text. The page is then
+            streamed and the download ends early; 0 returns the whole page.
+    """
+    return await _scrape(url, max_chars)
+
+
+# Tool: Scrape URLs
+@tool()
+async def scrape_urls(urls: list[str], max_chars: int = 0, concurrency: int = 5) -> str:
+    """
+    Scrape several webpages concurrently and return each page's text.
+    Args:
+        urls: The pages to fetch (http:// or https://).
+        max_chars: Per-page text limit, as for scrape_url; 0 means no limit.
+        concurrency: Maximum pages fetched at once.
+    """
+    urls = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+    if not urls:
+        return ToolFailure("Error: No URLs provided.")
+
+    concurrency = min(max(concurrency, 1), SCRAPE_MAX_CONCURRENCY)
+    results = await scraper.map_bounded(
+        urls,
+        lambda url: _scrape(url, max_chars),
+        concurrency=concurrency,
+        per_host=SCRAPE_PER_HOST,
+    )
+    return "\n---\n".join(f"URL: {url}\n{result}" for url, result in zip(urls, results))
 
 
 # Tool: Search Code
-@mcp.tool()
+@tool(limit=2)
 def search_code(query: str, path: str = ".") -> str:
     """
-    Search for a text pattern in the codebase using grep.
+    Search for a regex pattern in the codebase using the workspace trigram index.
     Args:
-        query: The regex pattern to search for.
+        query: The regex pattern to search for (Python syntax).
         path: The path to search within (defaults to workspace root).
     """
     try:
         target_path = _validate_path(path)
+        matches = code_index.search(query, target_path)
+        if not matches:
+            return "No matches found."
+        return "\n".join(matches)
+    except re.error as e:
+        return ToolFailure(f"Error: Invalid regex pattern: {str(e)}")
+    except Exception as e:
+        return ToolFailure(f"Error executing search: {str(e)}")
 
-        # Construct grep command
-        # -r: recursive
-        # -n: line numbers
-        # -I: ignore binary files
-        # -H: print filename
-        # --exclude-dir: skip common non-code directories
-        cmd = [
-            "grep",
-            "-r",
-            "-n",
-            "-I",
-            "-H",
-            "--exclude-dir={.git,__pycache__,node_modules,venv,.env}",
-            query,
-            target_path,
-        ]
 
-        result = subprocess.run(
-            cmd, cwd="/workspace", capture_output=True, text=True, timeout=30
+# Tool: Semantic Search
+@tool(limit=2)
+def semantic_search(query: str, n_results: int = 5, path: str = ".") -> str:
+    """
+    Find code and docs by meaning rather than exact text, using embeddings.
+    Args:
+        query: Natural language description of what to find.
+        n_results: Number of chunks to return.
+        path: Restrict results to files under this path.
+    """
+    try:
+        target_path = _validate_path(path)
+        hits = semantic_index.search(query, max(n_results, 1), target_path)
+        # The rest of the workspace may still be embedding in the background
+        note = ""
+        if semantic_index.pending:
+            note = "[Index still building; results may be incomplete]\n"
+        if not hits:
+            return f"{note}No matches found."
+        return note + "\n---\n".join(
+            f"{hit['path']}:{hit['start_line']}-{hit['end_line']} "
+            f"(score {hit['score']:.2f})\n{hit['text']}"
+            for hit in hits
         )
-
-        if result.returncode == 0:
-            return result.stdout.strip()
-        elif result.returncode == 1:
-            return "No matches found."
-        else:
-            return f"Error executing grep (exit {result.returncode}): \n{result.stderr}"
-
-    except subprocess.TimeoutExpired:
-        return "Error: Search timed out after 30 seconds."
     except Exception as e:
-        return f"Error executing search: {str(e)}"
+        return ToolFailure(f"Error executing semantic search: {str(e)}")
 
 
 # Tool: Web Search
-@mcp.tool()
+@tool(limit=4)
 def web_search(query: str, max_results: int = 5) -> str:
     """Search the web using DuckDuckGo."""
     try:
-        results = DDGS().text(query, max_results=max_results)
+        results = search_cache.get_or_fetch(
+            query,
+            max_results,
+            lambda: DDGS().text(query, max_results=max_results),
+        )
         formatted_results = []
         for result in results:
             formatted_results.append(
@@ -282,35 +621,52 @@ def web_search(query: str, max_results: int = 5) -> str:
             )
         return "\n---\n".join(formatted_results)
     except Exception as e:
-        return f"Error performing search: {str(e)}"
+        return ToolFailure(f"Error performing search: {str(e)}")
 
 
 # Tool: Read PDF
-@mcp.tool()
-def read_pdf(path: str) -> str:
-    """Read text content from a PDF file."""
+@tool(limit=2)
+def read_pdf(path: str, offset: int = 0, limit: int = 0) -> str:
+    """
+    Read text content from a PDF file, optionally a range of pages.
+    Args:
+        path: PDF file to read.
+        offset: Number of pages to skip.
+        limit: Maximum pages to return; 0 reads to the end.
+    """
     try:
         target_path = _validate_path(path)
-        reader = pypdf.PdfReader(target_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        pdf = documents.pdf_pages(
+            target_path, offset, limit, extraction_cache, extraction_engine
+        )
+        text = "\n".join(pdf.parts).strip()
+        if offset or limit:
+            return f"{documents.range_header('Pages', pdf.window, pdf.total)}\n{text}"
+        return text
     except Exception as e:
-        return f"Error reading PDF: {str(e)}"
+        return ToolFailure(f"Error reading PDF: {str(e)}")
 
 
 # Tool: Read DOCX
-@mcp.tool()
-def read_docx(path: str) -> str:
-    """Read text content from a DOCX file."""
+@tool(limit=4)
+def read_docx(path: str, offset: int = 0, limit: int = 0) -> str:
+    """
+    Read text content from a DOCX file, optionally a range of paragraphs.
+    Args:
+        path: DOCX file to read.
+        offset: Number of paragraphs to skip.
+        limit: Maximum paragraphs to return; 0 reads to the end.
+    """
     try:
         target_path = _validate_path(path)
-        doc = docx.Document(target_path)
-        text = "\n".join([para.text for para in doc.paragraphs])
-        return text.strip()
+        doc = documents.docx_paragraphs(target_path, offset, limit, extraction_cache)
+        text = "\n".join(doc.parts).strip()
+        if offset or limit:
+            header = documents.range_header("Paragraphs", doc.window, doc.total)
+            return f"{header}\n{text}"
+        return text
     except Exception as e:
-        return f"Error reading DOCX: {str(e)}"
+        return ToolFailure(f"Error reading DOCX: {str(e)}")
 
 
 # Expose the internal FastAPI app
@@ -324,6 +680,43 @@ async def health_check(request):
 
 app.add_route("/health", health_check)
 
+
+async def search_stats(request):
+    """Web search cache counters."""
+    return JSONResponse(search_cache.stats())
+
+
+app.add_route("/api/search/stats", search_stats)
+
+
+async def scheduler_stats(request):
+    """Scheduler executor settings and LLM queue depth."""
+    return JSONResponse(scheduler.stats())
+
+
+app.add_route("/api/scheduler/stats", scheduler_stats)
+
+
+async def tool_stats(request):
+    """Tool executor concurrency and queue depth."""
+    return JSONResponse(tool_executor.stats())
+
+
+app.add_route("/api/tools/stats", tool_stats)
+
+
+async def metrics_endpoint(request):
+    """Prometheus metrics for tool calls."""
+    if tool_metrics is None:
+        return PlainTextResponse("Metrics disabled.", status_code=404)
+    return PlainTextResponse(
+        tool_metrics.render(tool_executor.stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+app.add_route("/metrics", metrics_endpoint)
+
 # Mount Static Files
 app.mount(
     "/static",
@@ -336,7 +729,12 @@ app.mount(
 
 # API: List Tasks
 async def get_tasks_api(request: Request):
-    return JSONResponse(scheduler.get_tasks())
+    etag, tasks = scheduler.tasks_snapshot()
+    # no-cache makes browsers revalidate every poll, which is answered with 304
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(tasks, headers=headers)
 
 
 # API: Add Task
@@ -351,8 +749,15 @@ async def add_task_api(request: Request):
         if not title or not prompt or not schedule:
             return JSONResponse({"error": "Missing fields"}, status_code=400)
 
-        result = scheduler.add_task(title, prompt, schedule, recipients)
-        if "Error" in result:
+        result = scheduler.add_task(
+            title,
+            prompt,
+            schedule,
+            recipients,
+            max_tokens=data.get("max_tokens"),
+            max_duration=data.get("max_duration"),
+        )
+        if isinstance(result, ToolFailure):
             return JSONResponse({"error": result}, status_code=400)
 
         return JSONResponse({"message": result})
@@ -371,16 +776,65 @@ async def delete_task_api(request: Request):
 async def run_task_api(request: Request):
     job_id = request.path_params["job_id"]
     result = scheduler.run_task(job_id)
-    if "Error" in result:
+    if isinstance(result, ToolFailure):
         return JSONResponse({"error": result}, status_code=404)
     return JSONResponse({"message": result})
 
 
+# API: Task Run History
+async def task_runs_api(request: Request):
+    job_id = request.path_params["job_id"]
+    try:
+        limit = min(max(int(request.query_params.get("limit", 50)), 1), 500)
+    except ValueError:
+        return JSONResponse({"error": "limit must be an integer"}, status_code=400)
+    return JSONResponse(scheduler.get_runs(job_id, limit))
+
+
+# API: Run Timings Across Tasks
+async def runs_summary_api(request: Request):
+    return JSONResponse(scheduler.runs_summary())
+
+
+# API: Task Event Stream (server-sent events)
+async def task_events_api(request: Request):
+    try:
+        last_event_id = int(request.headers["last-event-id"])
+    except (KeyError, ValueError):
+        last_event_id = None
+    subscription = scheduler.events.subscribe(last_event_id)
+
+    async def stream():
+        try:
+            # EventSource reconnects after this many ms and sends Last-Event-ID
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(), timeout=SSE_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            scheduler.events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # Register Routes
 app.add_route("/api/tasks", get_tasks_api, methods=["GET"])
 app.add_route("/api/tasks", add_task_api, methods=["POST"])
+app.add_route("/api/tasks/events", task_events_api, methods=["GET"])
 app.add_route("/api/tasks/{job_id}", delete_task_api, methods=["DELETE"])
 app.add_route("/api/tasks/{job_id}/run", run_task_api, methods=["POST"])
+app.add_route("/api/tasks/{job_id}/runs", task_runs_api, methods=["GET"])
+app.add_route("/api/runs/summary", runs_summary_api, methods=["GET"])
 
 
 if __name__ == "__main__":
@@ -5,19 +5,87 @@ document.addEventListener('DOMContentLoaded', () => {
     const closeBtn = document.getElementById('close-modal');
     const form = document.getElementById('add-task-form');
 
-    // Load Tasks
-    fetchTasks();
+    // Tasks by id, kept current by the scheduler's event stream
+    const tasks = new Map();
+    // Latest run state by task id: 'running', or the finished run's status
+    const runStatus = new Map();
+
+    // Events that arrive while a snapshot is loading, applied on top of it
+    let pending = null;
+
+    // Load Tasks once the event stream is open, so no change is missed
+    subscribe();
 
     function fetchTasks() {
+        pending = pending || [];
+        const replay = () => {
+            (pending || []).forEach(apply => apply());
+            pending = null;
+            renderTasks();
+        };
         fetch('/api/tasks')
             .then(res => res.json())
-            .then(tasks => renderTasks(tasks))
-            .catch(err => console.error('Error fetching tasks:', err));
+            .then(list => {
+                tasks.clear();
+                list.forEach(task => tasks.set(task.id, task));
+                replay();
+            })
+            .catch(err => {
+                console.error('Error fetching tasks:', err);
+                replay();
+            });
     }
 
-    function renderTasks(tasks) {
+    // Server-sent events replace refetching after every change. EventSource
+    // reconnects on its own and resumes from the last event it saw.
+    function subscribe() {
+        const source = new EventSource('/api/tasks/events');
+        const on = (type, handler) => source.addEventListener(type, e => {
+            const data = JSON.parse(e.data);
+            // A snapshot may predate this event, so apply it after the snapshot
+            if (pending) {
+                pending.push(() => handler(data));
+                return;
+            }
+            handler(data);
+            renderTasks();
+        });
+
+        // Fetch the snapshot once; fall back to it if the stream cannot open
+        let loaded = false;
+        const load = () => {
+            if (loaded) return;
+            loaded = true;
+            fetchTasks();
+        };
+        source.addEventListener('open', load);
+        source.addEventListener('error', load);
+
+        on('task_added', task => tasks.set(task.id, task));
+        on('task_removed', ({ id }) => {
+            tasks.delete(id);
+            runStatus.delete(id);
+        });
+        on('next_run', ({ id, next_run }) => {
+            if (tasks.has(id)) tasks.get(id).next_run = next_run;
+        });
+        on('run_started', ({ id }) => runStatus.set(id, 'running'));
+        on('run_finished', ({ id, status }) => runStatus.set(id, status));
+        on('run_missed', ({ id }) => runStatus.set(id, 'missed'));
+        // Too far behind to replay; reload the whole list
+        source.addEventListener('resync', () => fetchTasks());
+    }
+
+    function formatStatus(id) {
+        const status = runStatus.get(id);
+        if (!status) return '';
+        if (status === 'running') return '<small>Running…</small>';
+        return `<small>Last run: ${status}</small>`;
+    }
+
+    function renderTasks() {
         tableBody.innerHTML = '';
-        if (tasks.length === 0) {
+        if (tasks.size === 0) {
             tableBody.innerHTML = '<tr><td colspan="5" class="empty">No scheduled tasks found.</td></tr>';
             return;
         }
@@ -27,7 +95,7 @@ document.addEventListener('DOMContentLoaded', () => {
             tr.innerHTML = `
                 <td><strong>${task.title}</strong><br><small>${task.prompt.substring(0, 40)}...</small></td>
                 <td><code>${task.schedule}</code></td>
-                <td>${formatDate(task.next_run)}</td>
+                <td>${formatDate(task.next_run)}${formatStatus(task.id)}</td>
                 <td>${task.recipients.join(', ')}</td>
                 <td>
                     <button class="btn primary sm" onclick="runTask('${task.id}')">Run</button>
@@ -69,7 +137,6 @@ document.addEventListener('DOMContentLoaded', () => {
                 } else {
                     modal.classList.add('hidden');
                     form.reset();
-                    fetchTasks();
                 }
             });
     });
@@ -78,9 +145,9 @@ document.addEventListener('DOMContentLoaded', () => {
     window.deleteTask = function (id) {
         if (!confirm('Are you sure you want to delete this task?')) return;
 
+        // The task_removed event updates the table
         fetch(`/api/tasks/${id}`, { method: 'DELETE' })
-            .then(res => res.json())
-            .then(() => fetchTasks());
+            .catch(err => console.error('Error deleting task:', err));
     };
 
     // Modal Logic
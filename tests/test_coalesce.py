@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from coalesce import Coalescer  # noqa: E402
+
+
+class Interrupted(BaseException):
+    """Stands in for KeyboardInterrupt/SystemExit without stopping the run."""
+
+
+class TestCoalescer(unittest.TestCase):
+    def test_lookup_hit_skips_the_call(self):
+        calls = Coalescer()
+        self.assertEqual(calls.run("k", lambda: "cached", lambda: "fresh"), "cached")
+        self.assertEqual(calls.stats()["hits"], 1)
+
+    def test_concurrent_callers_share_one_call(self):
+        calls = Coalescer()
+        started = threading.Event()
+        made = []
+
+        def slow():
+            made.append(1)
+            started.set()
+            time.sleep(0.1)
+            return "value"
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            first = pool.submit(calls.run, "k", lambda: None, slow)
+            started.wait()
+            others = [pool.submit(calls.run, "k", lambda: None, slow) for _ in range(3)]
+            results = [f.result() for f in [first] + others]
+
+        self.assertEqual(results, ["value"] * 4)
+        self.assertEqual(len(made), 1)
+        self.assertEqual(
+            calls.stats(), {"hits": 0, "misses": 1, "coalesced": 3, "inflight": 0}
+        )
+
+    def test_base_exception_reaches_waiters(self):
+        calls = Coalescer()
+        started = threading.Event()
+
+        def interrupted():
+            started.set()
+            time.sleep(0.1)
+            raise Interrupted()
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(calls.run, "k", lambda: None, interrupted)
+            started.wait()
+            waiter = pool.submit(calls.run, "k", lambda: None, lambda: "unused")
+            with self.assertRaises(Interrupted):
+                waiter.result(timeout=5)
+            with self.assertRaises(Interrupted):
+                first.result(timeout=5)
+        self.assertEqual(calls.stats()["inflight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
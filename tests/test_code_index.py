@@ -0,0 +1,148 @@
+import os
+import sys
+import shutil
+import pickle
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from code_index import CodeIndex, required_trigrams  # noqa: E402
+
+
+class TestRequiredTrigrams(unittest.TestCase):
+    def test_literal_pattern(self):
+        self.assertEqual(required_trigrams("Foo"), {"foo"})
+        self.assertEqual(
+            required_trigrams("def foo"), {"def", "ef ", "f f", " fo", "foo"}
+        )
+
+    def test_optional_parts_are_ignored(self):
+        # Alternation, classes and optional repeats cannot constrain candidates
+        self.assertEqual(required_trigrams("abc|xyz"), set())
+        self.assertEqual(required_trigrams("ab[cd]ef"), set())
+        self.assertEqual(required_trigrams("(?:abcd)?"), set())
+        self.assertEqual(required_trigrams("(abcd)+x"), {"abc", "bcd"})
+
+    def test_invalid_pattern(self):
+        self.assertEqual(required_trigrams("bad("), set())
+
+    def test_ignorecase_special_folds(self):
+        # (?i)'İ' and 'ſ' match text that str.lower() maps differently
+        self.assertEqual(required_trigrams("(?i)İstanbul"), set())
+        self.assertEqual(required_trigrams("(?i:ſtate)x"), set())
+        # ASCII i/s/k also match non-ASCII letters under IGNORECASE
+        self.assertEqual(required_trigrams("(?i)class"), {"cla"})
+        self.assertEqual(required_trigrams("(?i)foo"), {"foo"})
+        # Case-sensitive patterns are folded exactly like the indexed text
+        self.assertEqual(required_trigrams("İst"), {"i̇s", "̇st"})
+
+
+class TestCodeIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.abspath("tests/test_index_workspace")
+        os.makedirs(os.path.join(self.test_dir, "src"), exist_ok=True)
+        os.makedirs(os.path.join(self.test_dir, "node_modules"), exist_ok=True)
+        self.index_path = os.path.join(self.test_dir, ".cache", "index.db")
+        self._write("src/a.py", "def alpha():\n    pass\n")
+        self._write("src/b.py", "def beta():\n    pass\n")
+        self._write("node_modules/dep.js", "def alpha")
+        with open(os.path.join(self.test_dir, "blob.bin"), "wb") as f:
+            f.write(b"def alpha\0\1")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _write(self, rel_path, content):
+        with open(os.path.join(self.test_dir, rel_path), "w") as f:
+            f.write(content)
+
+    def test_candidates_intersect_postings(self):
+        index = CodeIndex(self.test_dir, self.index_path)
+        index.refresh()
+        self.assertEqual(index.candidates("def alpha"), ["src/a.py"])
+        self.assertEqual(index.candidates(r"def \w+"), ["src/a.py", "src/b.py"])
+
+    def test_search_output_shape(self):
+        index = CodeIndex(self.test_dir, self.index_path)
+        result = index.search(r"^def (alpha|beta)\(")
+        self.assertEqual(
+            result,
+            [
+                f"{self.test_dir}/src/a.py:1:def alpha():",
+                f"{self.test_dir}/src/b.py:1:def beta():",
+            ],
+        )
+
+    def test_incremental_refresh_and_persistence(self):
+        index = CodeIndex(self.test_dir, self.index_path)
+        self.assertEqual(index.refresh(), 3)
+        self.assertEqual(index.refresh(), 0)
+
+        self._write("src/b.py", "def gamma():\n    pass\n")
+        os.remove(os.path.join(self.test_dir, "src/a.py"))
+        self.assertEqual(index.refresh(), 2)
+        self.assertEqual(index.candidates("gamma"), ["src/b.py"])
+        self.assertEqual(index.candidates("alpha"), [])
+
+        # A fresh instance loads the persisted postings without re-reading files
+        reloaded = CodeIndex(self.test_dir, self.index_path)
+        self.assertEqual(reloaded.candidates("gamma"), ["src/b.py"])
+        self.assertEqual(reloaded.refresh(), 0)
+
+    def test_ignorecase_search_finds_special_folds(self):
+        self._write("src/c.py", "claſs Legacy:\n")
+        index = CodeIndex(self.test_dir, self.index_path)
+        self.assertEqual(
+            index.search("(?i)class legacy"),
+            [f"{self.test_dir}/src/c.py:1:claſs Legacy:"],
+        )
+
+    def test_search_refresh_is_throttled(self):
+        index = CodeIndex(self.test_dir, self.index_path, refresh_interval=60)
+        index.search("alpha")
+        self._write("src/c.py", "def alpha_two():\n")
+        with patch.object(index, "_walk", wraps=index._walk) as walk:
+            self.assertEqual(len(index.search("alpha")), 1)
+        walk.assert_not_called()
+
+        # Files written through the server are picked up without a walk
+        index.update_file(os.path.join(self.test_dir, "src/c.py"))
+        self.assertEqual(len(index.search("alpha")), 2)
+
+        index.refresh_interval = 0
+        os.remove(os.path.join(self.test_dir, "src/c.py"))
+        self.assertEqual(len(index.search("alpha")), 1)
+
+    def test_changes_persist_per_file(self):
+        index = CodeIndex(self.test_dir, self.index_path)
+        index.refresh()
+        self._write("src/b.py", "def gamma():\n")
+        with patch.object(index, "_save", wraps=index._save) as save:
+            index.refresh()
+        save.assert_called_once_with({os.path.join("src", "b.py")})
+
+        reloaded = CodeIndex(self.test_dir, self.index_path)
+        self.assertEqual(reloaded.candidates("gamma"), ["src/b.py"])
+        self.assertEqual(reloaded.candidates("alpha"), ["src/a.py"])
+
+    def test_older_row_format_is_dropped(self):
+        CodeIndex(self.test_dir, self.index_path).refresh()
+        # Rows written before the JSON encoding held pickled sets
+        with sqlite3.connect(self.index_path) as conn:
+            conn.execute("DELETE FROM meta WHERE key = 'format'")
+            conn.execute("UPDATE files SET grams = ?", (pickle.dumps({"def"}),))
+        conn.close()
+
+        reloaded = CodeIndex(self.test_dir, self.index_path)
+        self.assertEqual(reloaded.candidates("alpha"), [])
+        self.assertEqual(reloaded.refresh(), 3)
+        self.assertEqual(reloaded.candidates("alpha"), ["src/a.py"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import asyncio
+import unittest
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from commands import OutputBuffer, parse_command, stream_process  # noqa: E402
+
+
+class TestOutputBuffer(unittest.TestCase):
+    def test_small_output_is_kept_whole(self):
+        buffer = OutputBuffer(max_chars=20)
+        buffer.write("hello ")
+        buffer.write("world")
+        self.assertEqual(buffer.getvalue(), "hello world")
+
+    def test_middle_is_truncated(self):
+        buffer = OutputBuffer(max_chars=10)
+        for chunk in ["HEAD-", "middle", "-more-", "middle-", "TAIL!"]:
+            buffer.write(chunk)
+        self.assertEqual(
+            buffer.getvalue(), "HEAD-\n[... 19 characters truncated ...]\nTAIL!"
+        )
+
+
+class TestParseCommand(unittest.TestCase):
+    def test_allowed_and_rejected(self):
+        self.assertEqual(parse_command("git status"), (["git", "status"], None))
+        self.assertIn("not allowed", parse_command("rm -rf /")[1])
+        self.assertIn("Operator", parse_command("ls | cat")[1])
+        self.assertEqual(parse_command("  ")[1], "Error: Empty command.")
+
+
+class TestStreamProcess(unittest.TestCase):
+    def test_output_is_streamed_while_running(self):
+        chunks = []
+
+        async def on_output(text):
+            chunks.append(text)
+
+        script = (
+            "import sys, time\n"
+            "print('first', flush=True)\n"
+            "time.sleep(0.3)\n"
+            "print('oops', file=sys.stderr, flush=True)\n"
+            "print('second', flush=True)\n"
+        )
+        result = asyncio.run(
+            stream_process(
+                [sys.executable, "-c", script],
+                cwd=".",
+                on_output=on_output,
+                flush_interval=0.1,
+            )
+        )
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, "first\nsecond\n")
+        self.assertEqual(result.stderr, "oops\n")
+        self.assertFalse(result.timed_out)
+        # "first" was pushed before the process finished
+        self.assertGreaterEqual(len(chunks), 2)
+        self.assertEqual(chunks[0], "first\n")
+
+    def test_timeout_kills_process_and_keeps_partial_output(self):
+        script = "import time\nprint('started', flush=True)\ntime.sleep(10)\n"
+        result = asyncio.run(
+            stream_process([sys.executable, "-c", script], cwd=".", timeout=0.5)
+        )
+        self.assertTrue(result.timed_out)
+        self.assertIsNone(result.returncode)
+        self.assertEqual(result.stdout, "started\n")
+
+    def test_cancellation_kills_process(self):
+        script = "import os, time\nprint(os.getpid(), flush=True)\ntime.sleep(10)\n"
+        pids = []
+
+        async def on_output(text):
+            pids.append(int(text))
+
+        async def cancel_once_started():
+            task = asyncio.create_task(
+                stream_process(
+                    [sys.executable, "-c", script],
+                    cwd=".",
+                    on_output=on_output,
+                    flush_interval=0.05,
+                )
+            )
+            while not pids:
+                await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_once_started())
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pids[0], 0)
+
+    def test_large_output_stays_bounded(self):
+        script = "print('x' * 100000)"
+        result = asyncio.run(
+            stream_process([sys.executable, "-c", script], cwd=".", max_chars=100)
+        )
+        self.assertIn("characters truncated", result.stdout)
+        self.assertLess(len(result.stdout), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import asyncio
+import threading
+import unittest
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from events import Event, EventBroadcaster, format_sse  # noqa: E402
+
+
+async def _drain(sub, n):
+    return [await asyncio.wait_for(sub.get(), timeout=1) for _ in range(n)]
+
+
+class TestFormatSSE(unittest.TestCase):
+    def test_frame(self):
+        frame = format_sse(Event(7, "task_removed", {"id": "abc"}))
+        self.assertEqual(frame, 'id: 7\nevent: task_removed\ndata: {"id":"abc"}\n\n')
+
+
+class TestEventBroadcaster(unittest.TestCase):
+    def test_events_published_from_other_threads_arrive_in_order(self):
+        events = EventBroadcaster()
+
+        async def main():
+            sub = events.subscribe()
+            publisher = threading.Thread(
+                target=lambda: [events.publish("tick", {"n": i}) for i in range(5)]
+            )
+            publisher.start()
+            received = await _drain(sub, 5)
+            publisher.join()
+            return received
+
+        received = asyncio.run(main())
+        self.assertEqual([e.data["n"] for e in received], list(range(5)))
+        self.assertEqual([e.id for e in received], [1, 2, 3, 4, 5])
+
+    def test_reconnect_replays_missed_events(self):
+        events = EventBroadcaster(history=10)
+        for i in range(4):
+            events.publish("tick", {"n": i})
+
+        async def main():
+            sub = events.subscribe(last_event_id=2)
+            events.publish("tick", {"n": 4})
+            return await _drain(sub, 3)
+
+        self.assertEqual([e.id for e in asyncio.run(main())], [3, 4, 5])
+
+    def test_resync_when_replay_is_impossible(self):
+        events = EventBroadcaster(history=2)
+        for i in range(5):
+            events.publish("tick", {"n": i})
+
+        async def main(last_id):
+            sub = events.subscribe(last_event_id=last_id)
+            return (await _drain(sub, 1))[0]
+
+        # Missed events have left the history
+        self.assertEqual(asyncio.run(main(1)).type, "resync")
+        # Id from before a server restart
+        self.assertEqual(asyncio.run(main(99)).type, "resync")
+        # Up to date: nothing queued
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(main(5))
+
+    def test_slow_subscriber_gets_resync(self):
+        events = EventBroadcaster(max_queued=3)
+
+        async def main():
+            sub = events.subscribe()
+            for i in range(5):
+                events.publish("tick", {"n": i})
+            await asyncio.sleep(0)
+            return await _drain(sub, 1)
+
+        [event] = asyncio.run(main())
+        self.assertEqual(event.type, "resync")
+
+    def test_unsubscribe(self):
+        events = EventBroadcaster()
+
+        async def main():
+            sub = events.subscribe()
+            self.assertEqual(events.stats()["subscribers"], 1)
+            events.unsubscribe(sub)
+            events.publish("tick", {})
+            await asyncio.sleep(0)
+            return sub._queue.empty()
+
+        self.assertTrue(asyncio.run(main()))
+        self.assertEqual(events.stats(), {"subscribers": 0, "last_id": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
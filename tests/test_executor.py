@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import asyncio
+import inspect
+import threading
+import unittest
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from executor import ToolExecutor, ToolFailure  # noqa: E402
+from metrics import ToolMetrics  # noqa: E402
+
+
+class TestToolExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = ToolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_sync_tools_run_off_the_event_loop(self):
+        def blocking_tool(seconds: float) -> str:
+            time.sleep(seconds)
+            return threading.current_thread().name
+
+        wrapped = self.executor.offload(blocking_tool)
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            thread_name = await wrapped(0.2)
+            task.cancel()
+            return thread_name, ticks
+
+        thread_name, ticks = asyncio.run(main())
+        self.assertTrue(thread_name.startswith("mcp-tool"))
+        # The loop kept running while the tool slept
+        self.assertGreater(ticks, 5)
+
+    def test_per_tool_concurrency_limit(self):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def limited_tool(i: int) -> int:
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            return i
+
+        wrapped = self.executor.offload(limited_tool, limit=2)
+
+        async def main():
+            return await asyncio.gather(*(wrapped(i) for i in range(6)))
+
+        self.assertEqual(asyncio.run(main()), list(range(6)))
+        self.assertEqual(peak, 2)
+
+        stats = self.executor.stats()
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(
+            stats["tools"]["limited_tool"],
+            {"waiting": 0, "running": 0, "completed": 6, "limit": 2},
+        )
+
+    def test_cancelled_queued_call_leaves_no_trace(self):
+        executor = ToolExecutor(max_workers=1)
+        release = threading.Event()
+
+        def blocking_tool() -> str:
+            release.wait(5)
+            return "done"
+
+        wrapped = executor.offload(blocking_tool)
+
+        async def main():
+            running = asyncio.create_task(wrapped())
+            queued = asyncio.create_task(wrapped())
+            await asyncio.sleep(0.05)
+            self.assertEqual(executor.stats()["queued"], 1)
+            queued.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await queued
+            release.set()
+            return await running
+
+        self.assertEqual(asyncio.run(main()), "done")
+        executor.shutdown()
+        stats = executor.stats()
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(stats["tools"]["blocking_tool"]["completed"], 1)
+        self.assertEqual(stats["tools"]["blocking_tool"]["running"], 0)
+
+    def test_async_tools_and_signature_are_preserved(self):
+        async def async_tool(url: str, max_chars: int = 0) -> str:
+            return f"{url}:{max_chars}"
+
+        wrapped = self.executor.offload(async_tool)
+
+        self.assertEqual(
+            asyncio.run(wrapped("https://a.test", max_chars=5)), "https://a.test:5"
+        )
+        self.assertEqual(wrapped.__name__, "async_tool")
+        self.assertIn("max_chars", str(inspect.signature(wrapped)))
+
+    def test_errors_propagate(self):
+        def failing_tool():
+            raise ValueError("boom")
+
+        wrapped = self.executor.offload(failing_tool)
+        with self.assertRaises(ValueError):
+            asyncio.run(wrapped())
+        self.assertEqual(self.executor.stats()["tools"]["failing_tool"]["completed"], 1)
+
+
+class TestToolMetrics(unittest.TestCase):
+    def test_calls_are_timed_and_rendered(self):
+        metrics = ToolMetrics()
+        executor = ToolExecutor(max_workers=2, metrics=metrics)
+
+        def read_file(path: str) -> str:
+            if path == "missing":
+                return ToolFailure("Error reading file: not found")
+            return "héllo"
+
+        wrapped = executor.offload(read_file, limit=1)
+
+        async def main():
+            await wrapped("a.txt")
+            await wrapped("missing")
+
+        asyncio.run(main())
+        executor.shutdown()
+        text = metrics.render(executor.stats())
+
+        self.assertIn('mcp_tool_calls_total{tool="read_file",status="ok"} 1', text)
+        self.assertIn('mcp_tool_calls_total{tool="read_file",status="error"} 1', text)
+        # 6 bytes for "héllo" plus 29 for the error message
+        self.assertIn('mcp_tool_response_bytes_total{tool="read_file"} 35', text)
+        self.assertIn(
+            'mcp_tool_duration_seconds_bucket{tool="read_file",le="+Inf"} 2', text
+        )
+        self.assertIn('mcp_tool_duration_seconds_count{tool="read_file"} 2', text)
+        self.assertIn('mcp_tool_in_flight{tool="read_file"} 0', text)
+        self.assertIn("mcp_tool_queue_depth 0", text)
+
+    def test_outcome_comes_from_status_not_text(self):
+        metrics = ToolMetrics()
+        executor = ToolExecutor(max_workers=2, metrics=metrics)
+
+        def run_command(command: str) -> str:
+            if command == "false":
+                return ToolFailure("Command failed (exit 1): \n")
+            if command == "raise":
+                raise RuntimeError("boom")
+            # Ordinary output that merely looks like an error message
+            return "Error handling is covered in README.md"
+
+        wrapped = executor.offload(run_command)
+
+        async def main():
+            await wrapped("cat notes.txt")
+            await wrapped("false")
+            with self.assertRaises(RuntimeError):
+                await wrapped("raise")
+
+        asyncio.run(main())
+        executor.shutdown()
+        text = metrics.render(executor.stats())
+
+        self.assertIn('mcp_tool_calls_total{tool="run_command",status="ok"} 1', text)
+        self.assertIn('mcp_tool_calls_total{tool="run_command",status="error"} 2', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = ToolMetrics()
+        metrics.observe("search_code", 0.003, 0, False)
+        metrics.observe("search_code", 0.2, 0, False)
+        text = metrics.render()
+
+        self.assertIn(
+            'mcp_tool_duration_seconds_bucket{tool="search_code",le="0.005"} 1', text
+        )
+        self.assertIn(
+            'mcp_tool_duration_seconds_bucket{tool="search_code",le="0.25"} 2', text
+        )
+        self.assertNotIn("mcp_tool_queue_depth", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
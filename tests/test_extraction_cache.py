@@ -0,0 +1,94 @@
+import os
+import sys
+import shutil
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+import documents  # noqa: E402
+from extraction_cache import ExtractionCache  # noqa: E402
+
+
+def _mock_pages(count, prefix="Page"):
+    pages = []
+    for i in range(count):
+        page = MagicMock()
+        page.extract_text.return_value = f"{prefix} {i + 1}"
+        pages.append(page)
+    return pages
+
+
+class TestExtractionCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.abspath("tests/test_cache_workspace")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.pdf_path = os.path.join(self.test_dir, "report.pdf")
+        with open(self.pdf_path, "wb") as f:
+            f.write(b"%PDF-fake report")
+        self.cache = ExtractionCache(os.path.join(self.test_dir, "cache.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    @patch("pypdf.PdfReader")
+    def test_repeat_reads_skip_parsing(self, mock_pdf_reader):
+        mock_pdf_reader.return_value.pages = _mock_pages(4)
+
+        first = documents.pdf_pages(self.pdf_path, cache=self.cache)
+        self.assertEqual(list(first.parts), ["Page 1", "Page 2", "Page 3", "Page 4"])
+
+        mock_pdf_reader.reset_mock()
+        second = documents.pdf_pages(self.pdf_path, 1, 2, cache=self.cache)
+        self.assertEqual(second.total, 4)
+        self.assertEqual(list(second.parts), ["Page 2", "Page 3"])
+        mock_pdf_reader.assert_not_called()
+
+    @patch("pypdf.PdfReader")
+    def test_partial_window_fills_missing_pages(self, mock_pdf_reader):
+        pages = _mock_pages(4)
+        mock_pdf_reader.return_value.pages = pages
+
+        list(documents.pdf_pages(self.pdf_path, 0, 2, cache=self.cache).parts)
+        list(documents.pdf_pages(self.pdf_path, 1, 2, cache=self.cache).parts)
+
+        # Page 2 came from the cache, only page 3 needed extraction
+        self.assertEqual(pages[1].extract_text.call_count, 1)
+        self.assertEqual(pages[2].extract_text.call_count, 1)
+        self.assertEqual(
+            self.cache.pages(
+                self.cache.fingerprint(self.pdf_path), "pdf", range(4)
+            ).keys(),
+            {0, 1, 2},
+        )
+
+    @patch("pypdf.PdfReader")
+    def test_content_change_invalidates(self, mock_pdf_reader):
+        mock_pdf_reader.return_value.pages = _mock_pages(1, "Old")
+        list(documents.pdf_pages(self.pdf_path, cache=self.cache).parts)
+
+        with open(self.pdf_path, "wb") as f:
+            f.write(b"%PDF-fake report, revised")
+        mock_pdf_reader.return_value.pages = _mock_pages(1, "New")
+
+        result = documents.pdf_pages(self.pdf_path, cache=self.cache)
+        self.assertEqual(list(result.parts), ["New 1"])
+
+    def test_lru_eviction(self):
+        cache = ExtractionCache(os.path.join(self.test_dir, "small.db"), max_bytes=10)
+        cache.put("a" * 64, "pdf", 1, {0: "123456"})
+        cache.put("b" * 64, "pdf", 1, {0: "123456"})
+
+        self.assertIsNone(cache.total("a" * 64, "pdf"))
+        self.assertEqual(cache.total("b" * 64, "pdf"), 1)
+
+    def test_unreadable_path_bypasses_cache(self):
+        missing = os.path.join(self.test_dir, "missing.pdf")
+        self.assertIsNone(self.cache.fingerprint(missing))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+import httpx
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from ingest import Chunk, EmbeddingPipeline  # noqa: E402
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.writes = []
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.writes.append(list(ids))
+
+
+class SlowEmbedder:
+    """Tracks how many batches are in flight at once."""
+
+    def __init__(self, delay=0.0, failures=None):
+        self.delay = delay
+        self.failures = list(failures or [])
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.finished = 0
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        with self._lock:
+            self.calls.append(len(texts))
+            if self.failures:
+                raise self.failures.pop(0)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+            self.finished += len(texts)
+        return [[float(len(t))] for t in texts]
+
+
+def _chunks(n):
+    return [Chunk(f"id{i}", f"text {i}", {"n": i}) for i in range(n)]
+
+
+def _status_error(status):
+    request = httpx.Request("POST", "http://ollama/api/embed")
+    response = httpx.Response(status, request=request)
+    return httpx.HTTPStatusError("failed", request=request, response=response)
+
+
+class TestEmbeddingPipeline(unittest.TestCase):
+    def test_batches_and_bulk_writes(self):
+        embedder = SlowEmbedder()
+        collection = RecordingCollection()
+        pipeline = EmbeddingPipeline(
+            embedder, batch_size=4, concurrency=2, write_batch_size=8
+        )
+
+        stats = pipeline.run(_chunks(10), collection)
+
+        self.assertEqual(sorted(embedder.calls), [2, 4, 4])
+        self.assertEqual((stats.chunks, stats.batches, stats.retries), (10, 3, 0))
+        self.assertGreater(stats.chunks_per_second, 0)
+        written = [i for write in collection.writes for i in write]
+        self.assertEqual(sorted(written), sorted(c.id for c in _chunks(10)))
+        self.assertLessEqual(len(collection.writes), 2)
+
+    def test_backpressure_bounds_reading_ahead(self):
+        embedder = SlowEmbedder(delay=0.05)
+        pipeline = EmbeddingPipeline(embedder, batch_size=2, concurrency=2)
+        consumed = []
+
+        def produce():
+            for chunk in _chunks(40):
+                # 2 running + 2 queued batches of 2, plus the batch being built
+                self.assertLessEqual(len(consumed) - embedder.finished, 10)
+                consumed.append(chunk)
+                yield chunk
+
+        stats = pipeline.run(produce(), RecordingCollection())
+        self.assertEqual(stats.chunks, 40)
+        self.assertLessEqual(embedder.peak, 2)
+
+    def test_retries_transient_failures(self):
+        embedder = SlowEmbedder(failures=[_status_error(503), httpx.ConnectError("x")])
+        pipeline = EmbeddingPipeline(embedder, batch_size=10, backoff=0)
+
+        stats = pipeline.run(_chunks(3), RecordingCollection())
+        self.assertEqual((stats.chunks, stats.retries), (3, 2))
+
+    def test_permanent_failure_is_raised(self):
+        embedder = SlowEmbedder(failures=[_status_error(400)])
+        collection = RecordingCollection()
+        pipeline = EmbeddingPipeline(embedder, batch_size=10, backoff=0)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            pipeline.run(_chunks(3), collection)
+        self.assertEqual(collection.writes, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
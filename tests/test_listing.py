@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from listing import (  # noqa: E402
+    DirectoryCache,
+    format_entry,
+    is_ignored,
+    parse_gitignore,
+    walk_tree,
+)
+
+
+class TestGitignore(unittest.TestCase):
+    def test_patterns(self):
+        rules = parse_gitignore("# comment\n*.log\nbuild/\n/dist\ndocs/**/*.tmp\n")
+        self.assertTrue(is_ignored(rules, "a/b/debug.log", False))
+        self.assertTrue(is_ignored(rules, "pkg/build", True))
+        # Directory-only rules do not match files
+        self.assertFalse(is_ignored(rules, "pkg/build", False))
+        # Anchored rules only match at the .gitignore's level
+        self.assertTrue(is_ignored(rules, "dist", True))
+        self.assertFalse(is_ignored(rules, "pkg/dist", True))
+        self.assertTrue(is_ignored(rules, "docs/x.tmp", False))
+        self.assertTrue(is_ignored(rules, "docs/a/b/x.tmp", False))
+        self.assertFalse(is_ignored(rules, "src/main.py", False))
+
+    def test_negation_and_nested_base(self):
+        rules = parse_gitignore("*.log\n!keep.log\n")
+        rules += parse_gitignore("/local.txt\n", base="sub")
+        self.assertTrue(is_ignored(rules, "x.log", False))
+        self.assertFalse(is_ignored(rules, "keep.log", False))
+        self.assertTrue(is_ignored(rules, "sub/local.txt", False))
+        self.assertFalse(is_ignored(rules, "local.txt", False))
+
+
+class TestWalkTree(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for rel, content in {
+            ".gitignore": "*.log\nbuild/\n",
+            "README.md": "readme",
+            "src/app.py": "print(1)",
+            "src/pkg/util.py": "x = 1",
+            "src/pkg/deep/more.py": "",
+            "src/debug.log": "noise",
+            "build/out.bin": "",
+            ".git/HEAD": "ref",
+            "docs/.gitignore": "draft.md\n",
+            "docs/draft.md": "",
+            "docs/guide.md": "",
+        }.items():
+            path = os.path.join(self.root, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        self.cache = DirectoryCache(ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _paths(self, **kwargs):
+        return [p for p, _ in walk_tree(self.root, self.cache, **kwargs)]
+
+    def test_lists_tree_honoring_gitignore(self):
+        self.assertEqual(
+            self._paths(max_depth=0),
+            [
+                "docs",
+                "docs/.gitignore",
+                "docs/guide.md",
+                "src",
+                "src/pkg",
+                "src/pkg/deep",
+                "src/pkg/deep/more.py",
+                "src/pkg/util.py",
+                "src/app.py",
+                ".gitignore",
+                "README.md",
+            ],
+        )
+
+    def test_depth_pattern_and_ignore(self):
+        self.assertEqual(
+            self._paths(max_depth=2),
+            [
+                "docs",
+                "docs/.gitignore",
+                "docs/guide.md",
+                "src",
+                "src/pkg",
+                "src/app.py",
+                ".gitignore",
+                "README.md",
+            ],
+        )
+        self.assertEqual(
+            self._paths(max_depth=0, pattern="*.py"),
+            ["src/pkg/deep/more.py", "src/pkg/util.py", "src/app.py"],
+        )
+        self.assertEqual(
+            self._paths(max_depth=0, pattern="*.py", ignore=["pkg"]),
+            ["src/app.py"],
+        )
+        self.assertIn("build/out.bin", self._paths(max_depth=0, gitignore=False))
+
+    def test_subdirectory_honors_ancestor_gitignore(self):
+        for rel, content in {
+            "src/.gitignore": "/pkg/util.py\n",
+            "src/pkg/build/out.o": "",
+            "src/pkg/trace.log": "",
+        }.items():
+            path = os.path.join(self.root, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+
+        paths = [
+            p
+            for p, _ in walk_tree(
+                os.path.join(self.root, "src", "pkg"),
+                self.cache,
+                max_depth=0,
+                workspace=self.root,
+            )
+        ]
+        self.assertEqual(paths, ["deep", "deep/more.py"])
+
+    def test_max_entries_stops_the_walk(self):
+        self.assertEqual(
+            self._paths(max_depth=0, max_entries=3),
+            ["docs", "docs/.gitignore", "docs/guide.md"],
+        )
+
+    def test_cache_invalidated_by_directory_mtime(self):
+        src = os.path.join(self.root, "src")
+        first = self.cache.scan(src)
+        self.assertIs(self.cache.scan(src), first)
+
+        with open(os.path.join(src, "new.py"), "w") as f:
+            f.write("")
+        # Make sure the directory mtime moves even on coarse filesystems
+        stamp = time.time() + 5
+        os.utime(src, (stamp, stamp))
+        self.assertIn("new.py", [e.name for e in self.cache.scan(src)])
+
+    def test_format_entry_details(self):
+        entries = dict(walk_tree(self.root, self.cache))
+        self.assertEqual(format_entry("src", entries["src"]), "src/")
+        line = format_entry("README.md", entries["README.md"], details=True)
+        self.assertTrue(line.startswith("README.md\t6\t"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import smtplib
+import unittest
+from email.message import EmailMessage
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from mailer import SMTPDeliveryQueue  # noqa: E402
+
+
+class FakeSMTP:
+    """Records SMTP traffic; failures maps recipient -> exceptions to raise."""
+
+    instances = []
+
+    def __init__(self, host, port, timeout=None, failures=None):
+        self.failures = failures if failures is not None else {}
+        self.sent = []
+        self.logins = 0
+        self.noops = 0
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        self.logins += 1
+
+    def noop(self):
+        self.noops += 1
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("closed")
+        return (250, b"OK")
+
+    def send_message(self, msg, to_addrs):
+        pending = self.failures.get(to_addrs[0])
+        if pending:
+            error = pending.pop(0)
+            if isinstance(error, smtplib.SMTPServerDisconnected):
+                self.closed = True
+            raise error
+        self.sent.append((msg["Subject"], tuple(to_addrs)))
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+def _msg(subject):
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg.set_content("body")
+    return msg
+
+
+class TestSMTPDeliveryQueue(unittest.TestCase):
+    def setUp(self):
+        FakeSMTP.instances = []
+        self.failures = {}
+
+    def _queue(self, **kwargs):
+        def connect(host, port, timeout=None):
+            return FakeSMTP(host, port, timeout, self.failures)
+
+        return SMTPDeliveryQueue(
+            "relay", 587, "user", "pass", backoff=0, connect=connect, **kwargs
+        )
+
+    def test_reuses_one_connection_with_per_recipient_envelopes(self):
+        mailer = self._queue()
+        for i in range(5):
+            mailer.enqueue(_msg(f"Report {i}"), ["a@x.com", "b@x.com"])
+        mailer.join()
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(FakeSMTP.instances[0].logins, 1)
+        sent = FakeSMTP.instances[0].sent
+        self.assertEqual(len(sent), 10)
+        self.assertEqual(sent[0], ("Report 0", ("a@x.com",)))
+        self.assertEqual(mailer.stats()["sent"], 10)
+
+    def test_liveness_is_checked_once_per_batch(self):
+        mailer = self._queue()
+        mailer.enqueue(_msg("Report 0"), ["a@x.com", "b@x.com", "c@x.com"])
+        mailer.join()
+        mailer.enqueue(_msg("Report 1"), ["a@x.com", "b@x.com", "c@x.com"])
+        mailer.join()
+
+        smtp = FakeSMTP.instances[0]
+        self.assertEqual(len(smtp.sent), 6)
+        # Only the second batch found a connection to check
+        self.assertEqual(smtp.noops, 1)
+
+    def test_dead_connection_is_replaced_before_the_batch(self):
+        mailer = self._queue()
+        mailer.enqueue(_msg("Report 0"), ["a@x.com"])
+        mailer.join()
+        FakeSMTP.instances[0].closed = True
+        mailer.enqueue(_msg("Report 1"), ["a@x.com"])
+        mailer.join()
+
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(FakeSMTP.instances[1].sent, [("Report 1", ("a@x.com",))])
+        self.assertEqual(mailer.stats()["retries"], 0)
+
+    def test_reconnects_and_retries_after_disconnect(self):
+        self.failures["a@x.com"] = [smtplib.SMTPServerDisconnected("idle timeout")]
+        mailer = self._queue()
+        mailer.enqueue(_msg("Report"), ["a@x.com"])
+        mailer.join()
+
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(FakeSMTP.instances[1].sent, [("Report", ("a@x.com",))])
+        stats = mailer.stats()
+        self.assertEqual((stats["sent"], stats["retries"]), (1, 1))
+
+    def test_permanent_refusal_only_skips_that_recipient(self):
+        self.failures["bad@x.com"] = [
+            smtplib.SMTPRecipientsRefused({"bad@x.com": (550, b"No such user")})
+        ]
+        self.failures["busy@x.com"] = [
+            smtplib.SMTPRecipientsRefused({"busy@x.com": (451, b"Try later")})
+        ]
+        mailer = self._queue()
+        mailer.enqueue(_msg("Report"), ["bad@x.com", "busy@x.com", "ok@x.com"])
+        mailer.join()
+
+        recipients = [to[0] for _, to in FakeSMTP.instances[0].sent]
+        self.assertEqual(recipients, ["busy@x.com", "ok@x.com"])
+        stats = mailer.stats()
+        self.assertEqual((stats["sent"], stats["failed"]), (2, 1))
+
+    def test_idle_connection_is_closed(self):
+        mailer = self._queue(idle_timeout=0.05)
+        mailer.enqueue(_msg("Report"), ["a@x.com"])
+        mailer.join()
+        for _ in range(100):
+            if FakeSMTP.instances[0].closed:
+                break
+            time.sleep(0.01)
+        self.assertTrue(FakeSMTP.instances[0].closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,6 +29,8 @@ with patch("mcp.server.fastmcp.FastMCP") as MockFastMCP:
     importlib.reload(server)
     from server import app
 
+from executor import ToolFailure  # noqa: E402
+
 
 client = TestClient(app)
 
@@ -43,11 +45,23 @@ def test_health_check():
 @patch("server.scheduler")
 def test_list_tasks_api(mock_scheduler):
     """Verify list tasks endpoint."""
-    mock_scheduler.get_tasks.return_value = [{"id": "1", "name": "Task 1"}]
+    mock_scheduler.tasks_snapshot.return_value = (
+        '"v1"',
+        [{"id": "1", "name": "Task 1"}],
+    )
 
     response = client.get("/api/tasks")
     assert response.status_code == 200
     assert response.json() == [{"id": "1", "name": "Task 1"}]
+    assert response.headers["etag"] == '"v1"'
+
+    # Unchanged task list: a conditional poll gets an empty 304
+    response = client.get("/api/tasks", headers={"If-None-Match": '"v1"'})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get("/api/tasks", headers={"If-None-Match": '"v0"'})
+    assert response.status_code == 200
 
 
 @patch("server.scheduler")
@@ -66,6 +80,18 @@ def test_add_task_api(mock_scheduler):
     assert response.status_code == 400
 
 
+@patch("server.scheduler.scheduler")
+def test_add_task_api_rejects_invalid_budget(mock_bg):
+    """A bad budget is refused up front instead of failing in the job."""
+    payload = {"title": "T", "prompt": "P", "schedule": "0 8 * * *"}
+
+    for budget in ({"max_tokens": "lots"}, {"max_duration": -1}, {"max_tokens": 0}):
+        response = client.post("/api/tasks", json={**payload, **budget})
+        assert response.status_code == 400
+        assert "must be a positive" in response.json()["error"]
+    mock_bg.add_job.assert_not_called()
+
+
 @patch("server.scheduler")
 def test_delete_task_api(mock_scheduler):
     """Verify delete task endpoint."""
@@ -88,6 +114,47 @@ def test_run_task_api(mock_scheduler):
     mock_scheduler.run_task.assert_called_with("job123")
 
     # Test failure
-    mock_scheduler.run_task.return_value = "Error: Not found"
+    mock_scheduler.run_task.return_value = ToolFailure("Error: Not found")
     response = client.post("/api/tasks/invalid/run")
     assert response.status_code == 404
+
+
+def test_search_stats_api():
+    """Verify search cache counters endpoint."""
+    response = client.get("/api/search/stats")
+    assert response.status_code == 200
+    assert {"hits", "misses", "coalesced"} <= set(response.json())
+
+
+@patch("server.scheduler")
+def test_task_runs_api(mock_scheduler):
+    """Verify run history endpoints."""
+    mock_scheduler.get_runs.return_value = {"job_id": "job123", "runs": []}
+    response = client.get("/api/tasks/job123/runs?limit=5")
+    assert response.status_code == 200
+    assert response.json()["job_id"] == "job123"
+    mock_scheduler.get_runs.assert_called_with("job123", 5)
+
+    response = client.get("/api/tasks/job123/runs?limit=x")
+    assert response.status_code == 400
+
+    mock_scheduler.runs_summary.return_value = [{"job_id": "job123"}]
+    response = client.get("/api/runs/summary")
+    assert response.json() == [{"job_id": "job123"}]
+
+
+@patch("server.scheduler")
+def test_scheduler_stats_api(mock_scheduler):
+    """Verify scheduler stats endpoint."""
+    mock_scheduler.stats.return_value = {"threads": 8, "llm": {"waiting": 0}}
+    response = client.get("/api/scheduler/stats")
+    assert response.status_code == 200
+    assert response.json()["threads"] == 8
+
+
+def test_metrics_endpoint():
+    """Verify Prometheus metrics endpoint."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE mcp_tool_duration_seconds histogram" in response.text
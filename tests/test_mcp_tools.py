@@ -1,7 +1,8 @@
 import os
 import shutil
+import asyncio
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import subprocess
 
@@ -31,12 +32,20 @@ with patch("mcp.server.fastmcp.FastMCP", return_value=mock_mcp):
         read_file,
         write_file,
         edit_file,
+        batch_edit_file,
+        list_tree,
+        semantic_search,
         list_directory,
         run_command,
+        run_command_stream,
         scrape_url,
+        scrape_urls,
         search_code,
         _validate_path,
     )
+    from code_index import CodeIndex
+    from commands import ProcessResult
+    from pytest_worker import PytestRun
 
 
 class TestMCPTools(unittest.TestCase):
@@ -76,6 +85,35 @@ class TestMCPTools(unittest.TestCase):
         read_content = read_file(filename)
         self.assertEqual(read_content, content)
 
+    def test_read_file_slices(self):
+        filename = "long.txt"
+        write_file(filename, "".join(f"line {i}\n" for i in range(1, 11)))
+
+        result = read_file(filename, offset=2, limit=3)
+        self.assertEqual(
+            result, "[Lines 3-5 of 71 bytes; next offset=5]\nline 3\nline 4\nline 5\n"
+        )
+
+        result = read_file(filename, offset=8)
+        self.assertEqual(result, "[Lines 9-10 of 71 bytes]\nline 9\nline 10\n")
+
+        # Negative offsets and limits are clamped rather than mis-slicing
+        result = read_file(filename, offset=-4, limit=2)
+        self.assertEqual(
+            result, "[Lines 1-2 of 71 bytes; next offset=2]\nline 1\nline 2\n"
+        )
+        result = read_file(filename, offset=9, limit=-1)
+        self.assertEqual(result, "[Lines 10-10 of 71 bytes]\nline 10\n")
+
+        result = read_file(filename, offset=20, limit=5)
+        self.assertEqual(result, "[Lines: none returned, offset 20 is past the end]\n")
+
+        result = read_file(filename, offset=7, limit=6, unit="bytes")
+        self.assertEqual(result, "[Bytes 8-13 of 71; next offset=13]\nline 2")
+
+        result = read_file(filename, limit=1, unit="pages")
+        self.assertIn("unit must be", result)
+
     def test_edit_file(self):
         filename = "edit_test.txt"
         initial_content = "Hello, World!"
@@ -89,6 +127,152 @@ class TestMCPTools(unittest.TestCase):
         new_content = read_file(filename)
         self.assertEqual(new_content, "Hello, Nebulus!")
 
+    def test_batch_edit_file(self):
+        filename = "batch.py"
+        write_file(filename, "def foo():\n    return 1\n\n\ndef bar():\n    return 2\n")
+
+        result = batch_edit_file(
+            filename,
+            [
+                {"target_text": "def foo", "replacement_text": "def first"},
+                {"target_text": "return 2", "replacement_text": "return first()"},
+            ],
+        )
+        self.assertTrue(result.startswith("Successfully applied 2 edits"))
+        self.assertIn("-def foo():\n+def first():", result)
+        self.assertEqual(
+            read_file(filename),
+            "def first():\n    return 1\n\n\ndef bar():\n    return first()\n",
+        )
+
+        # A missing target aborts the whole batch
+        before = read_file(filename)
+        result = batch_edit_file(
+            filename,
+            [
+                {"target_text": "def first", "replacement_text": "def one"},
+                {"target_text": "missing", "replacement_text": "x"},
+            ],
+        )
+        self.assertIn("Edit 2 target text missing", result)
+        self.assertEqual(read_file(filename), before)
+
+    def test_writes_are_atomic(self):
+        write_file("atomic.txt", "old")
+        os.chmod(os.path.join(self.test_dir, "atomic.txt"), 0o640)
+
+        with patch("os.replace", side_effect=OSError("disk full")):
+            result = write_file("atomic.txt", "new")
+
+        self.assertIn("Error writing file", result)
+        self.assertEqual(read_file("atomic.txt"), "old")
+        # No temp files are left behind
+        self.assertEqual(os.listdir(self.test_dir), ["atomic.txt"])
+
+        edit_file("atomic.txt", "old", "new")
+        mode = os.stat(os.path.join(self.test_dir, "atomic.txt")).st_mode & 0o777
+        self.assertEqual(mode, 0o640)
+
+    def test_writes_keep_links(self):
+        target = os.path.join(self.test_dir, "real.txt")
+        write_file("real.txt", "one")
+        os.symlink(target, os.path.join(self.test_dir, "alias.txt"))
+        os.link(target, os.path.join(self.test_dir, "twin.txt"))
+
+        write_file("alias.txt", "two")
+        self.assertTrue(os.path.islink(os.path.join(self.test_dir, "alias.txt")))
+        self.assertEqual(read_file("twin.txt"), "two")
+
+        edit_file("twin.txt", "two", "three")
+        self.assertEqual(os.stat(target).st_nlink, 2)
+        self.assertEqual(read_file("alias.txt"), "three")
+        self.assertEqual(
+            sorted(os.listdir(self.test_dir)), ["alias.txt", "real.txt", "twin.txt"]
+        )
+
+    def test_edit_large_file_uses_mmap(self):
+        path = os.path.join(self.test_dir, "big.log")
+        with open(path, "wb") as f:
+            f.write(b"x" * 3000 + "caf\u00e9 marker".encode() + b"y" * 3000)
+
+        # Small copy chunks make the splice cross several chunk boundaries
+        with (
+            patch("server.EDIT_MMAP_THRESHOLD", 1024),
+            patch("fileops.COPY_CHUNK_BYTES", 1000),
+            patch(
+                "server.fileops.mmap_replace", wraps=server.fileops.mmap_replace
+            ) as mmap_replace,
+        ):
+            result = edit_file("big.log", "caf\u00e9 marker", "done")
+            missing = edit_file("big.log", "caf\u00e9 marker", "again")
+
+        self.assertEqual(result, "Successfully edited big.log")
+        self.assertEqual(missing, "Error: Target text missing from big.log")
+        self.assertEqual(mmap_replace.call_count, 2)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"x" * 3000 + b"done" + b"y" * 3000)
+
+    def test_edit_paths_agree(self):
+        path = os.path.join(self.test_dir, "crlf.txt")
+        # 0 sends every file through mmap_replace, 2**40 none of them
+        for threshold in (0, 2**40):
+            with patch("server.EDIT_MMAP_THRESHOLD", threshold):
+                with open(path, "wb") as f:
+                    f.write(b"one\r\ntwo\r\nthree\r\n")
+                self.assertIn("Successfully", edit_file("crlf.txt", "two", "2"))
+                self.assertIn("missing", edit_file("crlf.txt", "one\nthree", "x"))
+                self.assertIn("must not be empty", edit_file("crlf.txt", "", "x"))
+                with open(path, "rb") as f:
+                    self.assertEqual(f.read(), b"one\r\n2\r\nthree\r\n")
+
+                open(path, "wb").close()
+                self.assertIn("missing", edit_file("crlf.txt", "two", "2"))
+                self.assertIn("must not be empty", edit_file("crlf.txt", "", "x"))
+                self.assertEqual(os.path.getsize(path), 0)
+
+    def test_list_tree(self):
+        for name in ("a.py", "b.py", "c.txt", "pkg/d.py"):
+            write_file(name, "x")
+
+        result = list_tree(".", pattern="*.py")
+        self.assertEqual(result.splitlines(), ["pkg/d.py", "a.py", "b.py"])
+
+        result = list_tree(".", offset=1, limit=2)
+        self.assertEqual(
+            result.splitlines(),
+            ["[Entries 2-3; next offset=3]", "pkg/d.py", "a.py"],
+        )
+        result = list_tree(".", offset=3, limit=5)
+        self.assertEqual(result.splitlines(), ["[Entries 4-5 of 5]", "b.py", "c.txt"])
+        self.assertIn("Error listing tree", list_tree("a.py"))
+
+    def test_semantic_search(self):
+        hit = {
+            "path": "src/app.py",
+            "start_line": 1,
+            "end_line": 2,
+            "score": 0.8123,
+            "text": "def main():\n    return 1\n",
+        }
+        with patch("server.semantic_index") as index:
+            index.search.return_value = [hit]
+            index.pending = False
+            result = semantic_search("entry point", 3)
+            index.search.assert_called_once_with(
+                "entry point", 3, os.path.join(self.test_dir, ".")
+            )
+            self.assertEqual(
+                result, "src/app.py:1-2 (score 0.81)\ndef main():\n    return 1\n"
+            )
+
+            index.pending = True
+            self.assertTrue(
+                semantic_search("entry point").startswith("[Index still building")
+            )
+
+            index.search.side_effect = ConnectionError("chroma down")
+            self.assertIn("Error executing semantic search", semantic_search("x"))
+
     def test_list_directory(self):
         os.makedirs(os.path.join(self.test_dir, "subdir"), exist_ok=True)
         write_file("subdir/file1.txt", "content")
@@ -131,15 +315,66 @@ class TestMCPTools(unittest.TestCase):
         result = run_command("echo test_timeout")
         self.assertIn("Error: Command timed out", result)
 
-    @patch("httpx.Client")
-    def test_scrape_url(self, mock_client_cls):
-        # Mock client context manager
+    @patch("subprocess.run")
+    def test_run_command_uses_warm_pytest_worker(self, mock_run):
+        worker = MagicMock()
+        worker.run.return_value = PytestRun(0, "3 passed", "", False)
+        with patch("server.pytest_worker", worker):
+            result = run_command("pytest -q tests")
+
+        self.assertEqual(result, "3 passed")
+        worker.run.assert_called_with(["-q", "tests"], timeout=30)
+        mock_run.assert_not_called()
+
+        # Falls back to a cold subprocess if the worker is unavailable
+        worker.run.side_effect = RuntimeError("pytest worker failed to start")
+        mock_run.return_value = MagicMock(returncode=0, stdout="cold")
+        with patch("server.pytest_worker", worker):
+            self.assertEqual(run_command("pytest -q"), "cold")
+
+        worker.run.side_effect = ValueError("Expecting value")
+        with patch("server.pytest_worker", worker):
+            self.assertEqual(run_command("pytest -q"), "cold")
+
+    def test_run_command_stream(self):
+        ctx = MagicMock()
+        ctx.info = AsyncMock()
+        ctx.report_progress = AsyncMock()
+
+        async def fake_stream(args, cwd, timeout, on_output, max_chars):
+            await on_output("collected 3 items\n")
+            return ProcessResult(0, "collected 3 items\n3 passed\n", "", False)
+
+        with patch("commands.stream_process", side_effect=fake_stream) as mock_stream:
+            result = asyncio.run(run_command_stream("pytest -q", ctx))
+
+        self.assertEqual(result, "collected 3 items\n3 passed\n")
+        self.assertEqual(mock_stream.call_args.args[0], ["pytest", "-q"])
+        ctx.info.assert_awaited_with("collected 3 items\n")
+
+        # Same allowlist as run_command
+        result = asyncio.run(run_command_stream("rm -rf /", ctx))
+        self.assertIn("not allowed", result)
+
+        # Timeouts keep the partial output
+        timed_out = ProcessResult(None, "partial\n", "", True)
+        with patch("commands.stream_process", AsyncMock(return_value=timed_out)):
+            result = asyncio.run(run_command_stream("pytest", ctx))
+        self.assertTrue(result.startswith("Error: Command timed out"))
+        self.assertIn("partial", result)
+
+    @patch("server.scrape_cache", None)
+    @patch("scraper.get_client")
+    def test_scrape_url(self, mock_get_client):
+        # Mock shared async client
         mock_client = MagicMock()
-        mock_client_cls.return_value.__enter__.return_value = mock_client
+        mock_client.get = AsyncMock()
+        mock_get_client.return_value = mock_client
 
         # Mock response
         mock_response = MagicMock()
         mock_response.status_code = 200
+        mock_response.headers = {}
         mock_response.text = (
             "<html><body><h1>Title</h1><p>Content  with  spaces</p>"
             "<script>var x=1;</script></body></html>"
@@ -147,7 +382,7 @@ class TestMCPTools(unittest.TestCase):
         mock_client.get.return_value = mock_response
 
         # Call scrape_url
-        result = scrape_url("https://example.com")
+        result = asyncio.run(scrape_url("https://example.com"))
 
         # Verify
         self.assertIn("Title", result)
@@ -168,50 +403,74 @@ class TestMCPTools(unittest.TestCase):
 
         # Test request error
         mock_client.get.side_effect = Exception("Connection error")
-        result = scrape_url("https://example.com")
+        result = asyncio.run(scrape_url("https://example.com"))
         self.assertIn("Unexpected error", result)
 
-    @patch("subprocess.run")
-    def test_search_code(self, mock_run):
-        # Configure successful search
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "file.py:10:def foo():"
-        mock_run.return_value = mock_result
+        # Test invalid scheme
+        result = asyncio.run(scrape_url("ftp://example.com"))
+        self.assertIn("Error: Invalid URL", result)
+
+    @patch("server.scrape_cache", None)
+    @patch("scraper.get_client")
+    def test_scrape_urls(self, mock_get_client):
+        async def get(url, headers):
+            if "broken" in url:
+                raise Exception("Connection error")
+            response = MagicMock()
+            response.headers = {}
+            response.text = f"<p>Page {url[-1]}</p>"
+            return response
 
-        # Test search
-        result = search_code("def foo")
-        self.assertEqual(result, "file.py:10:def foo():")
+        mock_client = MagicMock()
+        mock_client.get = AsyncMock(side_effect=get)
+        mock_get_client.return_value = mock_client
+
+        result = asyncio.run(
+            scrape_urls(
+                [
+                    "https://a.test/1",
+                    "https://broken.test/2",
+                    "ftp://a.test/3",
+                    "https://a.test/1",
+                ]
+            )
+        )
 
-        # Verify command arguments
-        mock_run.assert_called_with(
+        self.assertEqual(
+            result.split("\n---\n"),
             [
-                "grep",
-                "-r",
-                "-n",
-                "-I",
-                "-H",
-                "--exclude-dir={.git,__pycache__,node_modules,venv,.env}",
-                "def foo",
-                self.test_dir
-                + "/.",  # Should use test_dir because of mock_validate side_effect
+                "URL: https://a.test/1\nPage 1",
+                "URL: https://broken.test/2\nUnexpected error: Connection error",
+                "URL: ftp://a.test/3\n"
+                "Error: Invalid URL. Must start with http:// or https://",
             ],
-            cwd="/workspace",
-            capture_output=True,
-            text=True,
-            timeout=30,
         )
+        # Duplicate URLs are fetched once
+        self.assertEqual(mock_client.get.call_count, 2)
+
+        self.assertIn("No URLs", asyncio.run(scrape_urls([])))
+
+    def test_search_code(self):
+        write_file("pkg/module.py", "import os\n\ndef foo():\n    return 1\n")
+        write_file("other.txt", "nothing to see")
+
+        index = CodeIndex(self.test_dir, os.path.join(self.test_dir, ".index.db"))
+        with patch("server.code_index", index):
+            # Test search
+            result = search_code("def foo")
+            module_path = os.path.join(self.test_dir, "pkg", "module.py")
+            self.assertEqual(result, f"{module_path}:3:def foo():")
+
+            # Test scoped search
+            self.assertEqual(search_code("def foo", "pkg"), result)
 
-        # Test no matches
-        mock_result.returncode = 1
-        result = search_code("missing_pattern")
-        self.assertEqual(result, "No matches found.")
+            # Test no matches
+            result = search_code("missing_pattern")
+            self.assertEqual(result, "No matches found.")
 
-        # Test grep error
-        mock_result.returncode = 2
-        mock_result.stderr = "grep error"
-        result = search_code("bad_pattern")
-        self.assertIn("Error executing grep", result)
+            # Test invalid regex
+            result = search_code("bad(pattern")
+            self.assertIn("Error: Invalid regex", result)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,50 @@
+import os
+import time
+import shutil
+import multiprocessing
 import unittest
 from unittest.mock import MagicMock, patch
 from mcp_server.server import read_pdf, read_docx
+from mcp_server.documents import ExtractionEngine, pdf_pages
+
+
+def _build_pdf(page_texts):
+    """Assemble a minimal, valid PDF with one line of text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None]
+    font_id = 3
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> "
+            f"/Contents {content_id} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode("latin-1")
+    return out
 
 
 class TestDocumentParsers(unittest.TestCase):
     @patch("mcp_server.server._validate_path")
-    @patch("mcp_server.server.pypdf.PdfReader")
+    @patch("pypdf.PdfReader")
     def test_read_pdf(self, mock_pdf_reader, mock_validate):
         # Setup
         mock_validate.return_value = "/workspace/resume.pdf"
@@ -28,7 +67,7 @@ class TestDocumentParsers(unittest.TestCase):
         mock_pdf_reader.assert_called_with("/workspace/resume.pdf")
 
     @patch("mcp_server.server._validate_path")
-    @patch("mcp_server.server.docx.Document")
+    @patch("docx.Document")
     def test_read_docx(self, mock_docx_document, mock_validate):
         # Setup
         mock_validate.return_value = "/workspace/notes.docx"
@@ -50,6 +89,114 @@ class TestDocumentParsers(unittest.TestCase):
         self.assertIn("Paragraph 2", result)
         mock_docx_document.assert_called_with("/workspace/notes.docx")
 
+    @patch("mcp_server.server._validate_path")
+    @patch("pypdf.PdfReader")
+    def test_read_pdf_page_range(self, mock_pdf_reader, mock_validate):
+        mock_validate.return_value = "/workspace/report.pdf"
+
+        pages = []
+        for i in range(5):
+            page = MagicMock()
+            page.extract_text.return_value = f"Page {i + 1} Content"
+            pages.append(page)
+        mock_pdf_reader.return_value.pages = pages
+
+        result = read_pdf("report.pdf", offset=1, limit=2)
+
+        self.assertTrue(result.startswith("[Pages 2-3 of 5; next offset=3]"))
+        self.assertIn("Page 2 Content", result)
+        self.assertIn("Page 3 Content", result)
+        self.assertNotIn("Page 4 Content", result)
+        # Pages outside the window are never extracted
+        pages[0].extract_text.assert_not_called()
+        pages[4].extract_text.assert_not_called()
+
+    @patch("mcp_server.server._validate_path")
+    @patch("docx.Document")
+    def test_read_docx_paragraph_range(self, mock_docx_document, mock_validate):
+        mock_validate.return_value = "/workspace/notes.docx"
+
+        paragraphs = []
+        for i in range(3):
+            para = MagicMock()
+            para.text = f"Paragraph {i + 1}"
+            paragraphs.append(para)
+        mock_docx_document.return_value.paragraphs = paragraphs
+
+        result = read_docx("notes.docx", offset=2)
+
+        self.assertEqual(result, "[Paragraphs 3-3 of 3]\nParagraph 3")
+
+
+class TestExtractionEngine(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.abspath("tests/test_engine_workspace")
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.pdf_path = os.path.join(self.test_dir, "long.pdf")
+        with open(self.pdf_path, "wb") as f:
+            f.write(_build_pdf([f"Section {i}" for i in range(1, 21)]))
+        self.engine = ExtractionEngine(max_workers=2, min_parallel_pages=8)
+
+    def tearDown(self):
+        self.engine.shutdown()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_parallel_extraction_preserves_order(self):
+        result = pdf_pages(self.pdf_path, engine=self.engine)
+        self.assertEqual(list(result.parts), [f"Section {i}" for i in range(1, 21)])
+        self.assertIsNotNone(self.engine._pool)
+
+    def test_small_windows_stay_serial(self):
+        result = pdf_pages(self.pdf_path, 4, 3, engine=self.engine)
+        self.assertEqual(list(result.parts), ["Section 5", "Section 6", "Section 7"])
+        self.assertIsNone(self.engine._pool)
+
+    @patch("mcp_server.documents.as_completed")
+    def test_time_budget_cancels_only_own_work(self, mock_as_completed):
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+
+        mock_as_completed.side_effect = FutureTimeoutError()
+        pool = MagicMock()
+        pool.submit.return_value.running.return_value = False
+        self.engine._pool = pool
+        with self.assertRaises(TimeoutError):
+            self.engine.extract_pdf(self.pdf_path, list(range(20)))
+        pool.submit.return_value.cancel.assert_called()
+        pool.shutdown.assert_not_called()
+        self.assertIs(self.engine._pool, pool)
+        self.engine._pool = None
+
+    @patch("mcp_server.documents.as_completed")
+    def test_time_budget_kills_hung_workers(self, mock_as_completed):
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+
+        def hang(futures, timeout):
+            while not any(future.running() for future in futures):
+                time.sleep(0.01)
+            raise FutureTimeoutError()
+
+        mock_as_completed.side_effect = hang
+        before = set(multiprocessing.active_children())
+        pool = self.engine._get_pool()
+        with self.assertRaises(TimeoutError):
+            self.engine.extract_pdf(self.pdf_path, list(range(20)))
+
+        self.assertFalse(set(multiprocessing.active_children()) - before)
+        self.assertIsNone(self.engine._pool)
+        self.assertIsNot(self.engine._get_pool(), pool)
+
+    def test_broken_pool_falls_back_to_serial(self):
+        from concurrent.futures.process import BrokenProcessPool
+
+        pool = MagicMock()
+        pool._processes = {}
+        pool.submit.return_value.result.side_effect = BrokenProcessPool()
+        self.engine._pool = pool
+        with patch("mcp_server.documents.as_completed", side_effect=lambda f, **_: f):
+            result = self.engine.extract_pdf(self.pdf_path, list(range(20)))
+        self.assertEqual(result, {})
+        self.assertIsNone(self.engine._pool)
+
 
 if __name__ == "__main__":
     unittest.main()
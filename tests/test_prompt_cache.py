@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from prompt_cache import PromptCache, prompt_key  # noqa: E402
+
+
+class TestPromptKey(unittest.TestCase):
+    def test_whitespace_is_normalized(self):
+        self.assertEqual(
+            prompt_key("m", "Summarize  overnight\nalerts ", {}),
+            prompt_key("m", "Summarize overnight alerts", {}),
+        )
+
+    def test_model_and_options_are_part_of_the_key(self):
+        base = prompt_key("m", "p", {})
+        self.assertNotEqual(base, prompt_key("other", "p", {}))
+        self.assertNotEqual(base, prompt_key("m", "p", {"max_tokens": 10}))
+
+
+class TestPromptCache(unittest.TestCase):
+    def test_hit_within_ttl(self):
+        cache = PromptCache(ttl=60)
+        calls = []
+
+        def generate():
+            calls.append(1)
+            return "report"
+
+        self.assertEqual(cache.get_or_generate("m", "p", {}, generate), "report")
+        self.assertEqual(cache.get_or_generate("m", " p ", {}, generate), "report")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_concurrent_identical_prompts_share_one_call(self):
+        cache = PromptCache(ttl=60)
+        calls = []
+        started = threading.Event()
+
+        def generate():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return "report"
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            first = pool.submit(cache.get_or_generate, "m", "p", {}, generate)
+            started.wait()
+            others = [
+                pool.submit(cache.get_or_generate, "m", "p", {}, generate)
+                for _ in range(3)
+            ]
+            results = [f.result() for f in [first] + others]
+
+        self.assertEqual(results, ["report"] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["coalesced"], 3)
+
+    def test_failures_are_not_cached(self):
+        cache = PromptCache(ttl=60)
+
+        def fail():
+            raise RuntimeError("ollama down")
+
+        with self.assertRaises(RuntimeError):
+            cache.get_or_generate("m", "p", {}, fail)
+        self.assertEqual(cache.get_or_generate("m", "p", {}, lambda: "ok"), "ok")
+
+    def test_rejected_results_are_not_cached(self):
+        cache = PromptCache(ttl=60)
+        results = iter(["", "partial [truncated]", "report"])
+
+        def generate():
+            return next(results)
+
+        def complete(text):
+            return bool(text) and not text.endswith("[truncated]")
+
+        for expected in ("", "partial [truncated]", "report", "report"):
+            self.assertEqual(
+                cache.get_or_generate("m", "p", {}, generate, cacheable=complete),
+                expected,
+            )
+        self.assertEqual(cache.stats()["misses"], 3)
+
+    def test_fresh_skips_finished_results(self):
+        cache = PromptCache(ttl=60)
+        results = iter(["first", "second"])
+        cache.get_or_generate("m", "p", {}, lambda: next(results))
+
+        fresh = cache.get_or_generate("m", "p", {}, lambda: next(results), fresh=True)
+        self.assertEqual(fresh, "second")
+        self.assertEqual(cache.get_or_generate("m", "p", {}, lambda: "x"), "second")
+
+    def test_fresh_joins_generation_in_flight(self):
+        cache = PromptCache(ttl=60)
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            time.sleep(0.1)
+            return "report"
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(cache.get_or_generate, "m", "p", {}, slow)
+            started.wait()
+            self.assertEqual(
+                cache.get_or_generate("m", "p", {}, lambda: "other", fresh=True),
+                "report",
+            )
+            first.result()
+        self.assertEqual(cache.stats()["coalesced"], 1)
+
+    def test_zero_ttl_disables_cache(self):
+        cache = PromptCache(ttl=0)
+        calls = []
+        for _ in range(2):
+            cache.get_or_generate("m", "p", {}, lambda: calls.append(1) or "r")
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
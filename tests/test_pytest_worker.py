@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from pytest_worker import PytestWorker, workspace_fingerprint  # noqa: E402
+
+ARGS = ["-q", "-p", "no:cacheprovider"]
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "warm worker requires fork")
+class TestPytestWorker(unittest.TestCase):
+    def setUp(self):
+        # Outside the repo so its pytest configuration does not apply
+        self.test_dir = tempfile.mkdtemp(prefix="nebulus-worker-")
+        self._write("test_sample.py", "def test_ok():\n    assert True\n")
+        self.worker = PytestWorker(self.test_dir)
+
+    def tearDown(self):
+        self.worker.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.test_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        # Make sure the mtime moves even on coarse-grained filesystems
+        future = time.time() + len(content)
+        os.utime(path, (future, future))
+
+    def test_repeated_runs_reuse_the_zygote(self):
+        first = self.worker.run(ARGS)
+        zygote = self.worker._process.pid
+        second = self.worker.run(ARGS)
+
+        self.assertEqual(first.returncode, 0)
+        self.assertIn("1 passed", first.stdout)
+        self.assertEqual(second.returncode, 0)
+        self.assertEqual(self.worker._process.pid, zygote)
+
+    def test_workspace_change_restarts_zygote(self):
+        self.worker.run(ARGS)
+        zygote = self.worker._process.pid
+
+        self._write("test_sample.py", "def test_bad():\n    assert False\n")
+        result = self.worker.run(ARGS)
+
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("1 failed", result.stdout)
+        self.assertNotEqual(self.worker._process.pid, zygote)
+
+    def test_runs_do_not_leak_state(self):
+        self._write(
+            "test_state.py",
+            "import sys\n\n"
+            "def test_fresh():\n"
+            "    assert not hasattr(sys, 'leaked')\n"
+            "    sys.leaked = True\n",
+        )
+        self.assertEqual(self.worker.run(ARGS).returncode, 0)
+        self.assertEqual(self.worker.run(ARGS).returncode, 0)
+
+    def test_timeout(self):
+        self._write(
+            "test_slow.py", "import time\n\ndef test_slow():\n    time.sleep(10)\n"
+        )
+        result = self.worker.run(ARGS, timeout=0.5)
+        self.assertTrue(result.timed_out)
+        self.assertIsNone(result.returncode)
+
+    def test_concurrent_runs_overlap(self):
+        self._write(
+            "test_sample.py", "import time\n\ndef test_ok():\n    time.sleep(1)\n"
+        )
+        self.worker.run(ARGS)
+
+        results = []
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=lambda: results.append(self.worker.run(ARGS)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([r.returncode for r in results], [0, 0, 0])
+        self.assertLess(time.monotonic() - started, 2.5)
+
+    def test_restart_lets_runs_in_flight_finish(self):
+        self._write(
+            "test_sample.py", "import time\n\ndef test_ok():\n    time.sleep(1)\n"
+        )
+        self.worker.run(ARGS, timeout=5)
+
+        results = []
+        slow = threading.Thread(target=lambda: results.append(self.worker.run(ARGS)))
+        slow.start()
+        time.sleep(0.3)
+        self._write("test_other.py", "def test_other():\n    pass\n")
+        self.worker.run(ARGS + ["test_other.py"])
+        slow.join()
+
+        self.assertEqual(results[0].returncode, 0)
+        self.assertIn("1 passed", results[0].stdout)
+
+    def test_garbage_ready_line_fails_to_start(self):
+        process = MagicMock()
+        process.stdout.readline.return_value = "not json\n"
+        with patch("subprocess.Popen", return_value=process):
+            with self.assertRaises(RuntimeError):
+                self.worker.run(ARGS)
+        process.kill.assert_called_once()
+
+    def test_fingerprint_ignores_non_python_files(self):
+        before = workspace_fingerprint(self.test_dir)
+        with open(os.path.join(self.test_dir, "notes.txt"), "w") as f:
+            f.write("ignored")
+        self.assertEqual(workspace_fingerprint(self.test_dir), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from run_history import RunHistory, percentile  # noqa: E402
+
+
+class TestPercentile(unittest.TestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        self.assertIsNone(percentile([], 50))
+
+
+class TestRunHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.history = RunHistory(os.path.join(self.tmp, "runs.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_run_lifecycle(self):
+        run_id = self.history.start("job1", "Daily", scheduled_at=None)
+        self.assertEqual(self.history.runs("job1")[0]["status"], "running")
+
+        self.history.update(run_id, tokens=42, ttft=0.5, bogus="ignored")
+        self.history.update(run_id, status="ok", finished_at=1e12)
+        run = self.history.runs("job1")[0]
+        self.assertEqual((run["status"], run["tokens"], run["ttft"]), ("ok", 42, 0.5))
+        self.assertIsNone(run["queue_delay"])
+        self.assertEqual(self.history.runs("other"), [])
+
+    def test_queue_delay_and_summary(self):
+        for i in range(20):
+            run_id = self.history.start("job1", "Daily", scheduled_at=0)
+            self.history.update(
+                run_id,
+                status="ok" if i else "llm_error",
+                finished_at=self.history.runs("job1", 1)[0]["started_at"] + i,
+                llm_seconds=float(i),
+            )
+        self.history.start("job2", "Unfinished")
+
+        self.assertGreater(self.history.runs("job1")[0]["queue_delay"], 0)
+        summary = self.history.summary()
+        self.assertEqual(set(summary), {"job1"})
+        stats = summary["job1"]
+        self.assertEqual((stats["runs"], stats["errors"]), (20, 1))
+        self.assertAlmostEqual(stats["p50_duration"], 9, places=3)
+        self.assertAlmostEqual(stats["p95_duration"], 18, places=3)
+        self.assertEqual(stats["p95_llm_seconds"], 18.0)
+
+    def test_retention_keeps_newest_runs_per_job(self):
+        history = RunHistory(os.path.join(self.tmp, "kept.db"), keep_runs=3)
+        for i in range(5):
+            history.update(history.start("job1", f"Run {i}"), status="ok")
+        history.start("job2", "Other")
+
+        self.assertEqual(
+            [r["title"] for r in history.runs("job1")], ["Run 4", "Run 3", "Run 2"]
+        )
+        self.assertEqual(len(history.runs("job2")), 1)
+
+    def test_retention_drops_old_runs(self):
+        history = RunHistory(os.path.join(self.tmp, "aged.db"), max_age=60)
+        with patch("run_history.time.time", return_value=1000.0):
+            history.start("gone", "Deleted job")
+        history.start("job1", "Daily")
+        self.assertEqual(history.runs("gone"), [])
+
+    def test_summary_uses_recent_window(self):
+        for i in range(6):
+            run_id = self.history.start("job1", "Daily")
+            started = self.history.runs("job1", 1)[0]["started_at"]
+            self.history.update(run_id, status="ok", finished_at=started + i)
+        with patch("run_history.SUMMARY_WINDOW", 2):
+            stats = self.history.summary("job1")["job1"]
+        self.assertEqual(stats["runs"], 2)
+        self.assertAlmostEqual(stats["p95_duration"], 5, places=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,34 @@
+import os
+import sys
+import json
+import time
+import threading
+import httpx
 import pytest
+from apscheduler.triggers.cron import CronTrigger
 from unittest.mock import patch, MagicMock
-from mcp_server.scheduler import TaskScheduler, execute_prompt_and_email
+
+# scheduler imports its sibling modules flat, as it does in the container
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from mcp_server.scheduler import (  # noqa: E402
+    OLLAMA_TIMEOUT,
+    PRIORITY_MANUAL,
+    SCHEDULER_THREADS,
+    PriorityGate,
+    TaskScheduler,
+    _pop_scheduled_time,
+    execute_prompt_and_email,
+    generate_llm_response,
+    get_ollama_client,
+    is_complete_report,
+    send_email,
+    stream_generation,
+)
+from prompt_cache import PromptCache  # noqa: E402
+from run_history import RunHistory  # noqa: E402
 
 
 @pytest.fixture
@@ -39,18 +67,17 @@ def test_execute_job(mock_email, mock_llm):
 
 def test_list_tasks(mock_scheduler):
     ts, mock_bg_instance = mock_scheduler
+    assert ts.list_tasks() == "No scheduled tasks found."
 
-    # Mocking get_jobs
-    mock_job = MagicMock()
-    mock_job.id = "job123"
-    mock_job.name = "Test Job"
-    mock_job.next_run_time.isoformat.return_value = "2024-01-01T12:00:00"
-
-    mock_bg_instance.get_jobs.return_value = [mock_job]
+    ts.add_task("Test Job", "Prompt", "0 8 * * *", ["a@x.com"])
+    job_id = mock_bg_instance.add_job.call_args.kwargs["id"]
+    mock_bg_instance.get_jobs.reset_mock()
 
     result = ts.list_tasks()
-    assert "job123" in result
+    assert job_id in result
     assert "Test Job" in result
+    # Served from the projection, not by unpickling every job
+    mock_bg_instance.get_jobs.assert_not_called()
 
 
 def test_delete_task(mock_scheduler):
@@ -72,3 +99,430 @@ def test_run_task(mock_scheduler):
     result = ts.run_task("job123")
     assert "Task 'Test Job' triggered manually." in result
     mock_bg_instance.add_job.assert_called()
+
+
+def test_scheduler_executor_config():
+    with patch("mcp_server.scheduler.BackgroundScheduler") as mock_bg:
+        TaskScheduler()
+    kwargs = mock_bg.call_args.kwargs
+    assert kwargs["executors"]["default"]._pool._max_workers == SCHEDULER_THREADS
+    assert kwargs["job_defaults"] == {
+        "coalesce": True,
+        "max_instances": 1,
+        "misfire_grace_time": 300,
+    }
+
+
+def test_run_task_uses_manual_priority(mock_scheduler):
+    ts, mock_bg_instance = mock_scheduler
+    mock_bg_instance.get_job.return_value = MagicMock()
+
+    mock_bg_instance.get_job.return_value.id = "job123"
+    mock_bg_instance.get_job.return_value.kwargs = {"max_tokens": 50}
+
+    ts.run_task("job123")
+    kwargs = mock_bg_instance.add_job.call_args.kwargs["kwargs"]
+    assert kwargs.pop("scheduled_at") <= time.time()
+    assert kwargs == {"max_tokens": 50, "job_id": "job123", "priority": PRIORITY_MANUAL}
+
+
+def test_priority_gate_admits_by_priority():
+    gate = PriorityGate(max_concurrent=1)
+    order = []
+    release_first = threading.Event()
+
+    def holder():
+        with gate.slot():
+            release_first.wait()
+
+    def caller(name, priority):
+        with gate.slot(priority):
+            order.append(name)
+
+    first = threading.Thread(target=holder)
+    first.start()
+    while gate.stats()["active"] == 0:
+        time.sleep(0.01)
+
+    waiters = []
+    for name, priority in [("cron-a", 10), ("cron-b", 10), ("manual", 0)]:
+        thread = threading.Thread(target=caller, args=(name, priority))
+        thread.start()
+        waiters.append(thread)
+        while gate.stats()["waiting"] < len(waiters):
+            time.sleep(0.01)
+
+    release_first.set()
+    for thread in [first] + waiters:
+        thread.join(timeout=5)
+
+    assert order == ["manual", "cron-a", "cron-b"]
+    assert gate.stats() == {"max_concurrent": 1, "active": 0, "waiting": 0}
+
+
+def _ndjson(*chunks):
+    return "".join(json.dumps(c) + "\n" for c in chunks)
+
+
+def _mock_client(handler):
+    return httpx.Client(
+        base_url="http://ollama:11434", transport=httpx.MockTransport(handler)
+    )
+
+
+def test_generate_llm_response_reuses_pooled_client():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        body = _ndjson(
+            {"response": "Report ", "done": False},
+            {"response": "body", "done": False},
+            {"response": "", "done": True, "eval_count": 2},
+        )
+        return httpx.Response(200, text=body)
+
+    client = _mock_client(handler)
+    with patch("mcp_server.scheduler._ollama_client", client):
+        assert generate_llm_response("one") == "Report body"
+        assert generate_llm_response("two") == "Report body"
+        assert get_ollama_client() is client
+
+    assert [r.url.path for r in requests] == ["/api/generate", "/api/generate"]
+    payload = json.loads(requests[1].content)
+    assert payload["prompt"] == "two"
+    assert payload["stream"] is True
+
+
+def test_ollama_timeouts_are_split():
+    assert OLLAMA_TIMEOUT.connect < OLLAMA_TIMEOUT.read
+
+
+def test_stream_generation_records_timing():
+    body = _ndjson(
+        {"response": "a", "done": False},
+        {"response": "b", "done": False},
+        {"response": "", "done": True, "eval_count": 2, "done_reason": "stop"},
+    )
+    client = _mock_client(lambda request: httpx.Response(200, text=body))
+    with patch("mcp_server.scheduler._ollama_client", client):
+        result = stream_generation("prompt")
+
+    assert result.text == "ab"
+    assert result.tokens == 2
+    assert result.stopped is None
+    assert result.ttft is not None and result.ttft <= result.duration
+    assert result.tokens_per_second > 0
+
+
+def test_stream_generation_enforces_budgets():
+    sent = []
+
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(
+            200, text=_ndjson(*({"response": "x", "done": False} for _ in range(50)))
+        )
+
+    with patch("mcp_server.scheduler._ollama_client", _mock_client(handler)):
+        result = stream_generation("prompt", max_tokens=5)
+        assert (result.text, result.stopped) == ("xxxxx", "max_tokens")
+        assert sent[0]["options"]["num_predict"] == 5
+
+        # Every clock read advances 1 s, so the third token crosses 2.5 s
+        ticks = iter(range(100))
+        with patch("mcp_server.scheduler.time.monotonic", lambda: next(ticks)):
+            result = stream_generation("prompt", max_duration=2.5)
+        assert result.stopped == "max_duration"
+        assert result.tokens < 5
+
+        text = generate_llm_response("prompt", max_tokens=3)
+        assert text.startswith("xxx")
+        assert "[Report truncated: max_tokens budget reached]" in text
+
+
+def test_stream_generation_raises_model_errors():
+    body = _ndjson({"error": "model not found"})
+    client = _mock_client(lambda request: httpx.Response(200, text=body))
+    with patch("mcp_server.scheduler._ollama_client", client):
+        with pytest.raises(RuntimeError, match="model not found"):
+            stream_generation("prompt")
+
+
+def test_task_budget_reaches_generation(mock_scheduler):
+    ts, mock_bg_instance = mock_scheduler
+    ts.add_task("T", "P", "0 8 * * *", ["a@b.c"], max_tokens=100)
+    call = mock_bg_instance.add_job.call_args.kwargs
+    assert call["kwargs"] == {"job_id": call["id"], "max_tokens": 100}
+
+    with (
+        patch("mcp_server.scheduler.generate_llm_response") as mock_llm,
+        patch("mcp_server.scheduler.send_email"),
+    ):
+        mock_llm.return_value = "Report"
+        execute_prompt_and_email("T", "P", ["a@b.c"], max_tokens=100)
+    mock_llm.assert_called_with("P", max_tokens=100)
+
+
+@pytest.mark.parametrize(
+    "budget",
+    [
+        {"max_tokens": 0},
+        {"max_tokens": -5},
+        {"max_tokens": "100"},
+        {"max_tokens": 1.5},
+        {"max_tokens": True},
+        {"max_duration": 0},
+        {"max_duration": -1.0},
+        {"max_duration": "60"},
+        {"max_duration": float("inf")},
+    ],
+)
+def test_add_task_rejects_invalid_budget(mock_scheduler, budget):
+    ts, mock_bg_instance = mock_scheduler
+    result = ts.add_task("T", "P", "0 8 * * *", ["a@b.c"], **budget)
+    assert result.startswith("Error: max_")
+    mock_bg_instance.add_job.assert_not_called()
+
+
+def test_send_email_queues_delivery():
+    mailer = MagicMock()
+    with patch("mcp_server.scheduler.get_mailer", return_value=mailer):
+        send_email("Daily", "Body", ["a@x.com", "b@x.com"])
+
+    msg, recipients = mailer.enqueue.call_args.args
+    assert msg["Subject"] == "[Report] Daily"
+    assert msg["To"] == "a@x.com, b@x.com"
+    assert recipients == ["a@x.com", "b@x.com"]
+
+
+def test_identical_prompts_share_one_generation():
+    started = threading.Event()
+
+    def slow_generation(prompt):
+        started.set()
+        time.sleep(0.1)
+        return "Shared report"
+
+    with (
+        patch("mcp_server.scheduler.prompt_cache", PromptCache(ttl=60)),
+        patch(
+            "mcp_server.scheduler.generate_llm_response", side_effect=slow_generation
+        ) as mock_llm,
+        patch("mcp_server.scheduler.send_email") as mock_email,
+    ):
+        first = threading.Thread(
+            target=execute_prompt_and_email,
+            args=("Team A", "Summarize overnight alerts", ["a@x.com"]),
+        )
+        first.start()
+        started.wait()
+        execute_prompt_and_email("Team B", "Summarize  overnight alerts", ["b@x.com"])
+        first.join()
+
+    assert mock_llm.call_count == 1
+    sent = {call.args[0]: call.args for call in mock_email.call_args_list}
+    assert sent["Team A"] == ("Team A", "Shared report", ["a@x.com"])
+    assert sent["Team B"] == ("Team B", "Shared report", ["b@x.com"])
+
+
+def test_manual_runs_and_incomplete_reports_skip_the_cache():
+    reports = iter(["No response from LLM.", "Cron report", "Manual report"])
+    with (
+        patch("mcp_server.scheduler.prompt_cache", PromptCache(ttl=60)),
+        patch(
+            "mcp_server.scheduler.generate_llm_response",
+            side_effect=lambda prompt: next(reports),
+        ) as mock_llm,
+        patch("mcp_server.scheduler.send_email") as mock_email,
+    ):
+        # The fallback is not cached, so the next cron run generates again
+        execute_prompt_and_email("Daily", "Prompt", ["a@x.com"])
+        execute_prompt_and_email("Daily", "Prompt", ["a@x.com"])
+        # A manual run right after a cron run still gets a new report
+        execute_prompt_and_email(
+            "Daily", "Prompt", ["a@x.com"], priority=PRIORITY_MANUAL
+        )
+
+    assert mock_llm.call_count == 3
+    assert [call.args[1] for call in mock_email.call_args_list] == [
+        "No response from LLM.",
+        "Cron report",
+        "Manual report",
+    ]
+
+
+def test_truncated_reports_are_incomplete():
+    assert is_complete_report("Full report")
+    assert not is_complete_report("")
+    assert not is_complete_report("No response from LLM.")
+    assert not is_complete_report(
+        "Partial\n\n[Report truncated: max_duration budget reached]"
+    )
+
+
+def test_execution_is_recorded_in_run_history(tmp_path):
+    history = RunHistory(str(tmp_path / "runs.db"))
+    body = _ndjson(
+        {"response": "Report", "done": False},
+        {"response": "", "done": True, "eval_count": 7},
+    )
+    client = _mock_client(lambda request: httpx.Response(200, text=body))
+    mailer = MagicMock()
+
+    with (
+        patch("mcp_server.scheduler.run_history", history),
+        patch("mcp_server.scheduler._ollama_client", client),
+        patch("mcp_server.scheduler.get_mailer", return_value=mailer),
+        patch("mcp_server.scheduler.prompt_cache", PromptCache(ttl=0)),
+    ):
+        execute_prompt_and_email(
+            "Daily", "Prompt", ["a@x.com"], job_id="job1", scheduled_at=time.time() - 2
+        )
+        # The delivery queue reports back once the email has gone out
+        mailer.enqueue.call_args.kwargs["on_done"](0.25, 0)
+
+    run = history.runs("job1")[0]
+    assert run["status"] == "ok"
+    assert run["tokens"] == 7
+    assert run["queue_delay"] >= 2
+    assert run["llm_seconds"] is not None and run["ttft"] is not None
+    assert (run["email_seconds"], run["email_status"]) == (0.25, "sent")
+    assert run["finished_at"] >= run["started_at"]
+
+
+def test_cron_runs_pick_up_their_scheduled_time(mock_scheduler):
+    from datetime import datetime, timezone
+    from apscheduler.events import EVENT_JOB_SUBMITTED, JobSubmissionEvent
+
+    ts, mock_bg_instance = mock_scheduler
+    ts.add_task("Daily", "Summarize", "0 8 * * *", ["a@x.com"])
+    task_id = mock_bg_instance.add_job.call_args.kwargs["id"]
+    due = datetime.now(timezone.utc)
+
+    # The run may start before the submission listener has recorded it
+    threading.Timer(
+        0.1,
+        ts._on_job_event,
+        [JobSubmissionEvent(EVENT_JOB_SUBMITTED, task_id, None, [due])],
+    ).start()
+    assert _pop_scheduled_time(task_id) == due.timestamp()
+    assert _pop_scheduled_time(task_id, wait=0) is None
+
+
+def test_task_listing_uses_projection(mock_scheduler):
+    ts, mock_bg_instance = mock_scheduler
+    ts.add_task("Daily", "Summarize", "0 8 * * *", ["a@x.com"])
+    mock_bg_instance.get_jobs.reset_mock()
+
+    etag, tasks = ts.tasks_snapshot()
+    assert [(t["title"], t["prompt"], t["recipients"]) for t in tasks] == [
+        ("Daily", "Summarize", ["a@x.com"])
+    ]
+    assert "hour='8'" in tasks[0]["schedule"]
+    assert tasks[0]["next_run"] != "None"
+    # Repeated polls reuse the snapshot and never touch the job store
+    assert ts.tasks_snapshot() == (etag, tasks)
+    assert ts.get_tasks() is tasks
+    mock_bg_instance.get_jobs.assert_not_called()
+
+    ts.delete_task(tasks[0]["id"])
+    new_etag, tasks = ts.tasks_snapshot()
+    assert tasks == [] and new_etag != etag
+
+
+def test_projection_is_loaded_from_job_store():
+    job = MagicMock(id="job1", args=["Daily", "Prompt", ["a@x.com"]], kwargs={})
+    job.name = "Daily"
+    job.trigger = CronTrigger(hour=8)
+    manual = MagicMock(trigger=MagicMock(), kwargs={"job_id": "job1"})
+
+    with patch("mcp_server.scheduler.BackgroundScheduler") as mock_bg:
+        mock_bg.return_value.get_jobs.return_value = [job, manual]
+        ts = TaskScheduler()
+
+    # Legacy jobs learn their id; one-off manual runs are not listed
+    job.modify.assert_called_once_with(kwargs={"job_id": "job1"})
+    assert [t["id"] for t in ts.get_tasks()] == ["job1"]
+
+
+def test_listener_relays_task_events(mock_scheduler):
+    from apscheduler.events import (
+        EVENT_JOB_EXECUTED,
+        EVENT_JOB_REMOVED,
+        EVENT_JOB_SUBMITTED,
+        JobEvent,
+        JobExecutionEvent,
+        JobSubmissionEvent,
+    )
+
+    ts, mock_bg_instance = mock_scheduler
+    published = []
+    ts.events.publish = lambda event_type, data: published.append((event_type, data))
+
+    ts.add_task("Daily", "Summarize", "0 8 * * *", ["a@x.com"])
+    task_id = published[0][1]["id"]
+    assert published[0][0] == "task_added"
+    assert published[0][1]["next_run"] != "None"
+
+    # A cron firing starts a run and moves the next run on
+    ts._on_job_event(JobSubmissionEvent(EVENT_JOB_SUBMITTED, task_id, None, []))
+    assert [e for e, _ in published[1:]] == ["run_started", "next_run"]
+
+    # Manual runs report against their task, with the job's return value
+    mock_bg_instance.get_job.return_value = MagicMock(id=task_id, kwargs={})
+    ts.run_task(task_id)
+    manual_id = mock_bg_instance.add_job.call_args.kwargs["id"]
+    del published[:]
+    ts._on_job_event(JobSubmissionEvent(EVENT_JOB_SUBMITTED, manual_id, None, []))
+    ts._on_job_event(JobEvent(EVENT_JOB_REMOVED, manual_id, None))
+    ts._on_job_event(
+        JobExecutionEvent(EVENT_JOB_EXECUTED, manual_id, None, None, retval="llm_error")
+    )
+    assert published == [
+        ("run_started", {"id": task_id, "manual": True}),
+        (
+            "run_finished",
+            {"id": task_id, "manual": True, "status": "llm_error", "error": None},
+        ),
+    ]
+    assert ts._manual_runs == {}
+
+    # Removal straight on the scheduler still drops the task
+    del published[:]
+    ts._on_job_event(JobEvent(EVENT_JOB_REMOVED, task_id, None))
+    assert published == [("task_removed", {"id": task_id})]
+    assert ts.get_tasks() == []
+
+
+def test_job_store_changes_update_projection(mock_scheduler):
+    from apscheduler.events import EVENT_JOB_ADDED, EVENT_JOB_MODIFIED, JobEvent
+
+    ts, mock_bg_instance = mock_scheduler
+    published = []
+    ts.events.publish = lambda event_type, data: published.append((event_type, data))
+
+    job = MagicMock(id="job1", args=["Daily", "Prompt", ["a@x.com"]], kwargs={})
+    job.name = "Daily"
+    job.trigger = CronTrigger(hour=8)
+    mock_bg_instance.get_job.return_value = job
+    ts._on_job_event(JobEvent(EVENT_JOB_ADDED, "job1", "default"))
+    etag, tasks = ts.tasks_snapshot()
+    assert [t["id"] for t in tasks] == ["job1"]
+
+    # A repeated report of the same job changes nothing
+    ts._on_job_event(JobEvent(EVENT_JOB_MODIFIED, "job1", "default"))
+    assert [e for e, _ in published] == ["task_added"]
+    assert ts.tasks_snapshot()[0] == etag
+
+    # Rescheduled straight on the scheduler
+    job.trigger = CronTrigger(hour=9)
+    ts._on_job_event(JobEvent(EVENT_JOB_MODIFIED, "job1", "default"))
+    new_etag, tasks = ts.tasks_snapshot()
+    assert new_etag != etag and "hour='9'" in tasks[0]["schedule"]
+
+    # No longer recurring: dropped from the listing
+    job.trigger = MagicMock()
+    ts._on_job_event(JobEvent(EVENT_JOB_MODIFIED, "job1", "default"))
+    assert ts.get_tasks() == []
+    assert published[-1] == ("task_removed", {"id": "job1"})
@@ -0,0 +1,192 @@
+import os
+import sys
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+import scraper  # noqa: E402
+
+
+def _response(status_code=200, text="", headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.text = text
+    response.headers = headers or {}
+    return response
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.get = AsyncMock()
+
+    def test_fresh_entries_skip_the_network(self):
+        cache = scraper.ResponseCache(ttl=60)
+        self.client.get.return_value = _response(text="<p>Hello</p>")
+
+        first = asyncio.run(scraper.fetch_text("https://a.test", self.client, cache))
+        second = asyncio.run(scraper.fetch_text("https://a.test", self.client, cache))
+
+        self.assertEqual(first, "Hello")
+        self.assertEqual(second, "Hello")
+        self.assertEqual(self.client.get.call_count, 1)
+
+    @patch("scraper.html_to_text", wraps=scraper.html_to_text)
+    def test_stale_entries_are_revalidated(self, mock_html_to_text):
+        cache = scraper.ResponseCache(ttl=0)
+        self.client.get.return_value = _response(
+            text="<p>Hello</p>",
+            headers={"etag": '"v1"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"},
+        )
+        asyncio.run(scraper.fetch_text("https://a.test", self.client, cache))
+
+        self.client.get.return_value = _response(status_code=304)
+        result = asyncio.run(scraper.fetch_text("https://a.test", self.client, cache))
+
+        self.assertEqual(result, "Hello")
+        headers = self.client.get.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"v1"')
+        self.assertEqual(headers["If-Modified-Since"], "Mon, 01 Jan 2024 00:00:00 GMT")
+        # The 304 reused the cached text instead of re-parsing
+        self.assertEqual(mock_html_to_text.call_count, 1)
+
+    def test_no_store_is_not_cached(self):
+        cache = scraper.ResponseCache(ttl=60)
+        self.client.get.return_value = _response(
+            text="<p>Private</p>", headers={"cache-control": "private, no-store"}
+        )
+        asyncio.run(scraper.fetch_text("https://a.test", self.client, cache))
+        self.assertIsNone(cache.get("https://a.test"))
+
+    def test_size_bound_evicts_least_recently_used(self):
+        cache = scraper.ResponseCache(ttl=60, max_bytes=10)
+        cache.put("https://a.test", scraper.CachedPage("aaaaa", None, None, 0))
+        cache.put("https://b.test", scraper.CachedPage("bbbbb", None, None, 0))
+        cache.get("https://a.test")
+        cache.put("https://c.test", scraper.CachedPage("ccccc", None, None, 0))
+
+        self.assertIsNotNone(cache.get("https://a.test"))
+        self.assertIsNone(cache.get("https://b.test"))
+        self.assertIsNotNone(cache.get("https://c.test"))
+
+
+class TestStreamingExtraction(unittest.TestCase):
+    HTML = (
+        "<html><head><style>body { color: red; }</style></head><body>"
+        "<h1>Title</h1><p>Content  with\n  spaces &amp; entities</p>"
+        "<script>var x = '<p>not text</p>';</script><br/><div>Tail</div>"
+        "</body></html>"
+    )
+
+    def test_matches_full_parser_at_any_chunk_boundary(self):
+        expected = scraper.html_to_text(self.HTML)
+        for split in range(1, len(self.HTML)):
+            extractor = scraper.StreamingTextExtractor()
+            extractor.feed(self.HTML[:split])
+            extractor.feed(self.HTML[split:])
+            extractor.close()
+            self.assertEqual(extractor.text(), expected, f"split at {split}")
+
+    def test_max_chars_caps_output(self):
+        extractor = scraper.StreamingTextExtractor(max_chars=8)
+        extractor.feed(self.HTML)
+        self.assertTrue(extractor.done)
+        self.assertEqual(extractor.text(), "Title\nCo")
+
+    def test_max_chars_filled_exactly_by_a_line(self):
+        extractor = scraper.StreamingTextExtractor(max_chars=5)
+        extractor.feed("<p>abcde</p><p>XYZWVUT</p>")
+        extractor.close()
+        self.assertTrue(extractor.done)
+        self.assertEqual(extractor.text(), "abcde")
+
+        extractor = scraper.StreamingTextExtractor(max_chars=7)
+        extractor.feed("<p>abcde</p><p>XYZWVUT</p>")
+        extractor.close()
+        self.assertEqual(extractor.text(), "abcde\nX")
+
+    def test_stream_stops_downloading_once_capped(self):
+        sent = []
+
+        async def body():
+            for i in range(100):
+                sent.append(i)
+                yield f"<p>Paragraph number {i}</p>".encode()
+
+        def handler(request):
+            return httpx.Response(200, content=body())
+
+        async def scrape():
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                return await scraper.stream_text("https://a.test", client, 50)
+
+        result = asyncio.run(scrape())
+
+        self.assertTrue(result.startswith("Paragraph number 0\nParagraph number 1"))
+        self.assertTrue(result.endswith("[Truncated after 50 characters]"))
+        self.assertLess(len(sent), 100)
+
+    def test_complete_stream_is_cached(self):
+        cache = scraper.ResponseCache(ttl=60)
+
+        def handler(request):
+            return httpx.Response(200, text="<p>Short page</p>")
+
+        async def scrape():
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                return await scraper.stream_text("https://a.test", client, 500, cache)
+
+        self.assertEqual(asyncio.run(scrape()), "Short page")
+        self.assertEqual(cache.get("https://a.test").text, "Short page")
+
+
+class TestMapBounded(unittest.TestCase):
+    def test_limits_overall_and_per_host_concurrency(self):
+        active = {"total": 0, "a.test": 0}
+        peaks = {"total": 0, "a.test": 0}
+
+        async def fetch(url):
+            host = url.split("/")[2]
+            active["total"] += 1
+            active[host] = active.get(host, 0) + 1
+            peaks["total"] = max(peaks["total"], active["total"])
+            peaks["a.test"] = max(peaks["a.test"], active.get("a.test", 0))
+            await asyncio.sleep(0.01)
+            active["total"] -= 1
+            active[host] -= 1
+            return url.upper()
+
+        urls = [f"https://a.test/{i}" for i in range(6)] + [
+            f"https://b{i}.test/" for i in range(6)
+        ]
+        results = asyncio.run(
+            scraper.map_bounded(urls, fetch, concurrency=4, per_host=2)
+        )
+
+        self.assertEqual(results, [url.upper() for url in urls])
+        self.assertEqual(peaks["total"], 4)
+        self.assertEqual(peaks["a.test"], 2)
+
+
+class TestSharedClient(unittest.TestCase):
+    def test_client_is_reused_within_a_loop(self):
+        async def fetch_twice():
+            return scraper.get_client(), scraper.get_client()
+
+        first, second = asyncio.run(fetch_twice())
+        self.assertIs(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import shutil
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from search_cache import SearchCache, normalize_query  # noqa: E402
+
+RESULTS = [{"title": "Nebulus", "href": "https://example.com", "body": "Local AI"}]
+
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.abspath("tests/test_search_workspace")
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_normalize_query(self):
+        self.assertEqual(
+            normalize_query("  Local   AI ", 5), normalize_query("local ai", 5)
+        )
+        self.assertNotEqual(
+            normalize_query("local ai", 5), normalize_query("local ai", 10)
+        )
+
+    def test_hits_and_misses(self):
+        cache = SearchCache(ttl=60)
+        fetch = MagicMock(return_value=RESULTS)
+
+        self.assertEqual(cache.get_or_fetch("Local AI", 5, fetch), RESULTS)
+        self.assertEqual(cache.get_or_fetch("local  ai", 5, fetch), RESULTS)
+
+        fetch.assert_called_once()
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_expired_results_are_refetched(self):
+        cache = SearchCache(ttl=0)
+        fetch = MagicMock(return_value=RESULTS)
+        cache.get_or_fetch("query", 5, fetch)
+        cache.get_or_fetch("query", 5, fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_failures_are_not_cached(self):
+        cache = SearchCache(ttl=60)
+        fetch = MagicMock(side_effect=[RuntimeError("rate limited"), RESULTS])
+        with self.assertRaises(RuntimeError):
+            cache.get_or_fetch("query", 5, fetch)
+        self.assertEqual(cache.get_or_fetch("query", 5, fetch), RESULTS)
+
+    def test_concurrent_identical_queries_share_one_fetch(self):
+        cache = SearchCache(ttl=60)
+        started = threading.Event()
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return RESULTS
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(cache.get_or_fetch("q", 5, slow_fetch))
+        )
+        leader.start()
+        started.wait()
+        followers = [
+            threading.Thread(
+                target=lambda: results.append(cache.get_or_fetch("Q", 5, slow_fetch))
+            )
+            for _ in range(3)
+        ]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [RESULTS] * 4)
+        self.assertEqual(cache.stats()["coalesced"], 3)
+
+    def test_sqlite_persistence(self):
+        db_path = os.path.join(self.test_dir, "search.db")
+        SearchCache(ttl=60, db_path=db_path).get_or_fetch("query", 5, lambda: RESULTS)
+
+        fetch = MagicMock()
+        restarted = SearchCache(ttl=60, db_path=db_path)
+        self.assertEqual(restarted.get_or_fetch("query", 5, fetch), RESULTS)
+        fetch.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
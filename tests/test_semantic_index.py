@@ -0,0 +1,153 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add mcp_server to path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../mcp_server"))
+)
+
+from semantic_index import SemanticIndex, chunk_lines  # noqa: E402
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.embedded = []
+
+    def embed(self, texts, query=False):
+        if not query:
+            self.embedded.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class FakeCollection:
+    """In-memory stand-in for a ChromaDB collection."""
+
+    def __init__(self):
+        self.rows = {}
+        self.wheres = []
+
+    def get(self, include=None):
+        ids = list(self.rows)
+        return {"ids": ids, "metadatas": [self.rows[i][1] for i in ids]}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for i, doc, meta in zip(ids, documents, metadatas):
+            self.rows[i] = (doc, meta)
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+    def query(self, query_embeddings, n_results, where=None, include=None):
+        self.wheres.append(where)
+        paths = (where or {}).get("path")
+        if isinstance(paths, str):
+            paths = {"$in": [paths]}
+        candidates = [
+            i
+            for i, (_, meta) in self.rows.items()
+            if paths is None or meta["path"] in paths["$in"]
+        ][:n_results]
+        return {
+            "documents": [[self.rows[i][0] for i in candidates]],
+            "metadatas": [[self.rows[i][1] for i in candidates]],
+            "distances": [[0.25 for _ in candidates]],
+        }
+
+
+class TestChunkLines(unittest.TestCase):
+    def test_overlapping_windows(self):
+        text = "".join(f"line {n}\n" for n in range(1, 26))
+        chunks = chunk_lines(text, size=10, overlap=2)
+        self.assertEqual([(s, e) for s, e, _ in chunks], [(1, 10), (9, 18), (17, 25)])
+        self.assertTrue(chunks[1][2].startswith("line 9\n"))
+
+    def test_blank_text(self):
+        self.assertEqual(chunk_lines("\n\n  \n"), [])
+
+
+class TestSemanticIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self._write("src/app.py", "def main():\n    return 1\n")
+        self._write("docs/guide.md", "# Guide\n")
+        self._write("data.bin", "\0\0")
+        self.collection = FakeCollection()
+        self.embedder = FakeEmbedder()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _write(self, rel, content):
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def _index(self):
+        return SemanticIndex(self.root, self.embedder, lambda: self.collection)
+
+    def test_only_changed_chunks_are_embedded(self):
+        index = self._index()
+        self.assertEqual(index.refresh(), 2)
+        self.assertEqual(len(self.embedder.embedded), 2)
+        self.assertEqual(index.refresh(), 0)
+
+        self._write("src/app.py", "def main():\n    return 2\n")
+        os.remove(os.path.join(self.root, "docs/guide.md"))
+        self.assertEqual(index.refresh(), 2)
+        self.assertEqual(self.embedder.embedded[-1], "def main():\n    return 2\n")
+        paths = {meta["path"] for _, meta in self.collection.rows.values()}
+        self.assertEqual(paths, {"src/app.py"})
+        self.assertEqual(len(self.collection.rows), 1)
+
+    def test_restart_reuses_stored_chunks(self):
+        self._index().refresh()
+        embedded = len(self.embedder.embedded)
+        # A new process sees the same files and stored ids: nothing to embed
+        self.assertEqual(self._index().refresh(), 2)
+        self.assertEqual(len(self.embedder.embedded), embedded)
+
+    def test_search_scoped_to_path(self):
+        index = self._index()
+        hits = index.search("entry point", 5, os.path.join(self.root, "src"))
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0]["path"], "src/app.py")
+        self.assertEqual((hits[0]["start_line"], hits[0]["end_line"]), (1, 2))
+        self.assertEqual(hits[0]["score"], 0.75)
+        self.assertEqual(len(index.search("guide", 5, self.root)), 2)
+        self.assertEqual(self.collection.wheres, [{"path": "src/app.py"}, None])
+
+    def test_bounded_refresh_leaves_rest_pending(self):
+        index = self._index()
+        self.assertEqual(index.refresh(max_files=1), 1)
+        self.assertTrue(index.pending)
+        # The last changed file fits the budget, so the walk completes
+        self.assertEqual(index.refresh(max_files=1), 1)
+        self.assertFalse(index.pending)
+        self.assertEqual(len(self.embedder.embedded), 2)
+
+    def test_search_indexes_the_rest_in_background(self):
+        self._write("src/util.py", "def helper():\n    pass\n")
+        index = SemanticIndex(
+            self.root,
+            self.embedder,
+            lambda: self.collection,
+            search_refresh_files=1,
+        )
+        # The first search embeds one file, then hands the rest to a thread
+        self.assertEqual(len(index.search("entry point", 5, self.root)), 1)
+        index._background.join(timeout=5)
+        self.assertFalse(index.pending)
+        self.assertEqual(len(self.embedder.embedded), 3)
+        hits = index.search("entry point", 5, os.path.join(self.root, "src"))
+        self.assertEqual({hit["path"] for hit in hits}, {"src/app.py", "src/util.py"})
+        where = self.collection.wheres[-1]["path"]
+        self.assertEqual(sorted(where["$in"]), ["src/app.py", "src/util.py"])
+
+
+if __name__ == "__main__":
+    unittest.main()